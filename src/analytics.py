@@ -0,0 +1,267 @@
+# src/analytics.py
+
+import sys
+import time
+
+import numpy as np
+
+from registry import load_registry
+from roster import Roster
+from rules import MAX_DOTS
+
+NO_CLAN = -1
+
+
+class RosterColumns:
+    """
+    Um roster em colunas NumPy: uma linha por personagem, uma coluna por atributo, perícia e
+    disciplina (na ordem dos IDs das regras), mais o ID do clã (-1 sem clã). As categorias
+    ("Físico", "Talentos"...) vêm dos JSON carregados.
+    """
+    def __init__(self, game_data, attributes, skills, disciplines, clans):
+        self.game_data = game_data
+        ids = game_data.ids
+        self.attribute_names = ids.attributes.names
+        self.skill_names = ids.skills.names
+        self.discipline_names = ids.disciplines.names
+        self.clan_names = ids.clans.names
+        self.attributes = attributes
+        self.skills = skills
+        self.disciplines = disciplines
+        self.clans = clans
+        self._blocks = {"attributes": (attributes, ids.attributes), "skills": (skills, ids.skills),
+                        "disciplines": (disciplines, ids.disciplines)}
+
+    @classmethod
+    def from_characters(cls, characters, game_data=None):
+        game_data = game_data or load_registry()
+        ids = game_data.ids
+        characters = list(characters)
+        n = len(characters)
+        n_attrs, n_skills = len(ids.attributes), len(ids.skills)
+        layouts = (game_data.attribute_layout, game_data.skill_layout)
+        chunks, rows, columns, dots, clans = [], [], [], [], []
+        discipline_id, clan_id = ids.disciplines.get_id, ids.clans.get_id
+        same_layout = True
+        # Uma passada só: vetores de pontos (sem cópia), disciplinas esparsas e clã
+        for i, character in enumerate(characters):
+            if same_layout:
+                if character.layouts == layouts:
+                    chunks.append(character.dots)
+                else:
+                    same_layout = False
+            for discipline, value in character.disciplines.items():
+                # Como binroster: disciplina fora das regras é erro, não some das contagens
+                column = discipline_id(discipline)
+                if column is None:
+                    raise ValueError(f"'{character.name}': disciplina desconhecida '{discipline}'")
+                if not 0 <= value <= MAX_DOTS:
+                    raise ValueError(f"'{character.name}': disciplina '{discipline}' com {value} pontos "
+                                     f"(esperado 0 a {MAX_DOTS})")
+                rows.append(i); columns.append(column); dots.append(value)
+            clans.append(clan_id(character.clan, NO_CLAN) if character.clan else NO_CLAN)
+        if same_layout:
+            # Caminho rápido: mesmo layout das regras, todos os vetores concatenados de uma vez
+            block = np.frombuffer(b"".join(chunks), dtype=np.uint8).reshape(n, n_attrs + n_skills)
+            attributes, skills = block[:, :n_attrs], block[:, n_attrs:]
+        else:
+            attributes = np.array([[c.attributes.get(a, 1) for a in ids.attributes.names] for c in characters],
+                                  dtype=np.uint8).reshape(n, n_attrs)
+            skills = np.array([[c.skills.get(s, 0) for s in ids.skills.names] for c in characters],
+                              dtype=np.uint8).reshape(n, n_skills)
+        # np.maximum.at: apelidos da mesma disciplina no mesmo personagem ficam com o maior valor, sem somar
+        disciplines = np.zeros((n, len(ids.disciplines)), dtype=np.uint8)
+        np.maximum.at(disciplines, (np.array(rows, dtype=np.intp), np.array(columns, dtype=np.intp)),
+                      np.array(dots, dtype=np.uint8))
+        clans = np.array(clans, dtype=np.int16)
+        return cls(game_data, attributes, skills, disciplines, clans)
+
+    @classmethod
+    def from_binary(cls, roster):
+        """Sobre um binroster.BinaryRoster com as mesmas regras: as colunas são views do mmap, sem cópia."""
+        if not roster.matches_rules:
+            return cls.from_characters(roster.characters(), roster.game_data)
+        from binroster import NO_CLAN as BINARY_NO_CLAN
+        records = roster.records
+        clans = records["clan"].astype(np.int16)
+        clans[records["clan"] == BINARY_NO_CLAN] = NO_CLAN
+        return cls(roster.game_data, records["attributes"], records["skills"], records["disciplines"], clans)
+
+    def __len__(self):
+        return len(self.clans)
+
+    def column(self, name):
+        """Pontos de todos os personagens num atributo, perícia ou disciplina (aceita apelidos)."""
+        for values, table in self._blocks.values():
+            i = table.get_id(name)
+            if i is not None:
+                return values[:, i]
+        raise KeyError(f"'{name}' não é atributo, perícia nem disciplina")
+
+    def block(self, kind):
+        """(matriz de pontos, nomes das colunas) de "attributes", "skills" ou "disciplines"."""
+        values, table = self._blocks[kind]
+        return values, table.names
+
+    def category_columns(self, kind, category):
+        """Colunas de uma categoria dos JSON, ex.: category_columns("skills", "Talentos")."""
+        data = self.game_data.attributes_data if kind == "attributes" else self.game_data.skills_data
+        values, table = self._blocks[kind]
+        return values[:, [table.id(name) for name in data[category]]]
+
+    # --- AGREGADOS POR CLÃ ---
+    def _group(self, mask=None):
+        """(ID do grupo por linha, quantidade de grupos): um grupo por clã e o último para 'sem clã'."""
+        groups = np.where(self.clans == NO_CLAN, len(self.clan_names), self.clans).astype(np.intp)
+        return (groups if mask is None else groups[mask]), len(self.clan_names) + 1
+
+    def clan_counts(self, mask=None):
+        groups, k = self._group(mask)
+        counts = np.bincount(groups, minlength=k)
+        return {name: int(n) for name, n in zip(self.clan_names + ("(sem clã)",), counts) if n}
+
+    def clan_sums(self, values, mask=None):
+        """
+        Soma de cada coluna de `values` (n x m) por clã, numa única bincount: a linha i, coluna j,
+        cai na posição grupo * m + j. Retorna uma matriz (clãs + 1) x m.
+        """
+        values = values if values.ndim == 2 else values[:, None]
+        groups, k = self._group(mask)
+        if mask is not None:
+            values = values[mask]
+        m = values.shape[1]
+        index = (groups[:, None] * m + np.arange(m)).ravel()
+        return np.bincount(index, weights=values.ravel(), minlength=k * m).reshape(k, m)
+
+    def clan_means(self, kind="attributes", mask=None):
+        """{clã: {nome: média}} para um bloco inteiro (atributos, perícias ou disciplinas)."""
+        values, names = self.block(kind)
+        sums = self.clan_sums(values, mask)
+        groups, k = self._group(mask)
+        counts = np.bincount(groups, minlength=k)
+        means = sums / np.maximum(counts, 1)[:, None]
+        labels = self.clan_names + ("(sem clã)",)
+        return {labels[g]: dict(zip(names, means[g].round(3).tolist())) for g in range(k) if counts[g]}
+
+    def category_means(self, kind="attributes"):
+        """{clã: {categoria: média de pontos por estatística da categoria}}."""
+        data = self.game_data.attributes_data if kind == "attributes" else self.game_data.skills_data
+        groups, k = self._group()
+        counts = np.bincount(groups, minlength=k)
+        divisor = np.maximum(counts, 1)
+        labels = self.clan_names + ("(sem clã)",)
+        per_category = {category: self.clan_sums(self.category_columns(kind, category).sum(axis=1, dtype=np.int64))[:, 0]
+                        / divisor / len(stats) for category, stats in data.items()}
+        return {labels[g]: {category: round(float(means[g]), 3) for category, means in per_category.items()}
+                for g in range(k) if counts[g]}
+
+    # --- HISTOGRAMAS E CONTAGENS ---
+    def histogram(self, name, by_clan=False):
+        """Quantos personagens têm 0..5 pontos em `name`; por clã, uma linha por clã (+ sem clã)."""
+        column = self.column(name).astype(np.intp)
+        if not by_clan:
+            return np.bincount(column, minlength=MAX_DOTS + 1)
+        groups, k = self._group()
+        return np.bincount(groups * (MAX_DOTS + 1) + column, minlength=k * (MAX_DOTS + 1)).reshape(k, MAX_DOTS + 1)
+
+    def most_common_at(self, kind="skills", dots=3, top=5, mask=None):
+        """As estatísticas que mais aparecem com exatamente `dots` pontos, ex.: a perícia mais comum em 3."""
+        values, names = self.block(kind)
+        if mask is not None:
+            values = values[mask]
+        counts = np.count_nonzero(values == dots, axis=0)
+        order = np.argsort(-counts, kind="stable")[:top]
+        return [(names[i], int(counts[i])) for i in order if counts[i]]
+
+    def discipline_popularity(self, by_clan=False):
+        """Quantos personagens têm cada disciplina; por clã, {clã: {disciplina: quantidade}}."""
+        has = self.disciplines > 0
+        if not by_clan:
+            counts = has.sum(axis=0)
+            return {name: int(n) for name, n in sorted(zip(self.discipline_names, counts), key=lambda p: -p[1]) if n}
+        sums = self.clan_sums(has)
+        labels = self.clan_names + ("(sem clã)",)
+        return {labels[g]: {name: int(n) for name, n in zip(self.discipline_names, sums[g]) if n}
+                for g in range(len(labels)) if sums[g].any()}
+
+
+class RosterAnalytics:
+    """
+    Análises de um roster que muda: guarda as colunas e só as refaz quando a `version` da fonte
+    mudou (roster.Roster, store.ChronicleStore ou qualquer objeto iterável com `version`).
+    No ChronicleStore a versão também acompanha as escritas de outras conexões ao mesmo banco.
+    """
+    def __init__(self, source, game_data=None):
+        self.source = source
+        self.game_data = game_data or load_registry()
+        self._columns = None
+        self._version = None
+        self.rebuilds = 0
+
+    def _characters(self):
+        if hasattr(self.source, "iter_all"):
+            return (character for _, character in self.source.iter_all())
+        return iter(self.source)
+
+    @property
+    def columns(self):
+        version = getattr(self.source, "version", None)
+        if self._columns is None or version is None or version != self._version:
+            self._columns = RosterColumns.from_characters(self._characters(), self.game_data)
+            self._version = version
+            self.rebuilds += 1
+        return self._columns
+
+    def invalidate(self):
+        self._columns = None
+
+    def __getattr__(self, name):
+        # clan_means, histogram, most_common_at... sempre sobre as colunas em dia
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.columns, name)
+
+
+def _benchmark(count=200_000, seed=0):
+    from npc import generate_npcs
+    game_data = load_registry()
+    roster = Roster(generate_npcs(count, seed, game_data=game_data))
+    analytics = RosterAnalytics(roster, game_data)
+    start = time.perf_counter()
+    columns = analytics.columns
+    elapsed = time.perf_counter() - start
+    print(f"Colunas de {len(columns):,} personagens montadas em {elapsed * 1000:.0f} ms")
+    start = time.perf_counter()
+    means = analytics.clan_means("attributes")
+    top = analytics.most_common_at("skills", 3, top=3)
+    popularity = analytics.discipline_popularity()
+    histogram = analytics.histogram("Força", by_clan=True)
+    elapsed = time.perf_counter() - start
+    print(f"Médias por clã, perícias mais comuns em 3, disciplinas e histograma por clã: {elapsed * 1000:.1f} ms "
+          f"(colunas do cache: {analytics.rebuilds == 1})")
+    clan = next(iter(means))
+    print(f"  {clan}: " + ", ".join(f"{k} {v:.2f}" for k, v in means[clan].items()))
+    print(f"  mais comuns em 3: {top}; disciplina mais popular: {next(iter(popularity.items()))}")
+    print(f"  Força 1..4 entre os {clan}: {histogram[game_data.ids.clans.id(clan)][1:5].tolist()}")
+    # Referência: a mesma média por clã em Python puro
+    start = time.perf_counter()
+    sums, counts = {}, {}
+    for character in roster:
+        row = sums.setdefault(character.clan, [0] * len(game_data.attribute_names))
+        for i, value in enumerate(character.attribute_dots):
+            row[i] += value
+        counts[character.clan] = counts.get(character.clan, 0) + 1
+    elapsed = time.perf_counter() - start
+    ok = all(abs(sums[clan][i] / counts[clan] - means[clan][name]) < 1e-3
+             for clan in counts for i, name in enumerate(game_data.attribute_names))
+    print(f"Mesmas médias em Python puro: {elapsed * 1000:.0f} ms; conferem: {ok}")
+    roster.append(next(iter(generate_npcs(1, seed + 1, game_data=game_data, prefix="Novo"))))
+    start = time.perf_counter()
+    size = len(analytics.columns)
+    elapsed = time.perf_counter() - start
+    print(f"Depois de roster.append: colunas refeitas ({size:,} linhas) em {elapsed * 1000:.0f} ms; "
+          f"reconstruções: {analytics.rebuilds}")
+
+
+if __name__ == "__main__":
+    _benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
@@ -0,0 +1,345 @@
+# src/binroster.py
+
+import os
+import sys
+import json
+import mmap
+import time
+import struct
+import shutil
+import hashlib
+import tempfile
+
+import numpy as np
+
+from character import BASIC_INFO_FIELDS
+from registry import load_registry
+from rules import MAX_DOTS
+
+MAGIC = b"VTMROST\x00"
+FORMAT_VERSION = 1
+NO_CLAN = 0xFFFF
+# Cabeçalho: magia, versão, reservado, tamanho do registro, quantidade, tamanho do bloco de layout,
+# início dos registros, início e tamanho do heap de textos, hash das regras
+_HEADER = struct.Struct("<8sHHIQQQQQ32s")
+_ALIGN = 64
+_WRITE_BATCH = 65536
+
+
+def ruleset_hash(game_data):
+    """Hash dos nomes (e da ordem) de atributos, perícias, disciplinas e clãs: muda se o layout do registro mudar."""
+    ids = game_data.ids
+    layout = [list(ids.attributes.names), list(ids.skills.names), list(ids.disciplines.names), list(ids.clans.names)]
+    return hashlib.sha256(json.dumps(layout, ensure_ascii=False).encode("utf-8")).digest()
+
+
+def record_dtype(n_attributes, n_skills, n_disciplines):
+    """
+    Registro de tamanho fixo, sem preenchimento: IDs e pontos direto; nome e o resto do texto
+    (especialidades e informações básicas, em JSON) ficam no heap, referenciados por (início, tamanho).
+    """
+    return np.dtype([
+        ("clan", "<u2"),
+        ("attributes", "u1", (n_attributes,)),
+        ("skills", "u1", (n_skills,)),
+        ("disciplines", "u1", (n_disciplines,)),
+        ("name_offset", "<u8"),
+        ("name_length", "<u4"),
+        ("extra_offset", "<u8"),
+        ("extra_length", "<u4"),
+    ])
+
+
+def _aligned(offset):
+    return -(-offset // _ALIGN) * _ALIGN
+
+
+def _dots(character, kind, name, value):
+    """Pontos que cabem no registro (0..MAX_DOTS); fora disso, erro com o personagem e a estatística."""
+    if not isinstance(value, int) or not 0 <= value <= MAX_DOTS:
+        raise ValueError(f"'{character.name}': {kind} '{name}' com {value!r} pontos (esperado 0 a {MAX_DOTS})")
+    return value
+
+
+def write_binary_roster(path, characters, game_data=None):
+    """
+    Grava o roster no formato binário, consumindo `characters` sob demanda (registros em lotes,
+    textos num heap temporário que vai para o fim do arquivo). Retorna quantos foram gravados.
+    Escreve num arquivo temporário ao lado e só troca pelo destino no fim: um erro no meio
+    não destrói o roster anterior.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, partial = tempfile.mkstemp(prefix=".gravando-", suffix=os.path.splitext(path)[1], dir=directory)
+    os.close(fd)
+    try:
+        count = _write_binary_roster(partial, characters, game_data)
+        os.replace(partial, path)
+    except BaseException:
+        os.remove(partial)
+        raise
+    return count
+
+
+def _write_binary_roster(path, characters, game_data):
+    game_data = game_data or load_registry()
+    ids = game_data.ids
+    attribute_names, skill_names = game_data.attribute_names, game_data.skill_names
+    n_attrs, n_skills, n_discs = len(ids.attributes), len(ids.skills), len(ids.disciplines)
+    dtype = record_dtype(n_attrs, n_skills, n_discs)
+    layout = json.dumps({"attributes": list(ids.attributes.names), "skills": list(ids.skills.names),
+                         "disciplines": list(ids.disciplines.names), "clans": list(ids.clans.names)},
+                        ensure_ascii=False).encode("utf-8")
+    records_offset = _aligned(_HEADER.size + len(layout))
+    count = heap_size = 0
+    batch = np.zeros(_WRITE_BATCH, dtype=dtype)
+    attr_block, skill_block = batch["attributes"], batch["skills"]
+    with open(path, "wb") as f, tempfile.TemporaryFile() as heap:
+        f.write(b"\x00" * _HEADER.size + layout)
+        f.write(b"\x00" * (records_offset - f.tell()))
+
+        def flush(n):
+            f.write(batch[:n].tobytes())
+
+        filled = 0
+        for character in characters:
+            row = batch[filled]
+            attributes, skills = character.attributes, character.skills
+            # Caminho rápido: mesmo layout das regras, copia o vetor de pontos inteiro
+            if attributes.layout.names == attribute_names:
+                attr_block[filled] = np.frombuffer(character.attribute_dots, dtype=np.uint8)
+            else:
+                attr_block[filled] = [_dots(character, "atributo", a, attributes.get(a, 1)) for a in attribute_names]
+            if skills.layout.names == skill_names:
+                skill_block[filled] = np.frombuffer(character.skill_dots, dtype=np.uint8)
+            else:
+                skill_block[filled] = [_dots(character, "perícia", s, skills.get(s, 0)) for s in skill_names]
+            disciplines = row["disciplines"]
+            disciplines[:] = 0
+            for discipline, dots in character.disciplines.items():
+                column = ids.disciplines.get_id(discipline)
+                if column is None:
+                    raise ValueError(f"'{character.name}': disciplina desconhecida '{discipline}'")
+                disciplines[column] = _dots(character, "disciplina", discipline, dots)
+            clan_id = ids.clans.get_id(character.clan) if character.clan else None
+            row["clan"] = NO_CLAN if clan_id is None else clan_id
+            name = character.name.encode("utf-8")
+            extra = {field: getattr(character, field) for field in BASIC_INFO_FIELDS if getattr(character, field)}
+            if character.specialties:
+                extra["specialties"] = character.specialties
+            extra = json.dumps(extra, ensure_ascii=False).encode("utf-8") if extra else b""
+            row["name_offset"], row["name_length"] = heap_size, len(name)
+            row["extra_offset"], row["extra_length"] = heap_size + len(name), len(extra)
+            heap.write(name)
+            heap.write(extra)
+            heap_size += len(name) + len(extra)
+            filled += 1
+            count += 1
+            if filled == _WRITE_BATCH:
+                flush(filled)
+                filled = 0
+        flush(filled)
+        heap_offset = f.tell()
+        heap.seek(0)
+        shutil.copyfileobj(heap, f, 1 << 20)
+        f.seek(0)
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, 0, dtype.itemsize, count, len(layout),
+                             records_offset, heap_offset, heap_size, ruleset_hash(game_data)))
+    return count
+
+
+class BinaryRoster:
+    """
+    Roster binário aberto via mmap. `records` é um array estruturado do NumPy sobre o próprio
+    arquivo (sem cópia); filtros e somas rodam direto nele. Os nomes das colunas vêm do layout
+    gravado no arquivo; `matches_rules` diz se ele é o mesmo das regras carregadas.
+    """
+    def __init__(self, path, game_data=None):
+        self.path = path
+        self.game_data = game_data or load_registry()
+        self._file = open(path, "rb")
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"{path}: arquivo vazio, não é um roster binário") from None
+        try:
+            self._open()
+        except Exception:
+            self.close()
+            raise
+
+    def _open(self):
+        if len(self._mmap) < _HEADER.size:
+            raise ValueError(f"{self.path}: arquivo curto demais para um roster binário")
+        (magic, version, _, record_size, count, layout_length, records_offset,
+         heap_offset, heap_size, rules) = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path}: não é um roster binário")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{self.path}: versão {version} do formato não suportada (esperado {FORMAT_VERSION})")
+        layout = json.loads(self._mmap[_HEADER.size:_HEADER.size + layout_length].decode("utf-8"))
+        self.attribute_names = tuple(layout["attributes"])
+        self.skill_names = tuple(layout["skills"])
+        self.discipline_names = tuple(layout["disciplines"])
+        self.clan_names = tuple(layout["clans"])
+        self.dtype = record_dtype(len(self.attribute_names), len(self.skill_names), len(self.discipline_names))
+        if self.dtype.itemsize != record_size:
+            raise ValueError(f"{self.path}: tamanho de registro {record_size} não bate com o layout ({self.dtype.itemsize})")
+        self.ruleset_hash = rules
+        self.matches_rules = rules == ruleset_hash(self.game_data)
+        self.records = np.frombuffer(self._mmap, dtype=self.dtype, count=count, offset=records_offset)
+        self._heap = memoryview(self._mmap)[heap_offset:heap_offset + heap_size]
+        self._attribute_index = {name: i for i, name in enumerate(self.attribute_names)}
+        self._skill_index = {name: i for i, name in enumerate(self.skill_names)}
+        self._discipline_index = {name: i for i, name in enumerate(self.discipline_names)}
+        self._clan_index = {name: i for i, name in enumerate(self.clan_names)}
+
+    def close(self):
+        # Views do NumPy sobre o mmap precisam sair antes de fechá-lo
+        self.records = None
+        self._heap = None
+        if getattr(self, "_mmap", None) is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                pass  # ainda há arrays do usuário apontando para o arquivo; o mmap fecha quando eles saírem
+            self._mmap = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.records)
+
+    # --- COLUNAS (views, sem cópia) ---
+    def _lookup(self, index, name, kind):
+        i = index.get(name)
+        if i is None:
+            # Aceita apelidos/acentuação das regras carregadas, desde que o nome exista no arquivo
+            i = index.get(self.game_data.ids.table(kind).canonical(name, name))
+        if i is None:
+            raise KeyError(f"'{name}' não existe em {kind} deste roster")
+        return i
+
+    def attribute(self, name):
+        return self.records["attributes"][:, self._lookup(self._attribute_index, name, "attributes")]
+
+    def skill(self, name):
+        return self.records["skills"][:, self._lookup(self._skill_index, name, "skills")]
+
+    def discipline(self, name):
+        return self.records["disciplines"][:, self._lookup(self._discipline_index, name, "disciplines")]
+
+    def clan_id(self, name):
+        return self._lookup(self._clan_index, name, "clans")
+
+    def where(self, clan=None, attributes=None, skills=None, disciplines=None):
+        """
+        Máscara booleana dos registros que batem, ex.: where(clan="Brujah", attributes={"Força": 3})
+        — os valores são mínimos (>=).
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if clan is not None:
+            mask &= self.records["clan"] == self.clan_id(clan)
+        for column, minimums in ((self.attribute, attributes), (self.skill, skills), (self.discipline, disciplines)):
+            for name, minimum in (minimums or {}).items():
+                mask &= column(name) >= minimum
+        return mask
+
+    def clan_counts(self, mask=None):
+        """{clã: quantidade}, opcionalmente só entre os registros de `mask`."""
+        clans = self.records["clan"] if mask is None else self.records["clan"][mask]
+        counts = np.bincount(clans[clans != NO_CLAN], minlength=len(self.clan_names))
+        return {name: int(n) for name, n in zip(self.clan_names, counts) if n}
+
+    # --- TEXTOS E PERSONAGENS ---
+    def _text(self, offset, length):
+        return bytes(self._heap[offset:offset + length]).decode("utf-8")
+
+    def name(self, i):
+        record = self.records[i]
+        return self._text(int(record["name_offset"]), int(record["name_length"]))
+
+    def character(self, i):
+        """Reconstrói o Character do registro `i` (pelos nomes, então funciona mesmo com regras diferentes)."""
+        record = self.records[i]
+        game_data = self.game_data
+        character = game_data.new_character(self.name(i))
+        clan_id = int(record["clan"])
+        if clan_id != NO_CLAN:
+            character.clan = self.clan_names[clan_id]
+            character.bane = game_data.clans_data.get(character.clan, {}).get("bane")
+        if self.matches_rules:
+            character.attribute_dots[:] = record["attributes"].tobytes()
+            character.skill_dots[:] = record["skills"].tobytes()
+        else:
+            attributes, skills = character.attributes, character.skills
+            for name, value in zip(self.attribute_names, record["attributes"].tolist()):
+                if name in attributes:
+                    attributes[name] = value
+            for name, value in zip(self.skill_names, record["skills"].tolist()):
+                if name in skills:
+                    skills[name] = value
+        for d in np.flatnonzero(record["disciplines"]).tolist():
+            character.disciplines[self.discipline_names[d]] = int(record["disciplines"][d])
+        length = int(record["extra_length"])
+        if length:
+            extra = json.loads(self._text(int(record["extra_offset"]), length))
+            for field in BASIC_INFO_FIELDS:
+                setattr(character, field, extra.get(field, ""))
+            for skill, texts in extra.get("specialties", {}).items():
+                for text in texts:
+                    character.add_specialty(skill, text)
+        return character
+
+    def characters(self, indices=None):
+        """Gera os Characters dos índices dados (ex.: np.flatnonzero(where(...))), ou de todos."""
+        for i in (range(len(self)) if indices is None else indices):
+            yield self.character(int(i))
+
+
+def _benchmark(count=1_000_000, seed=0):
+    from npc import generate_npcs
+    from roster import write_jsonl, read_jsonl
+    game_data = load_registry()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "roster.vtmr")
+        start = time.perf_counter()
+        written = write_binary_roster(path, generate_npcs(count, seed, game_data=game_data), game_data)
+        elapsed = time.perf_counter() - start
+        size = os.path.getsize(path)
+        print(f"Gravação: {written:,} NPCs (gerados na hora) em {elapsed:.1f}s; {size / 2**20:,.1f} MiB")
+        with BinaryRoster(path, game_data) as roster:
+            print(f"Registro de {roster.dtype.itemsize} bytes; regras iguais às carregadas: {roster.matches_rules}")
+            start = time.perf_counter()
+            mask = roster.where(clan="Brujah", attributes={"Força": 3})
+            hits = int(np.count_nonzero(mask))
+            elapsed = time.perf_counter() - start
+            scanned = len(roster) * roster.dtype.itemsize
+            print(f"Brujah com Força >= 3: {hits:,} em {elapsed * 1000:.1f} ms "
+                  f"({scanned / elapsed / 2**30:.2f} GiB/s de registros varridos)")
+            start = time.perf_counter()
+            counts = roster.clan_counts(roster.attribute("Força") >= 3)
+            elapsed = time.perf_counter() - start
+            print(f"Força >= 3 por clã em {elapsed * 1000:.1f} ms: {dict(list(counts.items())[:4])}...")
+            first = next(iter(np.flatnonzero(mask)), None)
+            if first is not None:
+                character = roster.character(int(first))
+                print(f"Primeiro: {character.name}, {character.clan}, Força {character.attributes['Força']}")
+        # Referência: a mesma consulta num roster JSONL (parse de cada registro)
+        sample = min(count, 200_000)
+        jsonl = os.path.join(tmp, "roster.jsonl")
+        write_jsonl(jsonl, generate_npcs(sample, seed, game_data=game_data))
+        start = time.perf_counter()
+        hits = sum(1 for c in read_jsonl(jsonl, game_data) if c.clan == "Brujah" and c.attributes["Força"] >= 3)
+        elapsed = time.perf_counter() - start
+        print(f"Mesma consulta em JSONL ({sample:,} registros): {hits:,} em {elapsed:.2f}s "
+              f"(~{elapsed * count / sample:.1f}s para {count:,})")
+
+
+if __name__ == "__main__":
+    _benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
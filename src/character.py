@@ -1,36 +1,342 @@
 # src/character.py
 
+import sys
+import time
+import tracemalloc
+from collections.abc import MutableMapping
+
+_layouts = {}
+# Campos de texto da seção de informações básicas da GUI
+BASIC_INFO_FIELDS = ("chronicle", "sire", "concept", "ambition", "desire", "predator", "player")
+# Campos que, num personagem observado, emitem ("info", campo) ao mudar; os dicionários emitem (campo, None)
+INFO_FIELDS = frozenset(("name", "clan") + BASIC_INFO_FIELDS)
+_OBSERVED_DICTS = frozenset(("disciplines", "specialties"))
+_OBSERVED_FIELDS = INFO_FIELDS | _OBSERVED_DICTS
+
+
+class StatLayout:
+    """Ordem fixa de nomes (atributos ou perícias) -> posição no vetor de pontos. Uma por conjunto de regras."""
+    __slots__ = ("names", "index")
+
+    def __init__(self, names):
+        self.names = tuple(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+
+    def __len__(self):
+        return len(self.names)
+
+    def __reduce__(self):
+        # Ao despicklar (ex.: em outro processo) volta a compartilhar o layout já existente
+        return stat_layout, (self.names,)
+
+
+def stat_layout(names):
+    """Retorna o layout compartilhado para esta sequência de nomes."""
+    names = tuple(names)
+    layout = _layouts.get(names)
+    if layout is None:
+        layout = _layouts[names] = StatLayout(names)
+    return layout
+
+
+_EMPTY_LAYOUT = stat_layout(())
+
+
+class StatView(MutableMapping):
+    """
+    Visão estilo dicionário sobre um trecho do vetor de pontos de um personagem.
+    Com `observer`, cada valor que muda emite observer((kind, nome)).
+    """
+    __slots__ = ("_layout", "_dots", "_offset", "_kind", "_observer")
+
+    def __init__(self, layout, dots, offset, kind=None, observer=None):
+        self._layout = layout
+        self._dots = dots
+        self._offset = offset
+        self._kind = kind
+        self._observer = observer
+
+    @property
+    def layout(self):
+        return self._layout
+
+    def __getitem__(self, name):
+        return self._dots[self._offset + self._layout.index[name]]
+
+    def __setitem__(self, name, value):
+        try:
+            i = self._layout.index[name]
+        except KeyError:
+            raise KeyError(f"'{name}' não faz parte das regras carregadas") from None
+        i += self._offset
+        if self._observer is None:
+            self._dots[i] = value
+        elif self._dots[i] != value:
+            self._dots[i] = value
+            self._observer((self._kind, name))
+
+    def __delitem__(self, name):
+        raise TypeError("Não é possível remover um atributo ou perícia; atribua um novo valor.")
+
+    def get(self, name, default=None):
+        i = self._layout.index.get(name)
+        return default if i is None else self._dots[self._offset + i]
+
+    def __contains__(self, name):
+        return name in self._layout.index
+
+    def __iter__(self):
+        return iter(self._layout.names)
+
+    def __len__(self):
+        return len(self._layout.names)
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+
+class _ObservedDict(dict):
+    """Disciplinas ou especialidades de um personagem observado: qualquer alteração emite (campo, None)."""
+    __slots__ = ("_key", "_observer")
+
+    def __init__(self, values, key, observer):
+        super().__init__(values)
+        self._key = key
+        self._observer = observer
+
+    def _changed(self):
+        self._observer((self._key, None))
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._changed()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._changed()
+
+    def clear(self):
+        if self:
+            super().clear()
+            self._changed()
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self._changed()
+
+    def pop(self, key, *default):
+        value = super().pop(key, *default)
+        self._changed()
+        return value
+
+    def popitem(self):
+        item = super().popitem()
+        self._changed()
+        return item
+
+    def setdefault(self, key, default=None):
+        if key in self:
+            return self[key]
+        self[key] = default
+        return default
+
+
 class Character:
+    __slots__ = ("name", "clan", "disciplines", "bane", "specialties",
+                 "_attribute_layout", "_skill_layout", "_dots", "_observer") + BASIC_INFO_FIELDS
+
     def __init__(self, name):
+        self._observer = None
         self.name = name
         self.clan = None
         self.disciplines = {}
         self.bane = None
-        
-        self.attributes = {}
-        self.skills = {}
         self.specialties = {} # NOVO: Dicionário para guardar as especialidades
+        for field in BASIC_INFO_FIELDS:
+            setattr(self, field, "")
+
+        # Atributos e perícias ficam num único vetor de bytes, na ordem dos layouts
+        self._attribute_layout = _EMPTY_LAYOUT
+        self._skill_layout = _EMPTY_LAYOUT
+        self._dots = bytearray()
+
+    def observe(self, observer):
+        """
+        Passa a emitir cada alteração para observer(chave): ("attributes", nome), ("skills", nome),
+        ("disciplines", None), ("specialties", None) ou ("info", campo). None desliga.
+        Escritas direto em attribute_dots/skill_dots (carga em lote) não emitem nada.
+        """
+        # Só o personagem observado troca de classe para a que intercepta as atribuições;
+        # os demais (criação em lote, importação) não pagam nada por isso
+        self.__class__ = Character if observer is None else _ObservedCharacter
+        self._observer = observer
+        for field in _OBSERVED_DICTS:
+            values = dict(getattr(self, field))
+            object.__setattr__(self, field, values if observer is None else _ObservedDict(values, field, observer))
+
+    def _emit_dot_changes(self, old):
+        """Emite um evento por posição do vetor que mudou em relação a `old` (mesmo layout)."""
+        n_attrs = len(self._attribute_layout)
+        for i, (a, b) in enumerate(zip(old, self._dots)):
+            if a != b:
+                if i < n_attrs:
+                    self._observer(("attributes", self._attribute_layout.names[i]))
+                else:
+                    self._observer(("skills", self._skill_layout.names[i - n_attrs]))
+
+    @property
+    def attributes(self):
+        return StatView(self._attribute_layout, self._dots, 0, "attributes", self._observer)
+
+    @attributes.setter
+    def attributes(self, values):
+        view = self.attributes
+        for name, value in values.items():
+            view[name] = value
+
+    @property
+    def skills(self):
+        return StatView(self._skill_layout, self._dots, len(self._attribute_layout), "skills", self._observer)
+
+    @skills.setter
+    def skills(self, values):
+        view = self.skills
+        for name, value in values.items():
+            view[name] = value
+
+    @property
+    def layouts(self):
+        """(layout dos atributos, layout das perícias), sem montar as StatView."""
+        return self._attribute_layout, self._skill_layout
+
+    @property
+    def dots(self):
+        """Atributos e depois perícias, num só vetor (memoryview, sem cópia)."""
+        return memoryview(self._dots)
+
+    @property
+    def attribute_dots(self):
+        """Pontos dos atributos na ordem do layout (memoryview, sem cópia)."""
+        return memoryview(self._dots)[:len(self._attribute_layout)]
+
+    @property
+    def skill_dots(self):
+        """Pontos das perícias na ordem do layout (memoryview, sem cópia)."""
+        return memoryview(self._dots)[len(self._attribute_layout):]
 
     def set_clan(self, clan_name, clan_data):
         if clan_name in clan_data:
             self.clan = clan_name
-            self.disciplines = clan_data[clan_name]["disciplines"]
+            # As disciplines do clã ficam em clan_data; aqui guardamos apenas os pontos distribuídos
+            self.disciplines = {}
             self.bane = clan_data[clan_name]["bane"]
         else:
             print(f"Erro: Clã '{clan_name}' não encontrado.")
 
     def initialize_stats(self, attributes_data, skills_data):
-        # (Esta função permanece idêntica)
+        attr_layout = stat_layout(a for category in attributes_data.values() for a in category)
+        skill_layout = stat_layout(s for category in skills_data.values() for s in category)
+        self.reset_stats(attr_layout, skill_layout)
+
+    def reset_stats(self, attr_layout, skill_layout):
+        """Como initialize_stats, mas com layouts já resolvidos (caminho rápido para criação em lote)."""
+        if attr_layout is self._attribute_layout and skill_layout is self._skill_layout:
+            # Mesmo conjunto de regras: só zera o vetor existente
+            old = bytes(self._dots) if self._observer is not None else None
+            self._dots[:len(attr_layout)] = b"\x01" * len(attr_layout)
+            self._dots[len(attr_layout):] = bytes(len(skill_layout))
+            if old is not None:
+                self._emit_dot_changes(old)
+        else:
+            self._attribute_layout = attr_layout
+            self._skill_layout = skill_layout
+            self._dots = bytearray(b"\x01" * len(attr_layout) + bytes(len(skill_layout)))
+        self.specialties.clear() # Limpa especialidades ao reiniciar
+
+    def relayout(self, attr_layout, skill_layout):
+        """Passa o personagem para outro layout (regras recarregadas), mantendo os valores pelo nome."""
+        old_attributes, old_skills = dict(self.attributes), dict(self.skills)
+        self._attribute_layout = attr_layout
+        self._skill_layout = skill_layout
+        self._dots = bytearray(b"\x01" * len(attr_layout) + bytes(len(skill_layout)))
+        attributes, skills = self.attributes, self.skills
+        for name, value in old_attributes.items():
+            if name in attr_layout.index: attributes[name] = value
+        for name, value in old_skills.items():
+            if name in skill_layout.index: skills[name] = value
+        for skill in [s for s in self.specialties if s not in skill_layout.index]:
+            del self.specialties[skill]
+
+    def add_specialty(self, skill, specialty_text):
+        """NOVO: Adiciona uma especialidade a uma perícia."""
+        if skill not in self.specialties:
+            self.specialties[skill] = []
+        self.specialties[skill].append(specialty_text)
+        if self._observer is not None:
+            self._observer(("specialties", None))
+
+
+class _ObservedCharacter(Character):
+    """Character com um observador (ver Character.observe): os campos simples também emitem eventos."""
+    __slots__ = ()
+
+    def __setattr__(self, field, value):
+        observer = self._observer if field in _OBSERVED_FIELDS else None
+        if observer is None:
+            object.__setattr__(self, field, value)
+        elif field in _OBSERVED_DICTS:
+            object.__setattr__(self, field, _ObservedDict(value, field, observer))
+            observer((field, None))
+        elif getattr(self, field) != value:
+            object.__setattr__(self, field, value)
+            observer(("info", field))
+
+
+class _DictCharacter:
+    """Representação antiga (um dicionário por estatística), mantida só para o benchmark de memória."""
+    def __init__(self, name):
+        self.name = name
+        self.clan = None
+        self.disciplines = {}
+        self.bane = None
+        self.attributes = {}
+        self.skills = {}
+        self.specialties = {}
+
+    def initialize_stats(self, attributes_data, skills_data):
         for category in attributes_data.values():
             for attr in category:
                 self.attributes[attr] = 1
         for category in skills_data.values():
             for skill in category:
                 self.skills[skill] = 0
-        self.specialties.clear() # Limpa especialidades ao reiniciar
+        self.specialties.clear()
 
-    def add_specialty(self, skill, specialty_text):
-        """NOVO: Adiciona uma especialidade a uma perícia."""
-        if skill not in self.specialties:
-            self.specialties[skill] = []
-        self.specialties[skill].append(specialty_text)
\ No newline at end of file
+
+def _bytes_per_character(cls, attributes_data, skills_data, count):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    roster = []
+    for i in range(count):
+        character = cls("NPC")
+        character.initialize_stats(attributes_data, skills_data)
+        roster.append(character)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # Desconta a própria lista do roster
+    return (after - before - sys.getsizeof(roster)) / count
+
+
+def _benchmark(count=100000):
+    from registry import load_registry
+    game_data = load_registry()
+    start = time.perf_counter()
+    old = _bytes_per_character(_DictCharacter, game_data.attributes_data, game_data.skills_data, count)
+    new = _bytes_per_character(Character, game_data.attributes_data, game_data.skills_data, count)
+    elapsed = time.perf_counter() - start
+    print(f"Dicionários: {old:,.0f} bytes/personagem | compacto: {new:,.0f} bytes/personagem "
+          f"({old / new:.1f}x menor; {count:,} personagens cada, {elapsed:.1f}s)")
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,208 @@
+# src/combat.py
+
+import os
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from dice import roll_pools
+from registry import load_registry
+from roster import read_roster
+
+DEFAULT_CHUNK_SIZE = 2000
+MAX_ROUNDS = 20
+# Mesma conta dos medidores da GUI: Vitalidade = Vigor + 3
+HEALTH_ATTRIBUTE = "Vigor"
+HEALTH_BONUS = 3
+# Paradas de ataque possíveis; o combatente usa a maior
+ATTACK_POOLS = (("Força", "Briga"), ("Destreza", "Armas Brancas"), ("Destreza", "Armas de Fogo"))
+DEFENSE_POOL = ("Destreza", "Atletismo")
+
+# O que a simulação precisa de cada personagem (arrays pequenos, baratos de mandar para os processos)
+CombatProfile = namedtuple("CombatProfile", ["names", "attack", "defense", "health", "hunger", "vampire"])
+
+
+def _stat_ids(game_data):
+    """Posições das estatísticas usadas no combate; nome que não existe nas regras falha aqui."""
+    attributes, skills = game_data.ids.attributes, game_data.ids.skills
+    attack = [(attributes.id(a), skills.id(s)) for a, s in ATTACK_POOLS]
+    defense = (attributes.id(DEFENSE_POOL[0]), skills.id(DEFENSE_POOL[1]))
+    return attack, defense, attributes.id(HEALTH_ATTRIBUTE)
+
+
+def _rule_dots(character, game_data):
+    """Vetores de atributos e perícias no layout das regras (convertidos pelo nome se o personagem usa outro)."""
+    if character.layouts == (game_data.attribute_layout, game_data.skill_layout):
+        return character.attribute_dots, character.skill_dots
+    converted = game_data.new_character()
+    converted.attributes = {n: v for n, v in character.attributes.items() if n in game_data.attribute_layout.index}
+    converted.skills = {n: v for n, v in character.skills.items() if n in game_data.skill_layout.index}
+    return converted.attribute_dots, converted.skill_dots
+
+
+def combat_profile(characters, hunger=1, game_data=None):
+    """
+    Paradas e Vitalidade de um lado do conflito. Personagens com clã são vampiros: rolam com
+    `hunger` dados de Fome e reduzem à metade (para cima) o dano superficial recebido.
+    """
+    game_data = game_data or load_registry()
+    attack_ids, (defense_attr, defense_skill), health_id = _stat_ids(game_data)
+    names, attack, defense, health, vampire = [], [], [], [], []
+    for character in characters:
+        attributes, skills = _rule_dots(character, game_data)
+        names.append(character.name)
+        attack.append(max(attributes[a] + skills[s] for a, s in attack_ids))
+        defense.append(attributes[defense_attr] + skills[defense_skill])
+        health.append(attributes[health_id] + HEALTH_BONUS)
+        vampire.append(bool(character.clan))
+    vampire = np.array(vampire, dtype=bool)
+    return CombatProfile(tuple(names), np.array(attack, dtype=np.int16), np.array(defense, dtype=np.int16),
+                         np.array(health, dtype=np.int16), np.where(vampire, hunger, 0).astype(np.int16), vampire)
+
+
+class CombatStats:
+    """Totais de vários conflitos entre o lado A e o lado B. Somáveis, para juntar os blocos dos processos."""
+    FIELDS = ("conflicts", "wins_a", "wins_b", "draws", "rounds", "survivors_a", "survivors_b")
+
+    def __init__(self, **totals):
+        for field in self.FIELDS:
+            setattr(self, field, int(totals.get(field, 0)))
+
+    def __add__(self, other):
+        return CombatStats(**{f: getattr(self, f) + getattr(other, f) for f in self.FIELDS})
+
+    def __eq__(self, other):
+        return isinstance(other, CombatStats) and all(getattr(self, f) == getattr(other, f) for f in self.FIELDS)
+
+    @property
+    def win_rate_a(self):
+        return self.wins_a / self.conflicts if self.conflicts else 0.0
+
+    @property
+    def win_rate_b(self):
+        return self.wins_b / self.conflicts if self.conflicts else 0.0
+
+    @property
+    def draw_rate(self):
+        return self.draws / self.conflicts if self.conflicts else 0.0
+
+    def summary(self):
+        n = max(self.conflicts, 1)
+        # Intervalo de ~95% da taxa de vitória de A (aproximação normal)
+        margin = 1.96 * (self.win_rate_a * (1 - self.win_rate_a) / n) ** 0.5
+        return (f"{self.conflicts:,} conflitos: A vence {self.win_rate_a:.1%} (±{margin:.1%}), "
+                f"B vence {self.win_rate_b:.1%}, empate/sem vencedor {self.draw_rate:.1%}; "
+                f"{self.rounds / n:.1f} turnos em média; sobreviventes por conflito A {self.survivors_a / n:.2f}, "
+                f"B {self.survivors_b / n:.2f}")
+
+
+def simulate(side_a, side_b, count, rng, max_rounds=MAX_ROUNDS):
+    """
+    `count` conflitos independentes de uma vez (um por linha dos arrays). A cada turno, todo combatente
+    de pé ataca um inimigo de pé sorteado: ataque contra defesa, e a margem vira dano. Os danos do turno
+    são aplicados juntos. Cai quem tem todas as caixas de Vitalidade marcadas.
+    """
+    attack = np.concatenate([side_a.attack, side_b.attack])
+    defense = np.concatenate([side_a.defense, side_b.defense])
+    health = np.concatenate([side_a.health, side_b.health])
+    hunger = np.concatenate([side_a.hunger, side_b.hunger])
+    vampire = np.concatenate([side_a.vampire, side_b.vampire])
+    n_a, n = len(side_a.attack), len(attack)
+    is_a = np.arange(n) < n_a
+    damage = np.zeros((count, n), dtype=np.int16)
+    standing = np.ones((count, n), dtype=bool)
+    rounds = np.zeros(count, dtype=np.int32)
+    for _ in range(max_rounds):
+        fighting = standing[:, is_a].any(axis=1) & standing[:, ~is_a].any(axis=1)
+        if not fighting.any():
+            break
+        rounds += fighting
+        dealt = np.zeros_like(damage)
+        for i in range(n):
+            rows = np.flatnonzero(fighting & standing[:, i])
+            if not len(rows):
+                continue
+            enemies = np.flatnonzero(is_a != is_a[i])
+            # Alvo uniforme entre os inimigos ainda de pé: maior nota aleatória, caídos com nota -1
+            scores = rng.random((len(rows), len(enemies)))
+            scores[~standing[np.ix_(rows, enemies)]] = -1
+            targets = enemies[scores.argmax(axis=1)]
+            hits = roll_pools(np.full(len(rows), attack[i]), hunger[i], 1, rng).successes
+            blocks = roll_pools(defense[targets], hunger[targets], 1, rng).successes
+            margin = np.maximum(hits.astype(np.int16) - blocks, 0)
+            margin = np.where(vampire[targets], (margin + 1) // 2, margin)
+            np.add.at(dealt, (rows, targets), margin)
+        damage += dealt
+        standing = damage < health
+    alive_a = standing[:, is_a].any(axis=1)
+    alive_b = standing[:, ~is_a].any(axis=1)
+    return CombatStats(
+        conflicts=count,
+        wins_a=np.count_nonzero(alive_a & ~alive_b),
+        wins_b=np.count_nonzero(alive_b & ~alive_a),
+        draws=np.count_nonzero(alive_a == alive_b),
+        rounds=rounds.sum(),
+        survivors_a=standing[:, is_a].sum(),
+        survivors_b=standing[:, ~is_a].sum(),
+    )
+
+
+def _simulate_chunk(side_a, side_b, count, seed_seq, max_rounds):
+    return simulate(side_a, side_b, count, np.random.default_rng(seed_seq), max_rounds)
+
+
+def run_conflicts(side_a, side_b, count, seed=0, processes=None, chunk_size=DEFAULT_CHUNK_SIZE, max_rounds=MAX_ROUNDS,
+                  game_data=None):
+    """
+    Roda `count` conflitos entre dois lados (listas de Character ou CombatProfile) num pool de processos.
+    Cada bloco tem a sua SeedSequence, então o resultado só depende de seed e chunk_size.
+    """
+    if not isinstance(side_a, CombatProfile): side_a = combat_profile(side_a, game_data=game_data)
+    if not isinstance(side_b, CombatProfile): side_b = combat_profile(side_b, game_data=game_data)
+    n_chunks = -(-count // chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+    sizes = [min(chunk_size, count - i * chunk_size) for i in range(n_chunks)]
+    processes = processes or os.cpu_count() or 1
+    total = CombatStats()
+    if processes == 1:
+        for size, seed_seq in zip(sizes, seeds):
+            total += _simulate_chunk(side_a, side_b, size, seed_seq, max_rounds)
+        return total
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        for stats in pool.map(_simulate_chunk, [side_a] * n_chunks, [side_b] * n_chunks, sizes, seeds,
+                              [max_rounds] * n_chunks):
+            total += stats
+    return total
+
+
+def _benchmark(count=50_000, seed=0):
+    """Uma coterie de quatro contra três NPCs do Sabá, com o mesmo resultado em 1 e em N processos."""
+    from npc import generate_npcs
+    game_data = load_registry()
+    coterie = list(generate_npcs(4, seed, game_data=game_data, prefix="Coterie"))
+    sabbat = list(generate_npcs(3, seed + 1, game_data=game_data, prefix="Sabá"))
+    side_a, side_b = combat_profile(coterie, game_data=game_data), combat_profile(sabbat, game_data=game_data)
+    for label, side in (("A", side_a), ("B", side_b)):
+        print(f"Lado {label}: " + "; ".join(f"{name} (ataque {a}, defesa {d}, vitalidade {h})"
+                                             for name, a, d, h in zip(side.names, side.attack, side.defense, side.health)))
+    cpus = os.cpu_count() or 1
+    results = {}
+    for processes in sorted({1, cpus}):
+        start = time.perf_counter()
+        results[processes] = stats = run_conflicts(side_a, side_b, count, seed, processes=processes)
+        elapsed = time.perf_counter() - start
+        print(f"{processes} processo(s): {count / elapsed:,.0f} simulações/s ({elapsed:.2f}s)")
+    print(stats.summary())
+    if len({tuple(getattr(s, f) for f in CombatStats.FIELDS) for s in results.values()}) > 1:
+        print("Erro: o resultado mudou com o número de processos!")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3:
+        # python combat.py coterie.jsonl inimigos.csv
+        print(run_conflicts(list(read_roster(sys.argv[1])), list(read_roster(sys.argv[2])), 20_000).summary())
+    else:
+        _benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000)
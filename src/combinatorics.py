@@ -0,0 +1,177 @@
+# src/combinatorics.py
+
+import sys
+import time
+import random
+from math import comb
+from itertools import combinations
+
+from registry import load_registry
+from rules import ATTRIBUTE_STAGES, SKILL_STAGES
+
+
+def combination_rank(n, combo):
+    """Posição de `combo` (índices crescentes) na ordem de itertools.combinations(range(n), len(combo))."""
+    k, rank, prev = len(combo), 0, -1
+    for i, c in enumerate(combo):
+        for j in range(prev + 1, c):
+            rank += comb(n - 1 - j, k - 1 - i)
+        prev = c
+    return rank
+
+
+def combination_unrank(n, k, rank):
+    """Inverso de combination_rank."""
+    combo, j = [], 0
+    for i in range(k):
+        while True:
+            block = comb(n - 1 - j, k - 1 - i)
+            if rank < block:
+                break
+            rank -= block
+            j += 1
+        combo.append(j)
+        j += 1
+    return combo
+
+
+class BuildSpace:
+    """
+    Todas as fichas legais de um passo de criação: `stages` diz quantas colunas recebem cada valor
+    ({4: 1, 3: 3, 2: 4} nos atributos) e as colunas restantes ficam com `rest`. Cada ficha tem um
+    índice inteiro: os passos são dígitos de uma base mista, e cada dígito é a posição (sistema
+    combinatório) das colunas escolhidas entre as que sobraram. Fichas são bytes na ordem de `names`.
+    """
+    def __init__(self, names, stages, rest):
+        self.names = tuple(names)
+        self.stages = tuple(sorted(stages.items(), reverse=True))
+        self.rest = rest
+        n = len(self.names)
+        if sum(k for _, k in self.stages) > n:
+            raise ValueError("Há mais valores a distribuir do que colunas.")
+        self._radices = []
+        for _, k in self.stages:
+            self._radices.append(comb(n, k))
+            n -= k
+
+    @property
+    def count(self):
+        total = 1
+        for radix in self._radices:
+            total *= radix
+        return total
+
+    def rank(self, build):
+        """Índice da ficha (sequência de pontos na ordem de `names`)."""
+        build = bytes(build)
+        if len(build) != len(self.names):
+            raise ValueError(f"Ficha com {len(build)} valores; esperado {len(self.names)}.")
+        remaining = list(range(len(self.names)))
+        rank = 0
+        for (value, k), radix in zip(self.stages, self._radices):
+            chosen = [i for i, column in enumerate(remaining) if build[column] == value]
+            if len(chosen) != k:
+                raise ValueError(f"Ficha ilegal: {len(chosen)} colunas com {value} (esperado {k}).")
+            rank = rank * radix + combination_rank(len(remaining), chosen)
+            for i in reversed(chosen):
+                del remaining[i]
+        if any(build[column] != self.rest for column in remaining):
+            raise ValueError(f"Ficha ilegal: colunas restantes deveriam valer {self.rest}.")
+        return rank
+
+    def unrank(self, rank):
+        if not 0 <= rank < self.count:
+            raise IndexError(f"Índice fora do intervalo: {rank}")
+        digits = []
+        for radix in reversed(self._radices):
+            rank, digit = divmod(rank, radix)
+            digits.append(digit)
+        digits.reverse()
+        build = bytearray([self.rest]) * len(self.names)
+        remaining = list(range(len(self.names)))
+        for (value, k), digit in zip(self.stages, digits):
+            chosen = combination_unrank(len(remaining), k, digit)
+            for i in chosen:
+                build[remaining[i]] = value
+            for i in reversed(chosen):
+                del remaining[i]
+        return bytes(build)
+
+    def __iter__(self):
+        """Todas as fichas, sob demanda, na ordem dos índices (0, 1, 2, ...)."""
+        return self._enumerate(0, list(range(len(self.names))), bytearray([self.rest]) * len(self.names))
+
+    def _enumerate(self, stage, remaining, build):
+        if stage == len(self.stages):
+            yield bytes(build)
+            return
+        value, k = self.stages[stage]
+        for chosen in combinations(range(len(remaining)), k):
+            columns = [remaining[i] for i in chosen]
+            for column in columns:
+                build[column] = value
+            left = [column for i, column in enumerate(remaining) if i not in chosen]
+            yield from self._enumerate(stage + 1, left, build)
+            for column in columns:
+                build[column] = self.rest
+
+    def iter_range(self, start, stop=None):
+        """Fichas com índice em [start, stop) — para dividir uma análise exaustiva entre processos."""
+        stop = self.count if stop is None else min(stop, self.count)
+        for rank in range(start, stop):
+            yield self.unrank(rank)
+
+    def shards(self, parts):
+        """Divide [0, count) em `parts` intervalos (start, stop) quase iguais."""
+        size, extra = divmod(self.count, parts)
+        start = 0
+        for i in range(parts):
+            stop = start + size + (1 if i < extra else 0)
+            yield start, stop
+            start = stop
+
+    def sample(self, rng=None):
+        """Ficha uniforme entre todas as legais."""
+        rng = rng or random
+        return self.unrank(rng.randrange(self.count))
+
+    def as_dict(self, build):
+        return dict(zip(self.names, build))
+
+
+def attribute_space(game_data=None):
+    game_data = game_data or load_registry()
+    return BuildSpace(game_data.attribute_names, ATTRIBUTE_STAGES, 1)
+
+
+def skill_space(game_data=None):
+    game_data = game_data or load_registry()
+    return BuildSpace(game_data.skill_names, SKILL_STAGES, 0)
+
+
+def _benchmark(samples=50_000, seed=0):
+    game_data = load_registry()
+    attributes, skills = attribute_space(game_data), skill_space(game_data)
+    print(f"Atributos: {attributes.count:,} fichas legais; perícias: {skills.count:,}; "
+          f"combinadas: {attributes.count * skills.count:,}")
+    start = time.perf_counter()
+    builds = list(attributes)
+    elapsed = time.perf_counter() - start
+    ok = len(set(builds)) == attributes.count and all(attributes.rank(b) == i for i, b in enumerate(builds))
+    print(f"Enumeração dos atributos: {elapsed * 1000:.1f} ms; índices conferem: {ok}")
+    rng = random.Random(seed)
+    ranks = [rng.randrange(skills.count) for _ in range(samples)]
+    start = time.perf_counter()
+    sampled = [skills.unrank(r) for r in ranks]
+    elapsed = time.perf_counter() - start
+    print(f"Perícias, unrank: {samples / elapsed:,.0f} fichas/s")
+    start = time.perf_counter()
+    back = [skills.rank(b) for b in sampled]
+    elapsed = time.perf_counter() - start
+    print(f"Perícias, rank: {samples / elapsed:,.0f} fichas/s; ida e volta confere: {back == ranks}")
+    first = next(iter(skills))
+    print(f"Primeira ficha de perícias == unrank(0): {first == skills.unrank(0)}")
+
+
+if __name__ == "__main__":
+    _benchmark()
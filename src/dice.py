@@ -0,0 +1,127 @@
+# src/dice.py
+
+import time
+import numpy as np
+
+SUCCESS_FACE = 6   # 6+ é sucesso
+CRITICAL_FACE = 10 # cada par de 10 vale 4 sucessos
+BESTIAL_FACE = 1   # 1 num dado de Fome numa falha = falha bestial
+# Limite de dados sorteados por bloco, para não estourar a memória com milhões de rolagens
+_CHUNK_DICE = 1 << 22
+
+
+class RollResults:
+    """
+    Resultados de um lote de rolagens. Cada campo é um array NumPy com uma posição por rolagem.
+    `critical` inclui os críticos confusos; `messy_critical` é o subconjunto com um 10 num dado de Fome.
+    """
+    __slots__ = ("successes", "win", "critical", "messy_critical", "bestial_failure")
+
+    def __init__(self, successes, win, critical, messy_critical, bestial_failure):
+        self.successes = successes
+        self.win = win
+        self.critical = critical
+        self.messy_critical = messy_critical
+        self.bestial_failure = bestial_failure
+
+    def __len__(self):
+        return len(self.successes)
+
+    def rates(self):
+        """Frequência de cada resultado no lote."""
+        n = max(len(self), 1)
+        return {
+            "success": int(np.count_nonzero(self.win)) / n,
+            "critical": int(np.count_nonzero(self.critical)) / n,
+            "messy_critical": int(np.count_nonzero(self.messy_critical)) / n,
+            "bestial_failure": int(np.count_nonzero(self.bestial_failure)) / n,
+            "mean_successes": float(self.successes.mean()) if len(self) else 0.0,
+        }
+
+
+def dice_pool(character, attribute, skill=None, modifier=0):
+    """Parada de dados de um personagem, ex.: dice_pool(c, "Força", "Briga")."""
+    pool = character.attributes[attribute] + modifier
+    if skill is not None:
+        pool += character.skills[skill]
+    return max(pool, 0)
+
+
+def _resolve_rng(rng):
+    # Aceita um Generator pronto, uma semente inteira ou None
+    return rng if isinstance(rng, np.random.Generator) else np.random.default_rng(rng)
+
+
+def _resolve_chunk(pools, hunger, difficulty, rng, out, start, stop):
+    width = int(pools.max()) if len(pools) else 0
+    if width == 0:
+        faces = np.zeros((len(pools), 0), dtype=np.int8)
+    else:
+        faces = rng.integers(1, 11, size=(len(pools), width), dtype=np.int8)
+    columns = np.arange(width, dtype=np.int16)
+    # Colunas além da parada viram 0 (neutras); as primeiras `hunger` colunas são dados de Fome
+    active = columns < pools[:, None]
+    faces *= active
+    hunger_mask = columns < np.minimum(hunger, pools)[:, None]
+
+    tens = np.count_nonzero(faces == CRITICAL_FACE, axis=1)
+    successes = np.count_nonzero(faces >= SUCCESS_FACE, axis=1) + 2 * (tens // 2)
+    hunger_tens = np.count_nonzero((faces == CRITICAL_FACE) & hunger_mask, axis=1)
+    hunger_ones = np.count_nonzero((faces == BESTIAL_FACE) & hunger_mask, axis=1)
+
+    win = successes >= difficulty
+    critical = win & (tens >= 2)
+    out["successes"][start:stop] = successes
+    out["win"][start:stop] = win
+    out["critical"][start:stop] = critical
+    out["messy_critical"][start:stop] = critical & (hunger_tens > 0)
+    out["bestial_failure"][start:stop] = ~win & (hunger_ones > 0)
+
+
+def roll_pools(pools, hunger=0, difficulty=1, rng=None):
+    """
+    Resolve uma rolagem por posição de `pools`. `hunger` e `difficulty` podem ser escalares
+    ou arrays do mesmo tamanho (uma cena inteira com paradas diferentes numa única chamada).
+    """
+    rng = _resolve_rng(rng)
+    pools = np.atleast_1d(np.asarray(pools, dtype=np.int16))
+    n = len(pools)
+    hunger = np.broadcast_to(np.asarray(hunger, dtype=np.int16), (n,))
+    difficulty = np.broadcast_to(np.asarray(difficulty, dtype=np.int16), (n,))
+    out = {
+        "successes": np.empty(n, dtype=np.int16),
+        "win": np.empty(n, dtype=bool),
+        "critical": np.empty(n, dtype=bool),
+        "messy_critical": np.empty(n, dtype=bool),
+        "bestial_failure": np.empty(n, dtype=bool),
+    }
+    rows = max(_CHUNK_DICE // max(int(pools.max()) if n else 1, 1), 1)
+    for start in range(0, n, rows):
+        stop = min(start + rows, n)
+        _resolve_chunk(pools[start:stop], hunger[start:stop], difficulty[start:stop], rng, out, start, stop)
+    return RollResults(**out)
+
+
+def roll(pool, hunger=0, difficulty=1, count=1, rng=None):
+    """Rola a mesma parada `count` vezes."""
+    return roll_pools(np.full(count, pool, dtype=np.int16), hunger, difficulty, rng)
+
+
+def roll_character(character, attribute, skill=None, hunger=0, difficulty=1, count=1, rng=None, modifier=0):
+    """Atalho: monta a parada a partir do personagem e rola."""
+    return roll(dice_pool(character, attribute, skill, modifier), hunger, difficulty, count, rng)
+
+
+def _benchmark(count=5_000_000, pool=6, hunger=2, difficulty=3, seed=0):
+    rng = np.random.default_rng(seed)
+    start = time.perf_counter()
+    results = roll(pool, hunger, difficulty, count, rng)
+    elapsed = time.perf_counter() - start
+    rates = results.rates()
+    print(f"{count:,} rolagens (parada {pool}, Fome {hunger}, dificuldade {difficulty}) em {elapsed:.2f}s "
+          f"({count / elapsed:,.0f} rolagens/s)")
+    print("  " + ", ".join(f"{k}: {v:.4f}" for k, v in rates.items()))
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -1,37 +1,71 @@
 # src/gui.py
 
 # Imports
+import time
 import customtkinter as ctk
 import tkinter as tk
-from tkinter import messagebox
-import json
-from character import Character
-
-def load_game_data(file_path):
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except Exception as e:
-        print(f"Erro ao carregar {file_path}: {e}")
-        return None
+from tkinter import messagebox, filedialog
+from contextlib import contextmanager
+from character import Character, BASIC_INFO_FIELDS
+from registry import load_registry, reload_registry, RegistryWatcher
+from odds import odds, MAX_HUNGER, MAX_DIFFICULTY
+from sheet import SheetRenderer
+from model import CharacterModel
+from trackers import Tracker, EMPTY, SUPERFICIAL, AGGRAVATED
+from rules import CreationRules, RuleError, SKILL_STAGES
+from roster import character_to_record, record_to_character, write_roster
+from tasks import TaskRunner, export_npcs
+
+# Texto e cor de cada estado das caixas dos medidores
+TRACKER_BOX_STYLES = {EMPTY: ("", "white"), SUPERFICIAL: ("/", "white"), AGGRAVATED: ("X", "#FF4040")}
+# Intervalo (ms) entre as consultas aos arquivos de data/ para recarregar as regras
+RULE_POLL_MS = 1000
+
+class StartupTimer:
+    """Mede o custo de cada seção na abertura da janela e o tempo até a primeira pintura."""
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.timings = {}
+
+    @contextmanager
+    def section(self, name):
+        section_start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - section_start)
+
+    def mark(self, name):
+        """Registra o tempo decorrido desde a criação da janela."""
+        self.record(name, time.perf_counter() - self.start)
+
+    def record(self, name, seconds):
+        self.timings[name] = seconds
+        print(f"[inicialização] {name}: {seconds * 1000:.1f} ms")
+
 
 class App(ctk.CTk):
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, tracker_broker=None, tracker_channel="Jogador", **kwargs):
+        self.startup_timer = StartupTimer()
         super().__init__(*args, **kwargs)
+        # Cliques nos medidores publicados como deltas para o painel do narrador (sync.TrackerBroker)
+        self.tracker_broker = tracker_broker
+        self.tracker_channel = tracker_channel
 
         # Configurações de tema
         ctk.set_appearance_mode("dark")
         ctk.set_default_color_theme("blue")
 
         # --- DADOS DO JOGO E DO PERSONAGEM ---
-        self.MANDATORY_SPECIALTY_SKILLS = ["Acadêmicos", "Ofícios", "Performance", "Ciências"]
-        self.clans_data = load_game_data('data/clans.json')
-        self.attributes_data = load_game_data('data/attributes.json')
-        self.skills_data = load_game_data('data/skills.json')
-        self.disciplines_data = load_game_data('data/disciplines.json')
-        self.clan_list = list(self.clans_data.keys()) if self.clans_data else []
-        self.character = Character("")
-        self.character.initialize_stats(self.attributes_data, self.skills_data)
+        # Toda E/S (regras, ficha, exportações) roda em segundo plano; os resultados voltam por after()
+        self.tasks = TaskRunner(self.after)
+        self.tasks.submit(lambda task: load_registry(), on_done=self._on_registry_ready,
+                          on_error=lambda e: messagebox.showerror("Erro", f"Não foi possível carregar as regras do jogo: {e}"))
+        self._export_task = None
+        self.game_data = None
+        self.clan_list = []
+        self.character = None
+        self._sheet_lines = None # Linhas exibidas da ficha; None até a ficha ser gerada
         
         # Variáveis de controle para a criação
         self.attribute_selection_stage = 4
@@ -39,15 +73,20 @@ class App(ctk.CTk):
         self.selected_secondary_attrs = {}
         self.selected_tertiary_attrs = {}
         self.attribute_widgets = {}
+        self._attribute_chosen_count = 0
         self.skill_selection_stage = 3
         self.selected_skills_by_value = {3: {}, 2: {}, 1: {}}
         self.skill_widgets = {}
+        self._skill_chosen_count = 0
         self.discipline_widgets = {}
         self.selected_discipline_for_2_dots = tk.StringVar(value=None)
 
         # Variáveis para os medidores
-        self.health_tracker_states = []
-        self.willpower_tracker_states = []
+        # Os botões nunca são destruídos: ao diminuir o medidor eles só são escondidos
+        self.health_tracker = Tracker()
+        self.willpower_tracker = Tracker()
+        self.health_tracker_states = self.health_tracker.states
+        self.willpower_tracker_states = self.willpower_tracker.states
         self.health_tracker_buttons = []
         self.willpower_tracker_buttons = []
 
@@ -71,21 +110,166 @@ class App(ctk.CTk):
         self.scrollable_frame.pack(fill="both", expand=True, padx=10, pady=10)
 
         # --- SEÇÕES DA PÁGINA ---
-        self._create_basic_info_section()
+        # Só o topo da página é montado antes da janela aparecer; o resto vem em _build_next_section
+        with self.startup_timer.section("cabeçalho"):
+            self._create_basic_info_section()
         ctk.CTkFrame(self.scrollable_frame, height=2, fg_color="gray30").pack(fill='x', padx=20, pady=20)
-        self._create_status_trackers_section()
-        ctk.CTkFrame(self.scrollable_frame, height=2, fg_color="gray30").pack(fill='x', padx=20, pady=20)
-        self._create_attributes_section()
-        ctk.CTkFrame(self.scrollable_frame, height=2, fg_color="gray30").pack(fill='x', padx=20, pady=20)
-        self._create_skills_section()
-        ctk.CTkFrame(self.scrollable_frame, height=2, fg_color="gray30").pack(fill='x', padx=20, pady=20)
-        self._create_disciplines_section()
+        with self.startup_timer.section("medidores"):
+            self._create_status_trackers_section()
+            # Inicializa os medidores com um valor padrão
+            self._update_tracker_size("health", 5) # Vigor 2 (padrão) + 3 = 5
+            self._update_tracker_size("willpower", 2) # Compostura 1 + Determinação 1 = 2
+
+        self._pending_sections = [
+            ("atributos", self._create_attributes_section),
+            ("perícias", self._create_skills_section),
+            ("disciplinas", self._create_disciplines_section),
+            ("ficha", self._create_final_sheet_section),
+        ]
+        self.after_idle(lambda: self.startup_timer.mark("primeira pintura"))
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+
+    def _on_close(self):
+        self.tasks.shutdown(); self.destroy()
+
+    def _on_registry_ready(self, game_data):
+        self.startup_timer.mark("regras carregadas")
+        self._on_game_data_loaded(game_data)
+        self.after(1, self._build_next_section)
+
+    def _on_game_data_loaded(self, game_data):
+        self._apply_game_data(game_data)
+        self.character = self.rules.new_character("")
+        # Os widgets se inscrevem só nos campos que mostram; eventos agrupados por ciclo ocioso do Tk
+        self.model = CharacterModel(self.character, scheduler=self.after_idle)
+        self.model.subscribe_all(self._on_character_changed)
+        self.clan_menu.configure(values=self.clan_list)
+        if self.clan_list and not self.clan_var.get():
+            self.clan_var.set(self.clan_list[0])
+        # Edições em data/ com o app aberto são aplicadas sem reiniciar
+        self._registry_watcher = RegistryWatcher()
+        self.after(RULE_POLL_MS, self._poll_rule_files)
+
+    def _apply_game_data(self, game_data):
+        # Posições no vetor de atributos usadas pelos medidores; nome inexistente falha aqui, antes de trocar qualquer coisa
+        attribute_ids = game_data.ids.attributes
+        stamina_id, composure_id, resolve_id = attribute_ids.id("Vigor"), attribute_ids.id("Compostura"), attribute_ids.id("Determinação")
+        self.game_data = game_data
+        self.clans_data = game_data.clans_data
+        self.attributes_data = game_data.attributes_data
+        self.skills_data = game_data.skills_data
+        self.disciplines_data = game_data.disciplines_data
+        self.clan_list = game_data.clan_list
+        # Todas as regras de criação ficam em rules.py; a GUI só coleta as escolhas
+        self.rules = CreationRules.from_game_data(game_data)
+        self.MANDATORY_SPECIALTY_SKILLS = self.rules.mandatory_skills
+        self._stamina_id, self._composure_id, self._resolve_id = stamina_id, composure_id, resolve_id
+        self.sheet_renderer = SheetRenderer(game_data)
+
+    def _poll_rule_files(self):
+        """Consulta os arquivos de regras; se algum mudou, relê só ele e atualiza só os widgets afetados."""
+        changed = self._registry_watcher.changed_files()
+        if not changed: self.after(RULE_POLL_MS, self._poll_rule_files); return
+        # A releitura roda em segundo plano; a próxima consulta só é agendada quando ela termina
+        def on_done(result):
+            if result is not None: self._on_rules_reloaded(*result)
+            self.after(RULE_POLL_MS, self._poll_rule_files)
+        def on_error(e):
+            print(f"Erro ao recarregar as regras: {e}"); self.after(RULE_POLL_MS, self._poll_rule_files)
+        self.tasks.submit(lambda task: reload_registry(self.game_data, changed), on_done=on_done, on_error=on_error)
+
+    def _on_rules_reloaded(self, game_data, diff):
+        # Mesmo sem mudança visível (ex.: só apelidos), regras e ficha passam a usar o GameData novo
+        try: self._apply_game_data(game_data)
+        except KeyError as e: messagebox.showerror("Erro nas regras", f"As regras recarregadas não foram aplicadas: {e}"); return
+        if diff.empty: return
+        if diff.layout_changed:
+            self.character.relayout(game_data.attribute_layout, game_data.skill_layout)
+            # Seções ainda não montadas já nascem com as regras novas
+            if hasattr(self, 'attribute_category_frames'): self._reload_attribute_rows(diff)
+            if hasattr(self, 'skill_category_frames'): self._reload_skill_rows(diff)
+        if diff.clan_list_changed:
+            self.clan_menu.configure(values=self.clan_list)
+            if self.clan_var.get() not in self.clans_data: self.clan_var.set(self.clan_list[0] if self.clan_list else "")
+        if (diff.changed_clans or diff.disciplines_changed) and hasattr(self, 'disciplines_container') and self.disciplines_container.winfo_children():
+            self._update_disciplines_display()
+        if self._sheet_lines is not None: self._update_output_text()
+        print(f"Regras recarregadas ({', '.join(diff.files)}): {diff}")
+
+    def _category_frame(self, frames_by_cat, category):
+        """Coluna da categoria; uma categoria nova nos dados ganha uma coluna nova ao lado das outras."""
+        if category not in frames_by_cat:
+            content_frame = next(iter(frames_by_cat.values())).master; column = len(frames_by_cat)
+            frame = ctk.CTkFrame(content_frame); frame.grid(row=0, column=column, sticky="nsew", padx=10, pady=5)
+            content_frame.grid_columnconfigure(column, weight=1)
+            ctk.CTkLabel(frame, text=category, font=self.normal_font).pack(pady=(10,5))
+            frames_by_cat[category] = frame
+        return frames_by_cat[category]
+
+    def _place_row(self, widgets_by_name, names, name):
+        """Uma linha criada depois da montagem entra na ordem do arquivo, antes da próxima linha da categoria."""
+        for following in names[names.index(name) + 1:]:
+            if following in widgets_by_name:
+                widgets_by_name[name]['frame'].pack_configure(before=widgets_by_name[following]['frame']); return
+
+    def _remove_row(self, widgets_by_name, name):
+        widgets = widgets_by_name.pop(name, None)
+        if widgets is None: return
+        for unsubscribe in widgets['unsubscribe']: unsubscribe()
+        widgets['frame'].destroy()
+
+    def _reload_attribute_rows(self, diff):
+        stage = self.attribute_selection_stage
+        for stat in diff.removed_attributes:
+            self._remove_row(self.attribute_widgets, stat)
+            self.selected_secondary_attrs.pop(stat, None); self.selected_tertiary_attrs.pop(stat, None)
+            if self.selected_primary_attr.get() == stat: self.selected_primary_attr.set(None)
+            if stat in getattr(self, '_odds_subscriptions', {}): self._odds_subscriptions.pop(stat)()
+        for stat in diff.added_attributes:
+            category = self.game_data.attribute_category[stat]
+            self._create_attribute_row(self._category_frame(self.attribute_category_frames, category), stat)
+            self._place_row(self.attribute_widgets, self.attributes_data[category], stat)
+            widgets = self.attribute_widgets[stat]; value = self.character.attributes[stat]
+            widgets['value_label'].configure(text=str(value))
+            # A linha nova entra na etapa em andamento, como as que ainda não foram escolhidas
+            if stage == 4: self._show_attribute_selector(stat, 'radio')
+            else:
+                self._show_attribute_selector(stat, 'checkbox'); widgets['var'].set(value > 1)
+                selectable = self._selectable_attributes()[1]
+                if value == 1 and stage in (3, 2): selectable[stat] = widgets['var']
+                else: widgets['checkbox'].configure(state="disabled")
+            if hasattr(self, 'odds_attribute_menu'): self._subscribe_odds_attribute(stat)
+        self._update_attribute_locks()
+        if hasattr(self, 'odds_attribute_menu'):
+            attribute_names = list(self.game_data.attribute_names); self.odds_attribute_menu.configure(values=attribute_names)
+            if self.odds_attribute_var.get() not in self.game_data.attribute_layout.index: self.odds_attribute_var.set(attribute_names[0] if attribute_names else "")
+
+    def _reload_skill_rows(self, diff):
+        stage = self.skill_selection_stage
+        for skill in diff.removed_skills:
+            self._remove_row(self.skill_widgets, skill)
+            for selectable in self.selected_skills_by_value.values(): selectable.pop(skill, None)
+        for skill in diff.added_skills:
+            category = self.game_data.skill_category[skill]; var = tk.BooleanVar()
+            self._create_skill_row(self._category_frame(self.skill_category_frames, category), skill, var, command=lambda s=skill: self._on_skill_toggle(s))
+            self._place_row(self.skill_widgets, self.skills_data[category], skill)
+            value = self.character.skills[skill]; var.set(value > 0)
+            self.skill_widgets[skill]['value_label'].configure(text=str(value))
+            if stage in SKILL_STAGES and value == 0: self.selected_skills_by_value[stage][skill] = var
+            else: self.skill_widgets[skill]['selector'].configure(state="disabled")
+        self._update_skill_locks()
+        self._update_skill_odds()
+
+    def _build_next_section(self):
+        """Monta uma seção por vez, devolvendo o controle ao Tk entre elas para a janela continuar pintando."""
+        name, build = self._pending_sections.pop(0)
         ctk.CTkFrame(self.scrollable_frame, height=2, fg_color="gray30").pack(fill='x', padx=20, pady=20)
-        self._create_final_sheet_section()
-        
-        # Inicializa os medidores com um valor padrão
-        self._update_tracker_size("health", 5) # Vigor 2 (padrão) + 3 = 5
-        self._update_tracker_size("willpower", 2) # Compostura 1 + Determinação 1 = 2
+        with self.startup_timer.section(name):
+            build()
+        if self._pending_sections:
+            self.after(1, self._build_next_section)
+        else:
+            self.startup_timer.mark("interface completa")
 
     def _create_basic_info_section(self):
         header_frame = ctk.CTkFrame(self.scrollable_frame, fg_color="#1A1A1A", corner_radius=0)
@@ -130,6 +314,7 @@ class App(ctk.CTk):
                         font=self.normal_font
                     )
                     menu.pack(fill="x")
+                    setattr(self, var_name, menu)
                     
                     # --- CORREÇÃO APLICADA AQUI ---
                     # A linha foi movida para DENTRO do bloco 'elif'.
@@ -199,28 +384,39 @@ class App(ctk.CTk):
         create_button.pack(pady=(10, 15))
         self.output_text = ctk.CTkTextbox(final_frame, font=("Courier New", 12), height=400, activate_scrollbars=True)
         self.output_text.pack(fill="both", expand=True); self.output_text.configure(state="disabled")
-
-    def _create_tracker_row(self, container, tracker_type, size):
-        states_list = getattr(self, f"{tracker_type}_tracker_states")
-        buttons_list = getattr(self, f"{tracker_type}_tracker_buttons")
-        for i in range(size):
-            button = ctk.CTkButton(container, text="", width=28, height=28, font=self.tracker_font, fg_color="#343638", border_width=2, border_color="gray50", hover_color="gray25", command=lambda t=tracker_type, idx=i: self._on_tracker_click(t, idx))
-            button.grid(row=0, column=i, padx=3)
-            buttons_list.append(button); states_list.append(0)
+        export_frame = ctk.CTkFrame(final_frame, fg_color="transparent"); export_frame.pack(fill="x", pady=(10, 0))
+        self.save_sheet_button = ctk.CTkButton(export_frame, text="Salvar Ficha...", command=self.save_sheet, width=140); self.save_sheet_button.pack(side="left")
+        self.export_npcs_button = ctk.CTkButton(export_frame, text="Exportar NPCs...", command=self.export_npcs, width=140); self.export_npcs_button.pack(side="left", padx=10)
+        self.cancel_export_button = ctk.CTkButton(export_frame, text="Cancelar", command=self.cancel_export, width=80, state="disabled"); self.cancel_export_button.pack(side="right")
+        self.export_status_label = ctk.CTkLabel(export_frame, text="", font=self.normal_font, width=160); self.export_status_label.pack(side="right", padx=10)
+        self.export_progress = ctk.CTkProgressBar(export_frame); self.export_progress.pack(side="right", fill="x", expand=True); self.export_progress.set(0)
+
+    def _create_tracker_button(self, container, tracker_type, index):
+        button = ctk.CTkButton(container, text="", width=28, height=28, font=self.tracker_font, fg_color="#343638", border_width=2, border_color="gray50", hover_color="gray25", command=lambda t=tracker_type, idx=index: self._on_tracker_click(t, idx))
+        button.grid(row=0, column=index, padx=3)
+        return button
+
+    def _paint_tracker_box(self, tracker_type, index, state):
+        text, color = TRACKER_BOX_STYLES[state]
+        getattr(self, f"{tracker_type}_tracker_buttons")[index].configure(text=text, text_color=color)
 
     def _on_tracker_click(self, tracker_type, index):
-        states_list = getattr(self, f"{tracker_type}_tracker_states"); buttons_list = getattr(self, f"{tracker_type}_tracker_buttons")
-        states_list[index] = (states_list[index] + 1) % 3
-        new_state = states_list[index]; button_to_update = buttons_list[index]
-        if new_state == 0: button_to_update.configure(text="", text_color="white")
-        elif new_state == 1: button_to_update.configure(text="/", text_color="white")
-        elif new_state == 2: button_to_update.configure(text="X", text_color="#FF4040")
+        new_state = getattr(self, f"{tracker_type}_tracker").cycle(index)
+        self._paint_tracker_box(tracker_type, index, new_state)
+        if self.tracker_broker is not None: self.tracker_broker.publish(self.tracker_channel, tracker_type, index, new_state)
 
     def _update_tracker_size(self, tracker_type, new_size):
-        container = getattr(self, f"{tracker_type}_tracker_container"); buttons_list = getattr(self, f"{tracker_type}_tracker_buttons"); states_list = getattr(self, f"{tracker_type}_tracker_states")
-        for widget in container.winfo_children(): widget.destroy()
-        buttons_list.clear(); states_list.clear()
-        self._create_tracker_row(container, tracker_type, new_size)
+        """Só cria, mostra ou esconde as caixas da diferença; todas mantêm o dano marcado, inclusive as escondidas."""
+        container = getattr(self, f"{tracker_type}_tracker_container"); buttons_list = getattr(self, f"{tracker_type}_tracker_buttons")
+        tracker = getattr(self, f"{tracker_type}_tracker")
+        old_size = tracker.size
+        tracker.resize(new_size)
+        for i in range(tracker.size, old_size): buttons_list[i].grid_remove()
+        for i in range(old_size, tracker.size):
+            if i < len(buttons_list): buttons_list[i].grid()
+            else: buttons_list.append(self._create_tracker_button(container, tracker_type, i))
+            self._paint_tracker_box(tracker_type, i, tracker.states[i])
+        if self.tracker_broker is not None and tracker.size != old_size: self.tracker_broker.publish_resize(self.tracker_channel, tracker_type, tracker.size)
     
     def _populate_attribute_frame(self, parent_frame):
         header_frame = ctk.CTkFrame(parent_frame, fg_color="transparent"); header_frame.pack(fill="x", pady=5)
@@ -233,7 +429,7 @@ class App(ctk.CTk):
         soc_frame = ctk.CTkFrame(content_frame); soc_frame.grid(row=0, column=1, sticky="nsew", padx=10, pady=5)
         ment_frame = ctk.CTkFrame(content_frame); ment_frame.grid(row=0, column=2, sticky="nsew", padx=10, pady=5)
         content_frame.grid_columnconfigure((0,1,2), weight=1)
-        frames_by_cat = {"Físico": phys_frame, "Social": soc_frame, "Mental": ment_frame}
+        frames_by_cat = self.attribute_category_frames = {"Físico": phys_frame, "Social": soc_frame, "Mental": ment_frame}
         for category, stats in self.attributes_data.items():
             parent = frames_by_cat[category]; ctk.CTkLabel(parent, text=category, font=self.normal_font).pack(pady=(10,5))
             for stat in stats: self._create_attribute_row(parent, stat)
@@ -244,15 +440,39 @@ class App(ctk.CTk):
         button_frame = ctk.CTkFrame(header_frame, fg_color="transparent"); button_frame.pack(side="right")
         reset_button = ctk.CTkButton(button_frame, text="Resetar", command=self.reset_skills, width=80); reset_button.pack(side="right", padx=5)
         self.confirm_skill_button = ctk.CTkButton(button_frame, text="Confirmar Passo", command=self.confirm_skill_step, width=120); self.confirm_skill_button.pack(side="right")
+        self._create_odds_controls(parent_frame)
         content_frame = ctk.CTkFrame(parent_frame, fg_color="transparent"); content_frame.pack(fill="both", expand=True, pady=10)
         tal_frame = ctk.CTkFrame(content_frame); tal_frame.grid(row=0, column=0, sticky="nsew", padx=10, pady=5)
         per_frame = ctk.CTkFrame(content_frame); per_frame.grid(row=0, column=1, sticky="nsew", padx=10, pady=5)
         con_frame = ctk.CTkFrame(content_frame); con_frame.grid(row=0, column=2, sticky="nsew", padx=10, pady=5)
         content_frame.grid_columnconfigure((0,1,2), weight=1)
-        frames_by_cat = {"Talentos": tal_frame, "Perícias": per_frame, "Conhecimentos": con_frame}
+        frames_by_cat = self.skill_category_frames = {"Talentos": tal_frame, "Perícias": per_frame, "Conhecimentos": con_frame}
         for category, skills in self.skills_data.items():
             parent = frames_by_cat[category]; ctk.CTkLabel(parent, text=category, font=self.normal_font).pack(pady=(10,5))
-            for skill in skills: var = tk.BooleanVar(); self._create_skill_row(parent, skill, var, command=self._update_skill_locks); self.selected_skills_by_value[3][skill] = var
+            for skill in skills: var = tk.BooleanVar(); self._create_skill_row(parent, skill, var, command=lambda s=skill: self._on_skill_toggle(s)); self.selected_skills_by_value[3][skill] = var
+        self._update_skill_odds()
+
+    def _create_odds_controls(self, parent_frame):
+        """Atributo, Fome e dificuldade usados para mostrar a chance de sucesso ao lado de cada perícia."""
+        odds_frame = ctk.CTkFrame(parent_frame, fg_color="transparent"); odds_frame.pack(fill="x", padx=10)
+        attribute_names = list(self.game_data.attribute_names)
+        self.odds_attribute_var = tk.StringVar(value=attribute_names[0] if attribute_names else "")
+        self.odds_hunger_var = tk.StringVar(value="1")
+        self.odds_difficulty_var = tk.StringVar(value="3")
+        controls = [("Chances com:", self.odds_attribute_var, attribute_names),
+                    ("Fome:", self.odds_hunger_var, [str(i) for i in range(MAX_HUNGER + 1)]),
+                    ("Dificuldade:", self.odds_difficulty_var, [str(i) for i in range(1, MAX_DIFFICULTY + 1)])]
+        # As chances de todas as perícias dependem do atributo escolhido no menu
+        self._odds_subscriptions = {}
+        for attribute in attribute_names: self._subscribe_odds_attribute(attribute)
+        menus = []
+        for label, var, values in controls:
+            ctk.CTkLabel(odds_frame, text=label, font=self.normal_font).pack(side="left", padx=(10, 5))
+            menu = ctk.CTkOptionMenu(odds_frame, variable=var, values=values, width=70 if values and len(values[0]) < 3 else 140, font=self.normal_font, command=lambda _: self._update_skill_odds()); menu.pack(side="left"); menus.append(menu)
+        self.odds_attribute_menu = menus[0]
+
+    def _subscribe_odds_attribute(self, attribute):
+        self._odds_subscriptions[attribute] = self.model.subscribe(("attributes", attribute), lambda _, a=attribute: self._update_skill_odds() if a == self.odds_attribute_var.get() else None)
     
     def _populate_disciplines_frame(self, parent_frame):
         """Cria a interface para a seleção de Disciplinas."""
@@ -321,69 +541,115 @@ class App(ctk.CTk):
             self.discipline_widgets[discipline_name] = selector
         
     def _create_attribute_row(self, parent, stat_name):
+        # Cada linha tem os dois seletores desde o início; as etapas só alternam qual está visível
         row_frame = ctk.CTkFrame(parent, fg_color="transparent"); row_frame.pack(fill="x", padx=15, pady=4)
-        selector = ctk.CTkRadioButton(row_frame, text=stat_name, variable=self.selected_primary_attr, value=stat_name, font=self.normal_font, fg_color=("#9A0000", "#700000"), border_color="#500000", hover_color="#B50000"); selector.pack(side="left")
+        radio = ctk.CTkRadioButton(row_frame, text=stat_name, variable=self.selected_primary_attr, value=stat_name, font=self.normal_font, fg_color=("#9A0000", "#700000"), border_color="#500000", hover_color="#B50000"); radio.pack(side="left")
+        var = tk.BooleanVar()
+        checkbox = ctk.CTkCheckBox(row_frame, text=stat_name, variable=var, command=lambda s=stat_name: self._on_attribute_toggle(s), font=self.normal_font)
         value_label = ctk.CTkLabel(row_frame, text="1", font=self.normal_font, width=30); value_label.pack(side="right", padx=10)
-        self.attribute_widgets[stat_name] = {'frame': row_frame, 'selector': selector, 'value_label': value_label}
-        
+        unsubscribe = self.model.subscribe(("attributes", stat_name), lambda _, s=stat_name: value_label.configure(text=str(self.character.attributes[s])))
+        self.attribute_widgets[stat_name] = {'frame': row_frame, 'selector': radio, 'radio': radio, 'checkbox': checkbox, 'var': var, 'value_label': value_label, 'unsubscribe': [unsubscribe]}
+
+    def _show_attribute_selector(self, stat, mode):
+        """Troca o seletor visível da linha ('radio' ou 'checkbox') sem recriar widgets."""
+        widgets = self.attribute_widgets[stat]
+        new_selector = widgets[mode]
+        if widgets['selector'] is not new_selector:
+            widgets['selector'].pack_forget()
+            new_selector.pack(side="left", before=widgets['value_label'])
+            widgets['selector'] = new_selector
+        new_selector.configure(state="normal")
+
     def _create_skill_row(self, parent, skill_name, var, command):
         row_frame = ctk.CTkFrame(parent, fg_color="transparent"); row_frame.pack(fill="x", padx=15, pady=4)
         selector = ctk.CTkCheckBox(row_frame, text=skill_name, variable=var, font=self.normal_font, command=command); selector.pack(side="left")
         value_label = ctk.CTkLabel(row_frame, text="0", font=self.normal_font, width=30); value_label.pack(side="right", padx=10)
-        self.skill_widgets[skill_name] = {'selector': selector, 'value_label': value_label, 'var': var}
+        odds_label = ctk.CTkLabel(row_frame, text="", font=self.normal_font, width=45, text_color="gray60"); odds_label.pack(side="right")
+        unsubscribe = self.model.subscribe(("skills", skill_name), lambda _, s=skill_name: self._on_skill_changed(s))
+        self.skill_widgets[skill_name] = {'frame': row_frame, 'selector': selector, 'value_label': value_label, 'odds_label': odds_label, 'var': var, 'unsubscribe': [unsubscribe]}
+
+    def _on_skill_changed(self, skill):
+        self.skill_widgets[skill]['value_label'].configure(text=str(self.character.skills[skill]))
+        self._update_skill_odds([skill])
+
+    def _update_skill_odds(self, skills=None):
+        """Atualiza a chance de sucesso das perícias (consulta em tempo constante na tabela de odds)."""
+        attribute = self.odds_attribute_var.get()
+        base_pool = self.character.attributes.get(attribute, 0)
+        hunger = int(self.odds_hunger_var.get()); difficulty = int(self.odds_difficulty_var.get())
+        for skill in (self.skill_widgets if skills is None else skills):
+            chance = odds(base_pool + self.character.skills[skill], hunger, difficulty)
+            self.skill_widgets[skill]['odds_label'].configure(text=f"{chance.success:.0%}")
         
+    def _selectable_attributes(self):
+        if self.attribute_selection_stage == 3: return 3, self.selected_secondary_attrs
+        if self.attribute_selection_stage == 2: return 4, self.selected_tertiary_attrs
+        return None, {}
+
     def _update_attribute_locks(self):
-        if self.attribute_selection_stage == 3: limit, selectable_attrs = 3, self.selected_secondary_attrs
-        elif self.attribute_selection_stage == 2: limit, selectable_attrs = 4, self.selected_tertiary_attrs
-        else: return
-        chosen_count = sum(1 for var in selectable_attrs.values() if var.get());
-        for stat, var in selectable_attrs.items():
-            if not var.get(): self.attribute_widgets[stat]['selector'].configure(state="normal" if chosen_count < limit else "disabled")
-            
+        """Recalcula a contagem e as travas do zero. Usado só nas trocas de etapa; os cliques usam _on_attribute_toggle."""
+        limit, selectable_attrs = self._selectable_attributes()
+        if limit is None: return
+        self._attribute_chosen_count = sum(1 for var in selectable_attrs.values() if var.get())
+        self._set_unchecked_state(selectable_attrs, self.attribute_widgets, "normal" if self._attribute_chosen_count < limit else "disabled")
+
+    def _on_attribute_toggle(self, stat):
+        limit, selectable_attrs = self._selectable_attributes()
+        if stat not in selectable_attrs: return
+        checked = selectable_attrs[stat].get()
+        self._attribute_chosen_count += 1 if checked else -1
+        # Só ao atingir ou sair do limite é preciso mexer nos outros seletores
+        if checked and self._attribute_chosen_count == limit: self._set_unchecked_state(selectable_attrs, self.attribute_widgets, "disabled")
+        elif not checked and self._attribute_chosen_count == limit - 1: self._set_unchecked_state(selectable_attrs, self.attribute_widgets, "normal")
+
+    def _set_unchecked_state(self, selectable, widgets_by_name, state):
+        for name, var in selectable.items():
+            if not var.get(): widgets_by_name[name]['selector'].configure(state=state)
+
     # --- FUNÇÃO PRINCIPAL MODIFICADA ---
     def confirm_attribute_step(self):
         if self.attribute_selection_stage == 4:
             primary = self.selected_primary_attr.get()
             if not primary or primary == 'None': messagebox.showerror("Seleção Incompleta", "Você deve selecionar um Atributo Primário."); return
-            self.character.attributes[primary] = 4; self.attribute_widgets[primary]['value_label'].configure(text="4"); self.attribute_widgets[primary]['selector'].configure(state="disabled")
+            try: self.rules.apply_attribute_stage(self.character, 4, [primary])
+            except RuleError as e: messagebox.showerror(e.title, e.message); return
+            self.attribute_widgets[primary]['selector'].configure(state="disabled")
             self.attribute_selection_stage = 3
             self.attribute_instruction_label.configure(text="Passo 2: Escolha 3 Atributos Secundários (3 pontos)")
             for stat, widgets in self.attribute_widgets.items():
                 if stat != primary:
-                    var = tk.BooleanVar(); widgets['selector'].destroy()
-                    new_selector = ctk.CTkCheckBox(widgets['frame'], text=stat, variable=var, command=self._update_attribute_locks, font=self.normal_font)
-                    new_selector.pack(side="left")
-                    widgets['selector'] = new_selector; self.selected_secondary_attrs[stat] = var
+                    widgets['var'].set(False); self._show_attribute_selector(stat, 'checkbox')
+                    self.selected_secondary_attrs[stat] = widgets['var']
+            self._attribute_chosen_count = 0
             return
 
         if self.attribute_selection_stage == 3:
             chosen_secondaries = [stat for stat, var in self.selected_secondary_attrs.items() if var.get()]
-            if len(chosen_secondaries) != 3: messagebox.showerror("Seleção Inválida", "Você deve escolher exatamente 3 Atributos Secundários."); return
-            for stat in chosen_secondaries: self.character.attributes[stat] = 3; self.attribute_widgets[stat]['value_label'].configure(text="3"); self.attribute_widgets[stat]['selector'].configure(state="disabled")
+            try: self.rules.apply_attribute_stage(self.character, 3, chosen_secondaries)
+            except RuleError as e: messagebox.showerror(e.title, e.message); return
+            for stat in chosen_secondaries: self.attribute_widgets[stat]['selector'].configure(state="disabled")
             self.attribute_selection_stage = 2
             self.attribute_instruction_label.configure(text="Passo 3: Escolha 4 Atributos Terciários (2 pontos)")
             remaining_stats = self.selected_secondary_attrs.keys() - set(chosen_secondaries)
             for stat in remaining_stats:
-                widgets = self.attribute_widgets[stat]; var = tk.BooleanVar(); widgets['selector'].destroy()
-                new_selector = ctk.CTkCheckBox(widgets['frame'], text=stat, variable=var, command=self._update_attribute_locks, font=self.normal_font)
-                new_selector.pack(side="left")
-                widgets['selector'] = new_selector; self.selected_tertiary_attrs[stat] = var
-            self._update_attribute_locks()
+                widgets = self.attribute_widgets[stat]; widgets['var'].set(False); self._show_attribute_selector(stat, 'checkbox')
+                self.selected_tertiary_attrs[stat] = widgets['var']
+            self._attribute_chosen_count = 0
             return
             
         if self.attribute_selection_stage == 2:
             chosen_tertiaries = [stat for stat, var in self.selected_tertiary_attrs.items() if var.get()]
-            if len(chosen_tertiaries) != 4: messagebox.showerror("Seleção Inválida", "Você deve escolher exatamente 4 Atributos Terciários."); return
-            for stat in chosen_tertiaries: self.character.attributes[stat] = 2; self.attribute_widgets[stat]['value_label'].configure(text="2"); self.attribute_widgets[stat]['selector'].configure(state="disabled")
+            try: self.rules.apply_attribute_stage(self.character, 2, chosen_tertiaries)
+            except RuleError as e: messagebox.showerror(e.title, e.message); return
+            for stat in chosen_tertiaries: self.attribute_widgets[stat]['selector'].configure(state="disabled")
             self.attribute_selection_stage = 0
             self.attribute_instruction_label.configure(text="Atributos Distribuídos!"); self.confirm_attr_button.configure(state="disabled")
             for stat in self.selected_tertiary_attrs.keys() - set(chosen_tertiaries): self.attribute_widgets[stat]['selector'].configure(state="disabled")
             
             # --- PARTE NOVA: CÁLCULO E ATUALIZAÇÃO DOS MEDIDORES ---
             # Após a distribuição final, pegamos os valores e atualizamos os medidores
-            stamina = self.character.attributes.get("Vigor", 1)
-            composure = self.character.attributes.get("Compostura", 1)
-            resolve = self.character.attributes.get("Determinação", 1)
+            dots = self.character.attribute_dots
+            stamina, composure, resolve = dots[self._stamina_id], dots[self._composure_id], dots[self._resolve_id]
             
             self._update_tracker_size("health", stamina + 3)
             self._update_tracker_size("willpower", composure + resolve)
@@ -392,7 +658,8 @@ class App(ctk.CTk):
 
     # --- FUNÇÃO DE RESET MODIFICADA ---
     def reset_attributes(self):
-        self.character.initialize_stats(self.attributes_data, self.skills_data)
+        # Volta só os atributos para 1; as perícias têm o seu próprio reset
+        self.character.attributes = dict.fromkeys(self.character.attributes, 1)
         self.attribute_selection_stage = 4
         self.selected_primary_attr.set(None)
         self.selected_secondary_attrs.clear()
@@ -400,11 +667,8 @@ class App(ctk.CTk):
         self.attribute_instruction_label.configure(text="Passo 1: Escolha seu Atributo Primário (4 pontos)")
         self.confirm_attr_button.configure(state="normal")
         for stat, widgets in self.attribute_widgets.items():
-            widgets['value_label'].configure(text="1")
-            widgets['selector'].destroy()
-            new_selector = ctk.CTkRadioButton(widgets['frame'], text=stat, variable=self.selected_primary_attr, value=stat, font=self.normal_font, fg_color=("#9A0000", "#700000"), border_color="#500000", hover_color="#B50000")
-            new_selector.pack(side="left")
-            widgets['selector'] = new_selector
+            widgets['var'].set(False); self._show_attribute_selector(stat, 'radio')
+        self._attribute_chosen_count = 0
         
         # Reseta os medidores para o tamanho padrão também
         self._update_tracker_size("health", 5)
@@ -412,19 +676,29 @@ class App(ctk.CTk):
 
     # ... (O resto do código permanece o mesmo)
     def _update_skill_locks(self):
-        limits = {3: 3, 2: 5, 1: 7}; stage = self.skill_selection_stage
+        """Recalcula a contagem e as travas do zero. Usado só nas trocas de etapa; os cliques usam _on_skill_toggle."""
+        limits = SKILL_STAGES; stage = self.skill_selection_stage
         if stage not in limits: return
         limit, selectable_skills = limits[stage], self.selected_skills_by_value[stage]
-        chosen_count = sum(1 for var in selectable_skills.values() if var.get())
-        for skill, var in selectable_skills.items():
-            if not var.get(): self.skill_widgets[skill]['selector'].configure(state="normal" if chosen_count < limit else "disabled")
+        self._skill_chosen_count = sum(1 for var in selectable_skills.values() if var.get())
+        self._set_unchecked_state(selectable_skills, self.skill_widgets, "normal" if self._skill_chosen_count < limit else "disabled")
+
+    def _on_skill_toggle(self, skill):
+        stage = self.skill_selection_stage
+        if stage not in SKILL_STAGES or skill not in self.selected_skills_by_value[stage]: return
+        limit, selectable_skills = SKILL_STAGES[stage], self.selected_skills_by_value[stage]
+        checked = selectable_skills[skill].get()
+        self._skill_chosen_count += 1 if checked else -1
+        if checked and self._skill_chosen_count == limit: self._set_unchecked_state(selectable_skills, self.skill_widgets, "disabled")
+        elif not checked and self._skill_chosen_count == limit - 1: self._set_unchecked_state(selectable_skills, self.skill_widgets, "normal")
             
     def confirm_skill_step(self):
-        stage = self.skill_selection_stage; limits = {3: 3, 2: 5, 1: 7}
+        stage = self.skill_selection_stage; limits = SKILL_STAGES
         if stage not in limits: return
         chosen = [skill for skill, var in self.selected_skills_by_value[stage].items() if var.get()]
-        if len(chosen) != limits[stage]: messagebox.showerror("Seleção Inválida", f"Você deve escolher exatamente {limits[stage]} Perícias."); return
-        for skill in chosen: self.character.skills[skill] = stage; self.skill_widgets[skill]['value_label'].configure(text=str(stage)); self.skill_widgets[skill]['selector'].configure(state="disabled")
+        try: self.rules.apply_skill_stage(self.character, stage, chosen)
+        except RuleError as e: messagebox.showerror(e.title, e.message); return
+        for skill in chosen: self.skill_widgets[skill]['selector'].configure(state="disabled")
         next_stage = stage - 1; self.skill_selection_stage = next_stage
         if next_stage > 0:
             self.skill_instruction_label.configure(text=f"Passo {4-next_stage}: Escolha {limits[next_stage]} Perícias ({next_stage} pontos)")
@@ -438,11 +712,12 @@ class App(ctk.CTk):
             self.selected_skills_by_value[stage].clear()
             
     def reset_skills(self):
-        self.character.initialize_stats(self.attributes_data, self.skills_data)
+        # Volta só as perícias (e especialidades) para 0; os atributos têm o seu próprio reset
+        self.character.skills = dict.fromkeys(self.character.skills, 0); self.character.specialties.clear()
         self.skill_selection_stage = 3; self.selected_skills_by_value = {3: {}, 2: {}, 1: {}}
         self.skill_instruction_label.configure(text="Passo 1: Escolha 3 Perícias (3 pontos)"); self.confirm_skill_button.configure(state="normal")
         for skill, widgets in self.skill_widgets.items():
-            widgets['value_label'].configure(text="0"); widgets['selector'].configure(state="normal")
+            widgets['selector'].configure(state="normal")
             widgets['var'].set(False); self.selected_skills_by_value[3][skill] = widgets['var']
         self._update_skill_locks()
         
@@ -452,6 +727,8 @@ class App(ctk.CTk):
             return
             
         self.character.name = self.name_entry.get()
+        for field in BASIC_INFO_FIELDS:
+            setattr(self.character, field, getattr(self, f"{field}_entry").get().strip())
         if not self.character.name:
             messagebox.showerror("Erro", "Personagem precisa de um nome.")
             return
@@ -459,29 +736,76 @@ class App(ctk.CTk):
         # --- CORREÇÃO AQUI ---
         # Trocamos 'self.clan_menu_var' para 'self.clan_var'
         selected_clan = self.clan_var.get()
-        self.character.set_clan(selected_clan, self.clans_data)
-
         disc_with_2_dots = self.selected_discipline_for_2_dots.get()
-        if not disc_with_2_dots or disc_with_2_dots == "None":
-            messagebox.showerror("Erro de Disciplina", "Clique em 'Confirmar Clã' e selecione a Disciplina de 2 pontos.")
+        try:
+            self.rules.assign_disciplines(self.character, selected_clan, disc_with_2_dots)
+        except RuleError as e:
+            messagebox.showerror(e.title, e.message)
             return
 
-        self.character.disciplines.clear()
-        self.character.disciplines[disc_with_2_dots] = 2
-        clan_disciplines = self.clans_data[selected_clan]["disciplines"]
-        other_disc = [d for d in clan_disciplines if d != disc_with_2_dots][0]
-        self.character.disciplines[other_disc] = 1
-
         self.character.specialties.clear()
         
         self._update_output_text()
         self._open_specialty_window()
 
 
+    # --- SALVAR / EXPORTAR (em segundo plano, uma exportação por vez) ---
+    def save_sheet(self):
+        if self._sheet_lines is None:
+            messagebox.showwarning("Ficha não gerada", "Gere a ficha antes de salvar."); return
+        path = filedialog.asksaveasfilename(parent=self, title="Salvar Ficha", defaultextension=".txt", initialfile=self.character.name,
+                                            filetypes=[("Ficha em texto", "*.txt"), ("Roster JSONL", "*.jsonl"), ("Roster CSV", "*.csv")])
+        if not path: return
+        # O que vai para o arquivo é copiado aqui, na thread do Tk; a ficha pode continuar sendo editada
+        if path.lower().endswith((".jsonl", ".csv")):
+            snapshot = record_to_character(character_to_record(self.character), self.game_data); game_data = self.game_data
+            self._start_export(lambda task: write_roster(path, [snapshot], game_data), f"Ficha salva em {path}")
+        else:
+            text = self.sheet_renderer.render(self.character)
+            def write_text(task):
+                with open(path, 'w', encoding='utf-8') as f: f.write(text)
+                return 1
+            self._start_export(write_text, f"Ficha salva em {path}")
+
+    def export_npcs(self):
+        answer = ctk.CTkInputDialog(text="Quantos NPCs gerar?", title="Exportar NPCs").get_input()
+        if answer is None: return
+        try: count = int(answer)
+        except ValueError: count = 0
+        if count <= 0: messagebox.showerror("Erro", "Informe um número inteiro positivo."); return
+        path = filedialog.asksaveasfilename(parent=self, title="Exportar NPCs", defaultextension=".jsonl", initialfile="npcs",
+                                            filetypes=[("Roster JSONL", "*.jsonl"), ("Roster CSV", "*.csv")])
+        if not path: return
+        self._start_export(lambda task: export_npcs(task, path, count, game_data=self.game_data), f"{count:,} NPCs exportados para {path}")
+
+    def _start_export(self, job, done_message):
+        if self._export_task is not None and not self._export_task.done:
+            messagebox.showwarning("Exportação em andamento", "Aguarde ou cancele a exportação atual."); return
+        self._set_export_running(True); self.export_progress.set(0); self.export_status_label.configure(text="Gravando...")
+        self._export_task = self.tasks.submit(job, on_progress=self._on_export_progress,
+                                              on_done=lambda _: self._finish_export(done_message, 1),
+                                              on_error=lambda e: self._finish_export("", 0, f"Não foi possível gravar: {e}"),
+                                              on_cancel=lambda: self._finish_export("Exportação cancelada.", 0))
+
+    def _on_export_progress(self, done, total):
+        if total: self.export_progress.set(done / total)
+        self.export_status_label.configure(text=f"{done:,}" + (f" / {total:,}" if total else ""))
+
+    def _finish_export(self, message, progress, error=None):
+        self._set_export_running(False); self.export_progress.set(progress); self.export_status_label.configure(text=message)
+        if error: messagebox.showerror("Erro", error)
+
+    def _set_export_running(self, running):
+        for button in (self.save_sheet_button, self.export_npcs_button): button.configure(state="disabled" if running else "normal")
+        self.cancel_export_button.configure(state="normal" if running else "disabled")
+
+    def cancel_export(self):
+        if self._export_task is not None: self._export_task.cancel()
+
     def _open_specialty_window(self):
         eligible_skills = sorted([s for s, v in self.character.skills.items() if v > 0])
         if not eligible_skills: return
-        mandatory_skills_with_dots = [s for s in eligible_skills if s in self.MANDATORY_SPECIALTY_SKILLS]
+        mandatory_skills_with_dots = sorted(self.rules.mandatory_specialty_skills(self.character))
         free_choice_skills = [s for s in eligible_skills if s not in self.MANDATORY_SPECIALTY_SKILLS]
         popup = ctk.CTkToplevel(self) 
         popup.title("Escolher Especialidades"); popup.geometry("500x400"); popup.resizable(False, False); popup.transient(self); popup.grab_set()
@@ -507,40 +831,35 @@ class App(ctk.CTk):
         confirm_button.pack(pady=20)
         
     def _confirm_specialty(self, mandatory_entries, free_skill_var, free_entry_widget, popup):
-        for skill, entry_widget in mandatory_entries.items():
-            specialty_text = entry_widget.get().strip()
-            if not specialty_text: messagebox.showerror("Erro", f"A perícia '{skill}' precisa de uma especialidade.", parent=popup); return
-            self.character.add_specialty(skill, specialty_text)
-        free_specialty_text = free_entry_widget.get().strip()
-        if free_specialty_text:
-            free_skill = free_skill_var.get()
-            if free_skill: self.character.add_specialty(free_skill, free_specialty_text)
-        popup.destroy(); self._update_output_text()
+        mandatory = {skill: entry_widget.get() for skill, entry_widget in mandatory_entries.items()}
+        try: self.rules.apply_specialties(self.character, mandatory, free_skill_var.get(), free_entry_widget.get())
+        except RuleError as e: messagebox.showerror(e.title, e.message, parent=popup); return
+        popup.destroy()
+
+    def _on_character_changed(self, keys):
+        """Depois que a ficha foi gerada, reescreve só as linhas que mudaram."""
+        if self._sheet_lines is None: return
+        # Atributos, nome e clã têm linha fixa: só elas são refeitas; perícias e disciplinas mudam o número de linhas
+        changed = self.sheet_renderer.changed_lines(self.character, keys)
+        if changed is not None:
+            self.output_text.configure(state="normal")
+            for i, line in changed.items():
+                if self._sheet_lines[i] != line:
+                    self.output_text.delete(f"{i + 1}.0", f"{i + 1}.end"); self.output_text.insert(f"{i + 1}.0", line); self._sheet_lines[i] = line
+            self.output_text.configure(state="disabled"); return
+        lines = self.sheet_renderer.render_lines(self.character)
+        if len(lines) != len(self._sheet_lines): self._update_output_text(); return
+        self.output_text.configure(state="normal")
+        for i, (old, new) in enumerate(zip(self._sheet_lines, lines)):
+            if old != new:
+                self.output_text.delete(f"{i + 1}.0", f"{i + 1}.end"); self.output_text.insert(f"{i + 1}.0", new)
+        self.output_text.configure(state="disabled")
+        self._sheet_lines = lines
         
     def _update_output_text(self):
-        char = self.character
-        result = f"--- FICHA DE PERSONAGEM: {char.name.upper()} ---\n"
-        result += f"CLÃ: {char.clan}\n\n"
-        
-        result += "--- ATRIBUTOS ---\n"
-        for cat, stats in self.attributes_data.items():
-            result += f"{cat.upper()}: " + ", ".join([f"{s} {char.attributes[s]}" for s in stats]) + "\n"
-        
-        result += "\n--- PERÍCIAS ---\n"
-        for cat, stats in self.skills_data.items():
-            skill_lines = []
-            for s in stats:
-                if char.skills.get(s, 0) > 0:
-                    specialty_str = f" ({', '.join(char.specialties[s])})" if s in char.specialties else ""
-                    skill_lines.append(f"{s} {char.skills[s]}{specialty_str}")
-            if skill_lines:
-                result += f"{cat.upper()}: " + ", ".join(skill_lines) + "\n"
-                
-        # --- NOVO BLOCO PARA MOSTRAR DISCIPLINAS ---
-        if char.disciplines:
-            result += "\n--- DISCIPLINAS ---\n"
-            disciplines_str = ", ".join([f"{name} {level}" for name, level in sorted(char.disciplines.items())])
-            result += disciplines_str + "\n"
+        # O layout da ficha é compilado uma vez em SheetRenderer (sheet.py)
+        self._sheet_lines = self.sheet_renderer.render_lines(self.character)
+        result = "\n".join(self._sheet_lines) + "\n"
 
         # Atualiza o campo de texto
         self.output_text.configure(state="normal")
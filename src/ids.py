@@ -0,0 +1,124 @@
+# src/ids.py
+
+import unicodedata
+from collections import namedtuple
+
+# Referência a um nome que não existe no arquivo que deveria defini-lo
+DanglingReference = namedtuple("DanglingReference", ["kind", "source", "name"])
+
+KINDS = ("attributes", "skills", "disciplines", "clans")
+
+
+def fold(text):
+    """Minúsculas e sem acentos: "Dominação" -> "dominacao"."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold()
+
+
+class NameTable:
+    """
+    Nomes canônicos de um tipo (atributos, perícias...) com um ID inteiro cada, na ordem dada.
+    Para atributos e perícias a ordem é a do layout, então o ID é a posição no vetor de pontos.
+    Aceita o nome com qualquer acentuação/caixa e os apelidos de data/aliases.json.
+    """
+    def __init__(self, kind, names, aliases=None):
+        self.kind = kind
+        self.names = tuple(names)
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        self._lookup = {fold(name): i for i, name in enumerate(self.names)}
+        self.unresolved_aliases = []
+        for alias, target in (aliases or {}).items():
+            target_id = self._lookup.get(fold(target))
+            if target_id is None:
+                self.unresolved_aliases.append((alias, target))
+            else:
+                self._lookup.setdefault(fold(alias), target_id)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, item_id):
+        return self.names[item_id]
+
+    def __contains__(self, name):
+        return self.get_id(name) is not None
+
+    def get_id(self, name, default=None):
+        item_id = self.ids.get(name)
+        if item_id is None:
+            item_id = self._lookup.get(fold(name), default)
+        return item_id
+
+    def id(self, name):
+        item_id = self.get_id(name)
+        if item_id is None:
+            raise KeyError(f"'{name}' não é um nome conhecido em {self.kind}")
+        return item_id
+
+    def canonical(self, name, default=None):
+        item_id = self.get_id(name)
+        return default if item_id is None else self.names[item_id]
+
+
+class RuleIds:
+    """As tabelas de nomes das regras e o relatório das referências quebradas encontradas na carga."""
+    def __init__(self, attributes, skills, disciplines, clans, dangling):
+        self.attributes = attributes
+        self.skills = skills
+        self.disciplines = disciplines
+        self.clans = clans
+        self.dangling = dangling
+
+    def table(self, kind):
+        return getattr(self, kind)
+
+    def report(self):
+        """Texto do relatório de referências quebradas (vazio se tudo bate)."""
+        return "\n".join(f"  {ref.source}: '{ref.name}' não existe em {ref.kind}" for ref in self.dangling)
+
+
+def build_ids(attribute_names, skill_names, clans_data, disciplines_data, aliases_data=None, required=None):
+    """
+    Monta as tabelas e devolve (RuleIds, clans_data com as disciplinas pelo nome canônico).
+    `required` é {kind: {origem: [nomes]}} para nomes que o código usa diretamente
+    (ex.: perícias que exigem especialidade). Disciplinas citadas por clãs mas ausentes de
+    disciplines.json continuam valendo (ganham ID no fim da tabela) e entram no relatório.
+    """
+    aliases_data = aliases_data or {}
+    dangling = []
+    attributes = NameTable("attributes", attribute_names, aliases_data.get("attributes"))
+    skills = NameTable("skills", skill_names, aliases_data.get("skills"))
+    described = NameTable("disciplines", disciplines_data, aliases_data.get("disciplines"))
+    names = list(described.names)
+    canonical_clans = {}
+    for clan, info in clans_data.items():
+        disciplines = []
+        for name in info.get("disciplines", []):
+            canonical = described.canonical(name)
+            if canonical is None:
+                dangling.append(DanglingReference("disciplines", f"clans.json/{clan}", name))
+                canonical = name
+                if canonical not in names:
+                    names.append(canonical)
+            disciplines.append(canonical)
+        canonical_clans[clan] = dict(info, disciplines=disciplines)
+    disciplines = NameTable("disciplines", names, aliases_data.get("disciplines"))
+    clans = NameTable("clans", canonical_clans, aliases_data.get("clans"))
+    tables = {"attributes": attributes, "skills": skills, "disciplines": disciplines, "clans": clans}
+    for kind, table in tables.items():
+        for alias, target in table.unresolved_aliases:
+            dangling.append(DanglingReference(kind, f"aliases.json/{alias}", target))
+    for kind, sources in (required or {}).items():
+        for source, required_names in sources.items():
+            dangling.extend(DanglingReference(kind, source, name)
+                            for name in required_names if name not in tables[kind])
+    return RuleIds(attributes, skills, disciplines, clans, dangling), canonical_clans
+
+
+if __name__ == "__main__":
+    from registry import load_registry
+    ids = load_registry(use_cache=False).ids
+    for kind in KINDS:
+        print(f"{kind}: {len(ids.table(kind))} nomes")
+    print(f"Referências quebradas ({len(ids.dangling)}):")
+    print(ids.report() or "  nenhuma")
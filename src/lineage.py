@@ -0,0 +1,250 @@
+# src/lineage.py
+
+import sys
+import time
+import random
+from collections import deque
+
+ROOT = -1
+
+
+class LineageIndex:
+    """
+    Árvore de linhagem (senhor -> cria). Os nós são os registros do banco (record_id), então
+    dois personagens com o mesmo nome continuam distintos; o nome serve para exibir e para
+    consultar quando não é ambíguo. Cada nó guarda a profundidade e uma tabela de saltos
+    (pai, avô, 4º ancestral, 8º...), o que dá ancestral comum e "X descende de Y?" em
+    O(log profundidade). Cria nova entra como folha em O(log profundidade).
+    Senhores que não estão no banco viram nós provisórios (record_id None), um por nome.
+    """
+    def __init__(self):
+        self._by_record = {}
+        self._by_name = {}
+        self._provisional = {}
+        self.names = []
+        self.record_ids = []
+        self._parent = []
+        self._depth = []
+        self._jumps = []
+        self._children = []
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, key):
+        if isinstance(key, int):
+            return key in self._by_record
+        return key in self._by_name
+
+    @classmethod
+    def from_store(cls, store):
+        index = cls()
+        for record_id, name, sire in store.sire_pairs():
+            index.add(name, sire or None, record_id)
+        return index
+
+    # --- CONSTRUÇÃO ---
+    def _new_node(self, name, record_id=None):
+        node = len(self.names)
+        self._by_name.setdefault(name, []).append(node)
+        if record_id is None:
+            self._provisional[name] = node
+        else:
+            self._by_record[record_id] = node
+        self.names.append(name)
+        self.record_ids.append(record_id)
+        self._parent.append(ROOT)
+        self._depth.append(0)
+        self._jumps.append([])
+        self._children.append([])
+        return node
+
+    def _claim(self, name, record_id):
+        """Nó do registro; se o nome já apareceu como senhor provisório, o registro assume esse nó."""
+        node = self._by_record.get(record_id) if record_id is not None else self._provisional.get(name)
+        if node is not None:
+            return node
+        node = self._provisional.pop(name, None) if record_id is not None else None
+        if node is None:
+            return self._new_node(name, record_id)
+        self.record_ids[node] = record_id
+        self._by_record[record_id] = node
+        return node
+
+    def _sire_node(self, sire):
+        """
+        O senhor é gravado só pelo nome: usa o registro mais antigo com esse nome ou,
+        se ainda não há nenhum, um nó provisório que o registro assume quando chegar.
+        """
+        for node in self._by_name.get(sire, ()):
+            if self.record_ids[node] is not None:
+                return node
+        return self._claim(sire, None)
+
+    def _link(self, node, parent):
+        """Calcula profundidade e saltos de um nó cujo pai já está indexado."""
+        self._parent[node] = parent
+        if parent == ROOT:
+            self._depth[node] = 0
+            self._jumps[node] = []
+            return
+        self._depth[node] = self._depth[parent] + 1
+        jumps = [parent]
+        k = 0
+        # O 2^(k+1)-ésimo ancestral é o 2^k-ésimo ancestral do 2^k-ésimo
+        while k < len(self._jumps[jumps[k]]):
+            jumps.append(self._jumps[jumps[k]][k])
+            k += 1
+        self._jumps[node] = jumps
+
+    def add(self, name, sire=None, record_id=None):
+        """
+        Indexa um personagem (pelo record_id, ou pelo nome se não vier do banco) e o liga ao
+        senhor. Retorna o nó.
+        """
+        node = self._claim(name, record_id)
+        if sire is None:
+            return node
+        parent = self._sire_node(sire)
+        if parent == node:
+            return node
+        current = self._parent[node]
+        if current == parent:
+            return node
+        if current != ROOT:
+            raise ValueError(f"'{name}' já tem senhor: '{self.names[current]}'")
+        if self._is_ancestor(node, parent):
+            raise ValueError(f"Linhagem circular: '{name}' é ancestral de '{sire}'")
+        self._children[parent].append(node)
+        self._link(node, parent)
+        if self._children[node]:
+            # Raiz que ganhou senhor depois das crias: recalcula a subárvore, de cima para baixo
+            queue = deque(self._children[node])
+            while queue:
+                child = queue.popleft()
+                self._link(child, self._parent[child])
+                queue.extend(self._children[child])
+        return node
+
+    # --- CONSULTAS ---
+    def _node(self, key):
+        """Nó de um record_id (int) ou de um nome; nome repetido exige o record_id."""
+        if isinstance(key, int):
+            node = self._by_record.get(key)
+        else:
+            nodes = self._by_name.get(key, ())
+            if len(nodes) > 1:
+                records = ", ".join(str(self.record_ids[n]) for n in nodes)
+                raise KeyError(f"'{key}' é o nome de {len(nodes)} personagens (registros {records}); use o record_id")
+            node = nodes[0] if nodes else None
+        if node is None:
+            raise KeyError(f"'{key}' não está na linhagem")
+        return node
+
+    def _ancestor_at_depth(self, node, depth):
+        diff = self._depth[node] - depth
+        k = 0
+        while diff:
+            if diff & 1:
+                node = self._jumps[node][k]
+            diff >>= 1
+            k += 1
+        return node
+
+    def _is_ancestor(self, ancestor, node):
+        if self._depth[ancestor] > self._depth[node]:
+            return False
+        return self._ancestor_at_depth(node, self._depth[ancestor]) == ancestor
+
+    def depth(self, name):
+        """Gerações abaixo do ancestral mais antigo conhecido (0 para quem não tem senhor indexado)."""
+        return self._depth[self._node(name)]
+
+    def sire(self, name):
+        parent = self._parent[self._node(name)]
+        return None if parent == ROOT else self.names[parent]
+
+    def childer(self, name):
+        """Crias diretas."""
+        return [self.names[c] for c in self._children[self._node(name)]]
+
+    def descendants(self, name):
+        """Todas as crias, netas etc., em ordem de geração. Custo proporcional ao resultado."""
+        names, children = self.names, self._children
+        result = []
+        queue = deque(children[self._node(name)])
+        while queue:
+            node = queue.popleft()
+            result.append(names[node])
+            queue.extend(children[node])
+        return result
+
+    def ancestors(self, name):
+        """Senhor, senhor do senhor, ... até a raiz."""
+        node, parent, result = self._node(name), self._parent, []
+        while parent[node] != ROOT:
+            node = parent[node]
+            result.append(self.names[node])
+        return result
+
+    def is_descendant(self, name, ancestor):
+        return self._is_ancestor(self._node(ancestor), self._node(name))
+
+    def common_ancestor(self, a, b):
+        """Ancestral comum mais próximo (pode ser o próprio a ou b), ou None se são de linhagens distintas."""
+        x, y = self._node(a), self._node(b)
+        if self._depth[x] > self._depth[y]:
+            x = self._ancestor_at_depth(x, self._depth[y])
+        elif self._depth[y] > self._depth[x]:
+            y = self._ancestor_at_depth(y, self._depth[x])
+        if x == y:
+            return self.names[x]
+        for k in range(len(self._jumps[x]) - 1, -1, -1):
+            if k < len(self._jumps[x]) and self._jumps[x][k] != self._jumps[y][k]:
+                x, y = self._jumps[x][k], self._jumps[y][k]
+        x, y = self._parent[x], self._parent[y]
+        return self.names[x] if x == y and x != ROOT else None
+
+
+def _naive_common_ancestor(index, a, b):
+    seen = {a, *index.ancestors(a)}
+    for name in [b, *index.ancestors(b)]:
+        if name in seen:
+            return name
+    return None
+
+
+def _benchmark(count=200_000, queries=20_000, seed=0):
+    rng = random.Random(seed)
+    index = LineageIndex()
+    start = time.perf_counter()
+    index.add("Caim 0")
+    for i in range(1, count):
+        # Senhor quase sempre entre os mais recentes: linhagens bem profundas
+        sire = i - 1 - min(int(rng.expovariate(1 / 20)), i - 1)
+        index.add(f"Caim {i}", f"Caim {sire}", record_id=i)
+    elapsed = time.perf_counter() - start
+    deepest = max(index._depth)
+    print(f"Construção: {count:,} nós em {elapsed:.2f}s ({count / elapsed:,.0f} nós/s), profundidade máxima {deepest:,}")
+    pairs = [(f"Caim {rng.randrange(count)}", f"Caim {rng.randrange(count)}") for _ in range(queries)]
+    start = time.perf_counter()
+    fast = [index.common_ancestor(a, b) for a, b in pairs]
+    elapsed = time.perf_counter() - start
+    print(f"Ancestral comum (saltos): {queries / elapsed:,.0f} consultas/s")
+    sample = pairs[:200]
+    start = time.perf_counter()
+    slow = [_naive_common_ancestor(index, a, b) for a, b in sample]
+    elapsed = time.perf_counter() - start
+    print(f"Ancestral comum (subindo pais): {len(sample) / elapsed:,.0f} consultas/s")
+    if slow != fast[:len(sample)]:
+        print("Erro: os dois métodos discordam!")
+    # Nomes repetidos no banco são personagens distintos, cada um com o seu senhor
+    twins = LineageIndex()
+    for record_id, name, sire in ((1, "Marcus", None), (2, "Ana", "Marcus"), (3, "Ana", "Lucius"), (4, "Lucius", None)):
+        twins.add(name, sire, record_id)
+    if twins.sire(2) != "Marcus" or twins.sire(3) != "Lucius" or twins.common_ancestor(2, 3) is not None:
+        print("Erro: personagens com o mesmo nome foram misturados!")
+
+
+if __name__ == "__main__":
+    _benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
@@ -1,21 +1,7 @@
 # src/main.py
 
-import json
 from character import Character # Importa nossa classe Character do arquivo character.py
-
-def load_game_data(file_path):
-    """
-    Carrega os dados de um arquivo JSON.
-    """
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        print(f"Erro: O arquivo de dados {file_path} não foi encontrado.")
-        return None
-    except json.JSONDecodeError:
-        print(f"Erro: O arquivo {file_path} não é um JSON válido.")
-        return None
+from registry import load_registry
 
 def main():
     """
@@ -24,7 +10,7 @@ def main():
     print("Bem-vindo ao Gerador de Personagens de Vampiro: A Máscara!")
     
     # Carrega os dados dos clãs
-    clans_data = load_game_data('data/clans.json')
+    clans_data = load_registry().clans_data
     if not clans_data:
         return # Encerra o programa se os dados não puderem ser carregados
 
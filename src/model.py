@@ -0,0 +1,54 @@
+# src/model.py
+
+class CharacterModel:
+    """
+    Camada observável sobre um Character. O próprio personagem emite cada alteração no momento
+    em que ela acontece (Character.observe): ("attributes", nome), ("skills", nome),
+    ("disciplines", None), ("specialties", None) ou ("info", campo). Quem altera o personagem
+    (regras, GUI, importação) não precisa avisar ninguém.
+    Com um `scheduler` (ex.: tk.after_idle), as notificações de um mesmo ciclo são agrupadas.
+    """
+    def __init__(self, character, scheduler=None):
+        self.character = character
+        self._scheduler = scheduler
+        self._subscribers = {}
+        self._pending = {}
+        self._flush_scheduled = False
+        character.observe(self.notify)
+
+    def close(self):
+        """Para de observar o personagem."""
+        self.character.observe(None)
+
+    def subscribe(self, key, callback):
+        """Registra callback(key) para um campo. Retorna uma função que cancela a inscrição."""
+        callbacks = self._subscribers.setdefault(key, [])
+        callbacks.append(callback)
+        return lambda: callbacks.remove(callback) if callback in callbacks else None
+
+    def subscribe_all(self, callback):
+        """
+        Para quem mostra o personagem inteiro (como a ficha): callback(keys) é chamado
+        uma vez por ciclo com a lista de todos os campos alterados.
+        """
+        return self.subscribe(None, callback)
+
+    def notify(self, key):
+        self._pending[key] = None
+        if self._scheduler is None:
+            self.flush()
+        elif not self._flush_scheduled:
+            self._flush_scheduled = True
+            self._scheduler(self.flush)
+
+    def flush(self):
+        """Entrega os eventos pendentes: cada inscrito recebe cada campo no máximo uma vez por ciclo."""
+        self._flush_scheduled = False
+        pending, self._pending = self._pending, {}
+        catch_all = self._subscribers.get(None, ())
+        for key in pending:
+            for callback in list(self._subscribers.get(key, ())):
+                callback(key)
+        if pending:
+            for callback in list(catch_all):
+                callback(list(pending))
@@ -0,0 +1,156 @@
+# src/npc.py
+
+import os
+import sys
+import time
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from registry import load_registry
+from rules import ATTRIBUTE_STAGES, SKILL_STAGES, DISCIPLINE_DOTS
+from roster import format_roster_chunk, roster_csv_header
+
+SPECIALTY_PLACEHOLDER = "A definir"
+DEFAULT_CHUNK_SIZE = 5000
+
+_worker_generator = None
+
+
+class NPCGenerator:
+    """
+    Sorteia personagens legais de forma uniforme: clã, distribuição de atributos e perícias
+    (uma permutação dos valores da ficha sobre as colunas), par de disciplinas do clã e
+    especialidades provisórias nas perícias obrigatórias. Trabalha por blocos, com NumPy.
+    """
+    def __init__(self, game_data=None, placeholder=SPECIALTY_PLACEHOLDER):
+        game_data = game_data or load_registry()
+        self.game_data = game_data
+        self.placeholder = placeholder
+        n_attrs, n_skills = len(game_data.attribute_names), len(game_data.skill_names)
+        # Valores de uma ficha legal; sortear a ficha = embaralhar estes valores entre as colunas
+        attr_values = [v for v, n in ATTRIBUTE_STAGES.items() for _ in range(n)]
+        self._attribute_values = np.array(attr_values + [1] * (n_attrs - len(attr_values)), dtype=np.uint8)
+        skill_values = [v for v, n in SKILL_STAGES.items() for _ in range(n)]
+        self._skill_values = np.array(skill_values + [0] * (n_skills - len(skill_values)), dtype=np.uint8)
+        self.clans = [c for c, info in game_data.clans_data.items() if len(info.get("disciplines", [])) >= 2]
+        self._clan_disciplines = [game_data.clans_data[c]["disciplines"] for c in self.clans]
+        self._discipline_counts = np.array([len(d) for d in self._clan_disciplines])
+        skill_ids = game_data.ids.skills
+        self._mandatory = [(s, skill_ids.id(s)) for s in game_data.mandatory_specialty_skills]
+
+    def generate(self, rng, count, start=0, prefix="NPC"):
+        """Lista de `count` personagens tirados do gerador NumPy `rng`, numerados a partir de `start`."""
+        attributes = rng.permuted(np.broadcast_to(self._attribute_values, (count, len(self._attribute_values))), axis=1)
+        skills = rng.permuted(np.broadcast_to(self._skill_values, (count, len(self._skill_values))), axis=1)
+        clans = rng.integers(0, len(self.clans), size=count)
+        sizes = self._discipline_counts[clans]
+        # Par ordenado de disciplinas distintas: a primeira entre k, a segunda entre as k - 1 restantes
+        first = (rng.random(count) * sizes).astype(np.intp)
+        second = (rng.random(count) * (sizes - 1)).astype(np.intp)
+        second += second >= first
+        game_data, placeholder, mandatory = self.game_data, self.placeholder, self._mandatory
+        characters = []
+        attr_rows, skill_rows = attributes.tobytes(), skills.tobytes()
+        n_attrs, n_skills = attributes.shape[1], skills.shape[1]
+        for i, (clan, a, b) in enumerate(zip(clans.tolist(), first.tolist(), second.tolist())):
+            character = game_data.new_character(f"{prefix} {start + i}")
+            character.attribute_dots[:] = attr_rows[i * n_attrs:(i + 1) * n_attrs]
+            skill_row = skill_rows[i * n_skills:(i + 1) * n_skills]
+            character.skill_dots[:] = skill_row
+            clan_name = self.clans[clan]
+            character.set_clan(clan_name, game_data.clans_data)
+            disciplines = self._clan_disciplines[clan]
+            character.disciplines[disciplines[a]] = DISCIPLINE_DOTS[0]
+            character.disciplines[disciplines[b]] = DISCIPLINE_DOTS[1]
+            for skill, column in mandatory:
+                if skill_row[column]:
+                    character.add_specialty(skill, placeholder)
+            characters.append(character)
+        return characters
+
+
+def _chunk_seeds(seed, count, chunk_size):
+    """
+    Uma SeedSequence independente por bloco (não por processo): o resultado é o mesmo
+    com qualquer número de processos, desde que seed e chunk_size sejam os mesmos.
+    """
+    n_chunks = -(-count // chunk_size)
+    return np.random.SeedSequence(seed).spawn(n_chunks)
+
+
+def generate_npcs(count, seed=0, chunk_size=DEFAULT_CHUNK_SIZE, game_data=None, prefix="NPC"):
+    """Gera os NPCs no próprio processo, bloco a bloco (mesma sequência de write_npcs)."""
+    generator = NPCGenerator(game_data)
+    for i, seed_seq in enumerate(_chunk_seeds(seed, count, chunk_size)):
+        start = i * chunk_size
+        yield from generator.generate(np.random.default_rng(seed_seq), min(chunk_size, count - start), start, prefix)
+
+
+def _init_worker(data_dir):
+    global _worker_generator
+    _worker_generator = NPCGenerator(load_registry(data_dir))
+
+
+def _generate_chunk(seed_seq, start, count, prefix, as_csv):
+    characters = _worker_generator.generate(np.random.default_rng(seed_seq), count, start, prefix)
+    return format_roster_chunk(characters, as_csv, _worker_generator.game_data)
+
+
+def write_npcs(path, count, seed=0, processes=None, chunk_size=DEFAULT_CHUNK_SIZE, data_dir=None, prefix="NPC"):
+    """
+    Gera `count` NPCs num pool de processos e grava direto no roster (.jsonl ou .csv), na ordem,
+    com no máximo alguns blocos em memória. Retorna quantos foram gravados.
+    """
+    as_csv = path.lower().endswith(".csv")
+    processes = processes or os.cpu_count() or 1
+    seeds = _chunk_seeds(seed, count, chunk_size)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        if as_csv:
+            f.write(roster_csv_header(load_registry(data_dir)))
+        if processes == 1:
+            _init_worker(data_dir)
+            for i, seed_seq in enumerate(seeds):
+                start = i * chunk_size
+                f.write(_generate_chunk(seed_seq, start, min(chunk_size, count - start), prefix, as_csv))
+            return count
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(data_dir,)) as pool:
+            pending = deque()
+            for i, seed_seq in enumerate(seeds):
+                start = i * chunk_size
+                pending.append(pool.submit(_generate_chunk, seed_seq, start, min(chunk_size, count - start), prefix, as_csv))
+                # Poucos blocos à frente dos que já foram gravados
+                if len(pending) >= 2 * processes:
+                    f.write(pending.popleft().result())
+            while pending:
+                f.write(pending.popleft().result())
+    return count
+
+
+def _benchmark(count=200_000, seed=0):
+    from rules import CreationRules
+    game_data = load_registry()
+    rules = CreationRules.from_game_data(game_data)
+    sample = list(generate_npcs(2000, seed, chunk_size=500, game_data=game_data))
+    invalid = sum(1 for c in sample if rules.validate(c))
+    print(f"Amostra: {len(sample)} NPCs, {invalid} inválidos segundo CreationRules.validate")
+    cpus = os.cpu_count() or 1
+    outputs = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for processes in sorted({1, cpus}):
+            path = os.path.join(tmp, f"npcs_{processes}.jsonl")
+            start = time.perf_counter()
+            written = write_npcs(path, count, seed, processes=processes)
+            elapsed = time.perf_counter() - start
+            with open(path, 'rb') as f:
+                outputs[processes] = f.read()
+            print(f"{processes} processo(s): {written:,} NPCs em {elapsed:.2f}s "
+                  f"({written / elapsed:,.0f} NPCs/s, {written / elapsed / processes:,.0f} por núcleo)")
+    if len(set(outputs.values())) > 1:
+        print("Erro: a saída mudou com o número de processos!")
+
+
+if __name__ == "__main__":
+    _benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
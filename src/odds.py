@@ -0,0 +1,132 @@
+# src/odds.py
+
+import os
+import json
+import time
+from functools import lru_cache
+from collections import namedtuple
+
+from registry import DATA_DIR
+
+ODDS_FILE = os.path.join(DATA_DIR, "odds.json")
+MAX_POOL = 20
+MAX_HUNGER = 5
+MAX_DIFFICULTY = 10
+# Casas decimais guardadas na tabela pré-calculada
+TABLE_PRECISION = 6
+
+Odds = namedtuple("Odds", ["success", "critical", "messy_critical", "bestial_failure"])
+
+# Probabilidade de cada face relevante num d10: (1, 2-5, 6-9, 10)
+_ONE, _FAIL, _SUCCESS, _TEN = 0.1, 0.4, 0.4, 0.1
+
+_table = None
+
+
+@lru_cache(maxsize=None)
+def outcome_distribution(pool, hunger=0):
+    """
+    Distribuição exata de uma parada, por programação dinâmica dado a dado.
+    Retorna {(sucessos, crítico, 10 na Fome, 1 na Fome): probabilidade}.
+    """
+    hunger = min(max(hunger, 0), pool)
+    # Estado: (dados 6-9, dezenas em dados normais, dezenas em dados de Fome, algum 1 na Fome)
+    states = {(0, 0, 0, False): 1.0}
+    for die in range(pool):
+        is_hunger = die < hunger
+        nxt = {}
+        for (s, tr, th, one), p in states.items():
+            if is_hunger:
+                moves = (((s, tr, th, True), p * _ONE),
+                         ((s, tr, th, one), p * _FAIL),
+                         ((s + 1, tr, th, one), p * _SUCCESS),
+                         ((s, tr, th + 1, one), p * _TEN))
+            else:
+                moves = (((s, tr, th, one), p * (_ONE + _FAIL)),
+                         ((s + 1, tr, th, one), p * _SUCCESS),
+                         ((s, tr + 1, th, one), p * _TEN))
+            for key, q in moves:
+                nxt[key] = nxt.get(key, 0.0) + q
+        states = nxt
+
+    outcomes = {}
+    for (s, tr, th, one), p in states.items():
+        tens = tr + th
+        key = (s + tens + 2 * (tens // 2), tens >= 2, th > 0, one)
+        outcomes[key] = outcomes.get(key, 0.0) + p
+    return outcomes
+
+
+@lru_cache(maxsize=4096)
+def compute_odds(pool, hunger=0, difficulty=1):
+    """Chances exatas de sucesso, crítico, crítico confuso e falha bestial."""
+    success = critical = messy = bestial = 0.0
+    for (successes, crit, hunger_ten, hunger_one), p in outcome_distribution(pool, hunger).items():
+        if successes >= difficulty:
+            success += p
+            if crit:
+                critical += p
+                if hunger_ten:
+                    messy += p
+        elif hunger_one:
+            bestial += p
+    return Odds(success, critical, messy, bestial)
+
+
+def build_table(max_pool=MAX_POOL, max_hunger=MAX_HUNGER, max_difficulty=MAX_DIFFICULTY):
+    """table[pool][hunger][difficulty] = [sucesso, crítico, confuso, bestial]."""
+    return [[[[round(v, TABLE_PRECISION) for v in compute_odds(pool, hunger, difficulty)]
+              for difficulty in range(max_difficulty + 1)]
+             for hunger in range(max_hunger + 1)]
+            for pool in range(max_pool + 1)]
+
+
+def write_table(path=ODDS_FILE):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"max_pool": MAX_POOL, "max_hunger": MAX_HUNGER, "max_difficulty": MAX_DIFFICULTY,
+                   "odds": build_table()}, f, separators=(",", ":"))
+
+
+def load_table(path=ODDS_FILE):
+    """Carrega a tabela pré-calculada de data/odds.json, se existir."""
+    global _table
+    if _table is None:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                _table = json.load(f)["odds"]
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Aviso: tabela de chances indisponível ({e}); calculando sob demanda.")
+            _table = []
+    return _table
+
+
+def odds(pool, hunger=0, difficulty=1):
+    """Consulta em tempo constante na tabela; fora dela, cai no cálculo memoizado."""
+    hunger = min(max(hunger, 0), pool)
+    difficulty = max(difficulty, 0)
+    table = load_table()
+    if pool < len(table) and hunger < len(table[pool]) and difficulty < len(table[pool][hunger]):
+        return Odds(*table[pool][hunger][difficulty])
+    return compute_odds(pool, hunger, difficulty)
+
+
+def _benchmark(rounds=100000):
+    start = time.perf_counter()
+    build_table()
+    built = time.perf_counter() - start
+    load_table()
+    start = time.perf_counter()
+    for i in range(rounds):
+        odds(i % MAX_POOL + 1, i % (MAX_HUNGER + 1), i % MAX_DIFFICULTY + 1)
+    lookup = (time.perf_counter() - start) / rounds
+    print(f"Tabela completa calculada em {built:.2f}s | consulta: {lookup * 1e6:.2f} µs")
+    print(f"Parada 6, Fome 2, dificuldade 4: {compute_odds(6, 2, 4)}")
+
+
+if __name__ == "__main__":
+    import sys
+    if "--build-table" in sys.argv:
+        write_table()
+        print(f"Tabela gravada em {ODDS_FILE}")
+    else:
+        _benchmark()
@@ -0,0 +1,269 @@
+# src/registry.py
+
+import os
+import json
+import time
+import pickle
+import hashlib
+import logging
+from character import Character, stat_layout
+from ids import build_ids
+from rules import MANDATORY_SPECIALTY_SKILLS
+
+DATA_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data"))
+DATA_FILES = {
+    "clans": "clans.json",
+    "attributes": "attributes.json",
+    "skills": "skills.json",
+    "disciplines": "disciplines.json",
+    "aliases": "aliases.json",
+}
+CACHE_DIR_NAME = ".cache"
+CACHE_FILE_NAME = "registry.pickle"
+# Aumente quando o formato de GameData mudar, para descartar caches antigos
+CACHE_VERSION = 4
+
+_loaded = {}
+# Avisos da carga (ex.: referências quebradas) vão para o logging, não direto para a saída
+log = logging.getLogger(__name__)
+
+
+def load_game_data(file_path):
+    """Carrega os dados de um arquivo JSON. Retorna None (e avisa) em caso de erro."""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        print(f"Erro: O arquivo de dados {file_path} não foi encontrado.")
+        return None
+    except json.JSONDecodeError:
+        print(f"Erro: O arquivo {file_path} não é um JSON válido.")
+        return None
+
+
+class GameData:
+    """
+    Todas as regras do jogo carregadas dos arquivos de data/, com índices reversos prontos.
+    Os nomes são conciliados na carga (ver ids.py): os clãs passam a citar as disciplinas
+    pelo nome de disciplines.json, e `ids` dá um ID inteiro para cada nome.
+    """
+    def __init__(self, clans_data, attributes_data, skills_data, disciplines_data, aliases_data=None):
+        # Como veio dos arquivos, para recarregar só um deles sem reler os outros
+        self.source_data = {"clans": clans_data, "attributes": attributes_data, "skills": skills_data,
+                            "disciplines": disciplines_data, "aliases": aliases_data or {}}
+        self.attributes_data = attributes_data
+        self.skills_data = skills_data
+        self.disciplines_data = disciplines_data
+        self.attribute_names = tuple(a for cat in attributes_data.values() for a in cat)
+        self.skill_names = tuple(s for cat in skills_data.values() for s in cat)
+        self.ids, clans_data = build_ids(
+            self.attribute_names, self.skill_names, clans_data, disciplines_data, aliases_data,
+            required={"skills": {"rules.MANDATORY_SPECIALTY_SKILLS": MANDATORY_SPECIALTY_SKILLS}})
+        self.clans_data = clans_data
+        self.clan_list = list(clans_data.keys())
+        # Perícias que exigem especialidade, já com os nomes destas regras
+        self.mandatory_specialty_skills = tuple(
+            self.ids.skills.canonical(s) for s in MANDATORY_SPECIALTY_SKILLS if s in self.ids.skills)
+        self.attribute_layout = stat_layout(self.attribute_names)
+        self.skill_layout = stat_layout(self.skill_names)
+        # Índices reversos: nome -> categoria, disciplina -> clãs
+        self.attribute_category = {a: cat for cat, stats in attributes_data.items() for a in stats}
+        self.skill_category = {s: cat for cat, stats in skills_data.items() for s in stats}
+        discipline_clans = {}
+        for clan, info in clans_data.items():
+            for discipline in info.get("disciplines", []):
+                discipline_clans.setdefault(discipline, []).append(clan)
+        self.discipline_clans = {d: tuple(clans) for d, clans in discipline_clans.items()}
+
+    def new_character(self, name=""):
+        """Personagem com os atributos em 1 e perícias em 0, já no layout destas regras."""
+        character = Character(name)
+        character.reset_stats(self.attribute_layout, self.skill_layout)
+        return character
+
+    def clans_with_discipline(self, discipline):
+        """Quais clãs têm a disciplina (ex.: "Dominação")."""
+        return self.discipline_clans.get(discipline, ())
+
+
+class RegistryDiff:
+    """O que mudou entre dois GameData. Estatística que trocou de categoria conta como removida e adicionada."""
+    def __init__(self, old, new, files=()):
+        self.files = tuple(files)
+        self.removed_attributes = [a for a in old.attribute_names
+                                   if new.attribute_category.get(a) != old.attribute_category[a]]
+        self.added_attributes = [a for a in new.attribute_names
+                                 if old.attribute_category.get(a) != new.attribute_category[a]]
+        self.removed_skills = [s for s in old.skill_names if new.skill_category.get(s) != old.skill_category[s]]
+        self.added_skills = [s for s in new.skill_names if old.skill_category.get(s) != new.skill_category[s]]
+        self.layout_changed = (old.attribute_layout is not new.attribute_layout
+                               or old.skill_layout is not new.skill_layout)
+        self.changed_clans = sorted(c for c in old.clans_data.keys() | new.clans_data.keys()
+                                    if old.clans_data.get(c) != new.clans_data.get(c))
+        self.clan_list_changed = old.clan_list != new.clan_list
+        self.disciplines_changed = old.disciplines_data != new.disciplines_data
+        # Apelidos mudam as IDs de nomes antigos/sem acento e as perícias obrigatórias conciliadas
+        self.aliases_changed = old.source_data["aliases"] != new.source_data["aliases"]
+
+    @property
+    def empty(self):
+        return not (self.layout_changed or self.changed_clans or self.clan_list_changed or self.disciplines_changed
+                    or self.aliases_changed)
+
+    def __repr__(self):
+        parts = [f"{label}={value}" for label, value in (
+            ("+atributos", self.added_attributes), ("-atributos", self.removed_attributes),
+            ("+perícias", self.added_skills), ("-perícias", self.removed_skills), ("clãs", self.changed_clans),
+            ("apelidos", self.aliases_changed)) if value]
+        return f"RegistryDiff({', '.join(parts) or 'sem mudanças'})"
+
+
+class RegistryWatcher:
+    """
+    Observa os arquivos de data/ só pelo mtime/tamanho (um stat por arquivo), para a GUI
+    consultar periodicamente e recarregar as regras sem reiniciar.
+    """
+    def __init__(self, data_dir=None):
+        self.data_dir = os.path.abspath(data_dir or DATA_DIR)
+        self.paths = {key: os.path.join(self.data_dir, name) for key, name in DATA_FILES.items()}
+        self._stamps = {key: self._stamp(path) for key, path in self.paths.items()}
+
+    @staticmethod
+    def _stamp(path):
+        try:
+            return _fingerprint(path)
+        except OSError:
+            return None
+
+    def changed_files(self):
+        """Chaves (ex.: "skills") dos arquivos alterados desde a última consulta."""
+        changed = []
+        for key, path in self.paths.items():
+            stamp = self._stamp(path)
+            if stamp != self._stamps[key]:
+                self._stamps[key] = stamp
+                changed.append(key)
+        return changed
+
+
+def reload_registry(game_data, changed, data_dir=None):
+    """
+    Relê só os arquivos em `changed`, reaproveitando os dados já carregados dos demais, e
+    troca o registro do processo. Retorna (novo GameData, RegistryDiff), ou None se algum
+    arquivo não puder ser lido (ex.: salvo pela metade) — nesse caso o registro antigo continua valendo.
+    """
+    data_dir = os.path.abspath(data_dir or DATA_DIR)
+    paths = {key: os.path.join(data_dir, name) for key, name in DATA_FILES.items()}
+    raw = dict(game_data.source_data)
+    for key in changed:
+        raw[key] = load_game_data(paths[key])
+        if raw[key] is None:
+            return None
+    new = GameData(**{f"{key}_data": value for key, value in raw.items()})
+    _log_dangling(new, data_dir)
+    _loaded[data_dir] = new
+    _write_cache(os.path.join(data_dir, CACHE_DIR_NAME, CACHE_FILE_NAME), paths, new)
+    return new, RegistryDiff(game_data, new, changed)
+
+
+def _log_dangling(game_data, data_dir):
+    """Relatório de referências sem definição (o completo: python src/ids.py)."""
+    if game_data.ids.dangling:
+        log.warning("%d referência(s) sem definição nos dados de %s:\n%s",
+                    len(game_data.ids.dangling), data_dir, game_data.ids.report())
+
+
+def _fingerprint(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def _file_hash(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def _read_cache(cache_path, paths):
+    """Retorna o GameData do cache se ainda bater com os arquivos; senão None."""
+    try:
+        with open(cache_path, 'rb') as f:
+            cached = pickle.load(f)
+    except (OSError, pickle.PickleError, EOFError, AttributeError, ImportError):
+        return None
+    if not isinstance(cached, dict) or cached.get("version") != CACHE_VERSION:
+        return None
+    stamps = cached.get("files", {})
+    stale = False
+    for key, path in paths.items():
+        if key not in stamps:
+            return None
+        mtime_ns, size, digest = stamps[key]
+        if _fingerprint(path) == (mtime_ns, size):
+            continue
+        # mtime mudou (ex.: checkout do git): confere o conteúdo antes de descartar
+        if _file_hash(path) != digest:
+            return None
+        stale = True
+    if stale:
+        _write_cache(cache_path, paths, cached["data"])
+    return cached["data"]
+
+
+def _write_cache(cache_path, paths, game_data):
+    stamps = {key: _fingerprint(path) + (_file_hash(path),) for key, path in paths.items()}
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({"version": CACHE_VERSION, "files": stamps, "data": game_data}, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"Aviso: não foi possível gravar o cache de regras em {cache_path}: {e}")
+
+
+def load_registry(data_dir=None, use_cache=True):
+    """
+    Carrega as regras uma única vez por processo. Entre processos, reutiliza um cache
+    pré-compilado em data/.cache, invalidado pelo mtime/tamanho (e, se preciso, hash) dos JSON.
+    """
+    data_dir = os.path.abspath(data_dir or DATA_DIR)
+    if data_dir in _loaded:
+        return _loaded[data_dir]
+    paths = {key: os.path.join(data_dir, name) for key, name in DATA_FILES.items()}
+    cache_path = os.path.join(data_dir, CACHE_DIR_NAME, CACHE_FILE_NAME)
+
+    game_data = None
+    if use_cache and all(os.path.exists(p) for p in paths.values()):
+        game_data = _read_cache(cache_path, paths)
+    if game_data is None:
+        raw = {key: load_game_data(path) for key, path in paths.items()}
+        complete = all(v is not None for v in raw.values())
+        game_data = GameData(**{f"{key}_data": value or {} for key, value in raw.items()})
+        _log_dangling(game_data, data_dir)
+        # Nunca guarda em cache um carregamento com arquivos faltando
+        if use_cache and complete:
+            _write_cache(cache_path, paths, game_data)
+    _loaded[data_dir] = game_data
+    return game_data
+
+
+def _benchmark(rounds=200):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        GameData(**{f"{key}_data": load_game_data(os.path.join(DATA_DIR, name)) for key, name in DATA_FILES.items()})
+    parsed = (time.perf_counter() - start) / rounds
+    load_registry()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        _loaded.clear()
+        load_registry()
+    cached = (time.perf_counter() - start) / rounds
+    print(f"JSON: {parsed * 1e6:.0f} µs por carga | cache: {cached * 1e6:.0f} µs por carga")
+    print(f"Clãs com Dominação: {', '.join(load_registry().clans_with_discipline('Dominação'))}")
+
+
+if __name__ == "__main__":
+    # Roda pelo módulo importado: o cache tem de guardar registry.GameData, não __main__.GameData,
+    # senão os outros pontos de entrada não conseguem lê-lo e recompilam tudo
+    from registry import _benchmark
+    _benchmark()
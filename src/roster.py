@@ -0,0 +1,277 @@
+# src/roster.py
+
+import io
+import os
+import csv
+import json
+import time
+import random
+import tempfile
+from itertools import islice
+
+from character import BASIC_INFO_FIELDS
+from registry import load_registry
+from rules import MAX_DOTS
+
+# Colunas fixas do CSV; depois delas vêm uma coluna por atributo e por perícia
+CSV_FIXED_COLUMNS = ("name", "clan") + BASIC_INFO_FIELDS
+CSV_JSON_COLUMNS = ("disciplines", "specialties")
+
+
+def character_to_record(character):
+    """Dicionário pronto para JSON. Perícias com 0 pontos ficam de fora."""
+    record = {"name": character.name, "clan": character.clan}
+    for field in BASIC_INFO_FIELDS:
+        record[field] = getattr(character, field)
+    # Lê direto do vetor de pontos em vez de passar pela visão de dicionário
+    record["attributes"] = dict(zip(character.attributes.layout.names, character.attribute_dots))
+    record["skills"] = {s: v for s, v in zip(character.skills.layout.names, character.skill_dots) if v}
+    record["disciplines"] = dict(character.disciplines)
+    record["specialties"] = {s: list(v) for s, v in character.specialties.items()}
+    return record
+
+
+def record_to_character(record, game_data=None):
+    """
+    Reconstrói um Character a partir de um registro (o inverso de character_to_record).
+    Nomes antigos ou grafados de outro jeito ("Compostura", "Celeridade") viram os canônicos.
+    """
+    game_data = game_data or load_registry()
+    ids = game_data.ids
+    character = game_data.new_character(record.get("name", ""))
+    clan = record.get("clan")
+    if clan:
+        character.clan = ids.clans.canonical(clan, clan)
+        character.bane = game_data.clans_data.get(character.clan, {}).get("bane")
+    for field in BASIC_INFO_FIELDS:
+        setattr(character, field, record.get(field) or "")
+    _fill_dots(character.attribute_dots, ids.attributes, record.get("attributes", {}), 1)
+    _fill_dots(character.skill_dots, ids.skills, record.get("skills", {}), 0)
+    character.disciplines.update((ids.disciplines.canonical(d, d), _checked_dots(d, v))
+                                 for d, v in record.get("disciplines", {}).items())
+    for skill, texts in record.get("specialties", {}).items():
+        for text in texts:
+            character.add_specialty(ids.skills.canonical(skill, skill), text)
+    return character
+
+
+def _checked_dots(name, value):
+    value = int(value)
+    if not 0 <= value <= MAX_DOTS:
+        raise ValueError(f"'{name}' com {value} pontos (esperado 0 a {MAX_DOTS})")
+    return value
+
+
+def _fill_dots(dots, table, values, default):
+    # Preenche o vetor inteiro de uma vez; os IDs da tabela são as posições no vetor
+    filled = bytearray([default]) * len(table)
+    for name, value in values.items():
+        filled[table.id(name)] = _checked_dots(name, value)
+    dots[:] = filled
+
+
+# --- JSONL ---
+def _write_jsonl_lines(f, characters):
+    count = 0
+    dumps = json.dumps
+    for character in characters:
+        f.write(dumps(character_to_record(character), ensure_ascii=False))
+        f.write("\n")
+        count += 1
+    return count
+
+
+def write_jsonl(path, characters):
+    """Grava um personagem por linha, consumindo `characters` sob demanda. Retorna quantos foram gravados."""
+    with open(path, 'w', encoding='utf-8', newline='\n') as f:
+        return _write_jsonl_lines(f, characters)
+
+
+def _numbered_jsonl_records(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield lineno, json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{lineno}: linha não é um JSON válido ({e.msg})") from None
+
+
+def iter_jsonl_records(path):
+    """Gera os registros crus (dicts) de um roster JSONL, linha a linha."""
+    for _, record in _numbered_jsonl_records(path):
+        yield record
+
+
+def read_jsonl(path, game_data=None):
+    """Gera Characters de um roster JSONL em memória constante."""
+    game_data = game_data or load_registry()
+    for lineno, record in _numbered_jsonl_records(path):
+        try:
+            character = record_to_character(record, game_data)
+        except (ValueError, KeyError) as e:
+            raise ValueError(f"{path}:{lineno}: registro inválido ({e})") from None
+        yield character
+
+
+# --- CSV ---
+def csv_columns(game_data=None):
+    game_data = game_data or load_registry()
+    return CSV_FIXED_COLUMNS + game_data.attribute_names + game_data.skill_names + CSV_JSON_COLUMNS
+
+
+def write_csv(path, characters, game_data=None):
+    """Grava o roster como CSV (uma coluna por atributo/perícia). Retorna quantos foram gravados."""
+    game_data = game_data or load_registry()
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(csv_columns(game_data))
+        return _write_csv_rows(writer, characters, game_data)
+
+
+def _write_csv_rows(writer, characters, game_data):
+    count = 0
+    for character in characters:
+        attributes, skills = character.attributes, character.skills
+        row = [character.name, character.clan or ""]
+        row.extend(getattr(character, field) for field in BASIC_INFO_FIELDS)
+        row.extend(attributes.get(a, 0) for a in game_data.attribute_names)
+        row.extend(skills.get(s, 0) for s in game_data.skill_names)
+        row.append(json.dumps(character.disciplines, ensure_ascii=False))
+        row.append(json.dumps(character.specialties, ensure_ascii=False))
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def read_csv(path, game_data=None):
+    """Gera Characters de um roster CSV em memória constante."""
+    game_data = game_data or load_registry()
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.DictReader(f)
+        # Colunas de atributos/perícias decididas uma vez pelo cabeçalho (aceita apelidos)
+        fieldnames = [c for c in reader.fieldnames or () if c not in CSV_FIXED_COLUMNS + CSV_JSON_COLUMNS]
+        attribute_columns = [c for c in fieldnames if c in game_data.ids.attributes]
+        skill_columns = [c for c in fieldnames if c in game_data.ids.skills]
+        for row in reader:
+            try:
+                record = {field: row.get(field, "") for field in CSV_FIXED_COLUMNS}
+                record["attributes"] = {k: row[k] for k in attribute_columns if row[k] not in ("", None)}
+                record["skills"] = {k: row[k] for k in skill_columns if row[k] not in ("", "0", None)}
+                for column in CSV_JSON_COLUMNS:
+                    record[column] = json.loads(row.get(column) or "{}")
+                yield record_to_character(record, game_data)
+            except (ValueError, KeyError) as e:
+                raise ValueError(f"{path}:{reader.line_num}: registro inválido ({e})") from None
+
+
+def read_roster(path, game_data=None):
+    """Escolhe o leitor pela extensão (.jsonl ou .csv)."""
+    if path.lower().endswith(".csv"):
+        return read_csv(path, game_data)
+    return read_jsonl(path, game_data)
+
+
+def write_roster(path, characters, game_data=None):
+    """Escolhe o gravador pela extensão (.jsonl ou .csv)."""
+    if path.lower().endswith(".csv"):
+        return write_csv(path, characters, game_data)
+    return write_jsonl(path, characters)
+
+
+class Roster:
+    """
+    Personagens em memória com um contador de versão: quem guarda algo derivado do roster
+    (ex.: as colunas de analytics.py) compara `version` para saber se ficou velho.
+    Quem alterar um personagem no lugar chama touch().
+    """
+    def __init__(self, characters=()):
+        self._characters = list(characters)
+        self.version = 0
+
+    @classmethod
+    def load(cls, path, game_data=None):
+        return cls(read_roster(path, game_data))
+
+    def save(self, path, game_data=None):
+        return write_roster(path, self._characters, game_data)
+
+    def __len__(self):
+        return len(self._characters)
+
+    def __iter__(self):
+        return iter(self._characters)
+
+    def __getitem__(self, index):
+        return self._characters[index]
+
+    def __setitem__(self, index, character):
+        self._characters[index] = character
+        self.version += 1
+
+    def __delitem__(self, index):
+        del self._characters[index]
+        self.version += 1
+
+    def append(self, character):
+        self._characters.append(character)
+        self.version += 1
+
+    def extend(self, characters):
+        self._characters.extend(characters)
+        self.version += 1
+
+    def touch(self):
+        self.version += 1
+
+
+def roster_csv_header(game_data=None):
+    buffer = io.StringIO(newline='')
+    csv.writer(buffer).writerow(csv_columns(game_data))
+    return buffer.getvalue()
+
+
+def format_roster_chunk(characters, as_csv=False, game_data=None):
+    """
+    Texto de um trecho de roster, sem cabeçalho, para quem gera em paralelo e junta os
+    trechos num só arquivo (o cabeçalho CSV vem de roster_csv_header).
+    """
+    buffer = io.StringIO(newline='')
+    if as_csv:
+        _write_csv_rows(csv.writer(buffer), characters, game_data or load_registry())
+    else:
+        _write_jsonl_lines(buffer, characters)
+    return buffer.getvalue()
+
+
+def _benchmark(count=100000, seed=0):
+    from rules import CreationRules, random_spec
+    game_data = load_registry()
+    rules = CreationRules.from_game_data(game_data)
+    rng = random.Random(seed)
+
+    def npcs():
+        for i in range(count):
+            character = rules.build(random_spec(rules, rng, f"NPC {i}"))
+            character.chronicle = "Noites de São Paulo"
+            yield character
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for ext in ("jsonl", "csv"):
+            path = os.path.join(tmp, f"roster.{ext}")
+            copy = os.path.join(tmp, f"copy.{ext}")
+            filtered = os.path.join(tmp, f"ventrue.{ext}")
+            write_roster(path, islice(npcs(), count))
+            start = time.perf_counter()
+            write_roster(copy, read_roster(path))
+            elapsed = time.perf_counter() - start
+            kept = write_roster(filtered, (c for c in read_roster(path) if c.clan == "Ventrue"))
+            size = os.path.getsize(path) / 1e6
+            print(f"{ext.upper()}: {count:,} registros lidos e regravados em {elapsed:.2f}s "
+                  f"({count / elapsed:,.0f} registros/s, {size:.1f} MB; {kept:,} Ventrue filtrados)")
+
+
+if __name__ == "__main__":
+    _benchmark()
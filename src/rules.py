@@ -0,0 +1,262 @@
+# src/rules.py
+
+import time
+import random
+from character import Character, stat_layout
+
+# Quantos atributos recebem cada valor (4 pontos -> 1 atributo, etc.)
+ATTRIBUTE_STAGES = {4: 1, 3: 3, 2: 4}
+# Quantas perícias recebem cada valor nos passos 3/2/1
+SKILL_STAGES = {3: 3, 2: 5, 1: 7}
+# Pontos das duas disciplinas de clã (2 + 1)
+DISCIPLINE_DOTS = (2, 1)
+# Máximo de pontos em qualquer atributo, perícia ou disciplina
+MAX_DOTS = 5
+MANDATORY_SPECIALTY_SKILLS = ["Acadêmicos", "Ofícios", "Performance", "Ciências"]
+
+
+class RuleError(ValueError):
+    """Violação de uma regra de criação. Guarda um título para as caixas de mensagem da GUI."""
+    def __init__(self, title, message):
+        super().__init__(message)
+        self.title = title
+        self.message = message
+
+
+class CreationRules:
+    """
+    Regras de criação de personagem sem nenhuma dependência da interface.
+    A GUI delega a estas funções; o pipeline de NPCs usa build_batch.
+    """
+    def __init__(self, attributes_data, skills_data, clans_data, mandatory_skills=None):
+        self.attributes_data = attributes_data
+        self.skills_data = skills_data
+        self.clans_data = clans_data
+        self.attribute_names = [a for cat in attributes_data.values() for a in cat]
+        self.skill_names = [s for cat in skills_data.values() for s in cat]
+        self._attribute_set = frozenset(self.attribute_names)
+        self._skill_set = frozenset(self.skill_names)
+        self.attribute_layout = stat_layout(self.attribute_names)
+        self.skill_layout = stat_layout(self.skill_names)
+        self._layouts = (self.attribute_layout, self.skill_layout)
+        # Pontos esperados em ordem crescente: validate() só ordena o vetor e compara os bytes
+        base_attrs = len(self.attribute_names) - sum(ATTRIBUTE_STAGES.values())
+        self._expected_attrs = bytes(sorted([1] * base_attrs + [v for v, n in ATTRIBUTE_STAGES.items() for _ in range(n)]))
+        base_skills = len(self.skill_names) - sum(SKILL_STAGES.values())
+        self._expected_skills = bytes(sorted([0] * base_skills + [v for v, n in SKILL_STAGES.items() for _ in range(n)]))
+        # Nomes conciliados pelo registro (ex.: "Acadêmicos" -> "Erudição"); sem eles, só os que existem
+        if mandatory_skills is None:
+            mandatory_skills = [s for s in MANDATORY_SPECIALTY_SKILLS if s in self._skill_set]
+        self.mandatory_skills = tuple(mandatory_skills)
+
+    @classmethod
+    def from_game_data(cls, game_data):
+        return cls(game_data.attributes_data, game_data.skills_data, game_data.clans_data,
+                   game_data.mandatory_specialty_skills)
+
+    def new_character(self, name=""):
+        character = Character(name)
+        character.reset_stats(self.attribute_layout, self.skill_layout)
+        return character
+
+    # --- ATRIBUTOS ---
+    def apply_attribute_stage(self, character, value, chosen):
+        """Aplica um passo 4/3/2 de atributos. Os escolhidos precisam estar ainda no valor base 1."""
+        expected = ATTRIBUTE_STAGES[value]
+        chosen = list(chosen)
+        if len(chosen) != expected or len(set(chosen)) != expected:
+            if value == 4:
+                raise RuleError("Seleção Incompleta", "Você deve selecionar um Atributo Primário.")
+            label = "Secundários" if value == 3 else "Terciários"
+            raise RuleError("Seleção Inválida", f"Você deve escolher exatamente {expected} Atributos {label}.")
+        attributes = character.attributes
+        for stat in chosen:
+            if stat not in self._attribute_set:
+                raise RuleError("Seleção Inválida", f"Atributo desconhecido: '{stat}'.")
+            if attributes[stat] != 1:
+                raise RuleError("Seleção Inválida", f"O atributo '{stat}' já foi distribuído.")
+        for stat in chosen:
+            attributes[stat] = value
+
+    # --- PERÍCIAS ---
+    def apply_skill_stage(self, character, value, chosen):
+        """Aplica um passo 3/2/1 de perícias. Os escolhidos precisam estar ainda em 0."""
+        expected = SKILL_STAGES[value]
+        chosen = list(chosen)
+        if len(chosen) != expected or len(set(chosen)) != expected:
+            raise RuleError("Seleção Inválida", f"Você deve escolher exatamente {expected} Perícias.")
+        skills = character.skills
+        for skill in chosen:
+            if skill not in self._skill_set:
+                raise RuleError("Seleção Inválida", f"Perícia desconhecida: '{skill}'.")
+            if skills[skill] != 0:
+                raise RuleError("Seleção Inválida", f"A perícia '{skill}' já foi distribuída.")
+        for skill in chosen:
+            skills[skill] = value
+
+    # --- CLÃ E DISCIPLINAS ---
+    def clan_disciplines(self, clan_name):
+        if clan_name not in self.clans_data:
+            raise RuleError("Erro", f"Clã '{clan_name}' não encontrado.")
+        return self.clans_data[clan_name]["disciplines"]
+
+    def assign_disciplines(self, character, clan_name, two_dots, one_dot=None):
+        """
+        Define o clã e distribui 2 pontos em uma Disciplina de clã e 1 ponto em outra.
+        Se a disciplina de 1 ponto não for informada, usa a primeira disciplina de clã restante.
+        """
+        clan_disciplines = self.clan_disciplines(clan_name)
+        if not two_dots or two_dots == "None":
+            raise RuleError("Erro de Disciplina", "Clique em 'Confirmar Clã' e selecione a Disciplina de 2 pontos.")
+        if two_dots not in clan_disciplines:
+            raise RuleError("Erro de Disciplina", f"'{two_dots}' não é uma Disciplina do clã {clan_name}.")
+        if one_dot is None:
+            others = [d for d in clan_disciplines if d != two_dots]
+            if not others:
+                raise RuleError("Erro de Disciplina", f"O clã {clan_name} não tem uma segunda Disciplina.")
+            one_dot = others[0]
+        elif one_dot == two_dots or one_dot not in clan_disciplines:
+            raise RuleError("Erro de Disciplina", f"'{one_dot}' não é uma segunda Disciplina válida do clã {clan_name}.")
+        character.set_clan(clan_name, self.clans_data)
+        character.disciplines.clear()
+        character.disciplines[two_dots] = DISCIPLINE_DOTS[0]
+        character.disciplines[one_dot] = DISCIPLINE_DOTS[1]
+
+    # --- ESPECIALIDADES ---
+    def mandatory_specialty_skills(self, character):
+        """Perícias com pontos que exigem especialidade."""
+        skills = character.skills
+        return [s for s in self.mandatory_skills if skills.get(s, 0) > 0]
+
+    def apply_specialties(self, character, mandatory, free_skill=None, free_text=""):
+        """mandatory: {perícia: texto}. A especialidade gratuita é opcional."""
+        for skill in self.mandatory_specialty_skills(character):
+            if not (mandatory.get(skill) or "").strip():
+                raise RuleError("Erro", f"A perícia '{skill}' precisa de uma especialidade.")
+        # Vale para todas as chaves: o serviço HTTP repassa o JSON do cliente direto para cá
+        for skill in mandatory:
+            self._check_specialty_skill(character, skill)
+        free_text = (free_text or "").strip()
+        if free_text and free_skill:
+            self._check_specialty_skill(character, free_skill)
+        character.specialties.clear()
+        for skill, text in mandatory.items():
+            character.add_specialty(skill, text.strip())
+        if free_text and free_skill:
+            character.add_specialty(free_skill, free_text)
+
+    @staticmethod
+    def _check_specialty_skill(character, skill):
+        if character.skills.get(skill, 0) <= 0:
+            raise RuleError("Erro", f"A perícia '{skill}' não tem pontos para receber uma especialidade.")
+
+    # --- VALIDAÇÃO ---
+    def validate(self, character):
+        """Retorna a lista de violações (strings) de um personagem já montado. Lista vazia = personagem legal."""
+        errors = []
+        if not character.name:
+            errors.append("Personagem precisa de um nome.")
+        attributes, skills = character.attributes, character.skills
+        if character.layouts == self._layouts:
+            # Caminho rápido: mesmo layout das regras, lê o vetor de pontos direto
+            attr_values = character.attribute_dots
+            skill_values = character.skill_dots
+        else:
+            attr_values = bytes(attributes.get(stat, 0) for stat in self.attribute_names)
+            skill_values = bytes(skills.get(skill, 0) for skill in self.skill_names)
+        if bytes(sorted(attr_values)) != self._expected_attrs:
+            errors.append("Distribuição de atributos inválida (esperado 4/3/3/3/2/2/2/2/1).")
+        if bytes(sorted(skill_values)) != self._expected_skills:
+            errors.append("Distribuição de perícias inválida (esperado 3/5/7 perícias com 3/2/1 pontos).")
+        if character.clan not in self.clans_data:
+            errors.append(f"Clã inválido: '{character.clan}'.")
+        else:
+            clan_disciplines = self.clans_data[character.clan]["disciplines"]
+            disciplines = character.disciplines
+            if (len(disciplines) != len(DISCIPLINE_DOTS) or any(d not in clan_disciplines for d in disciplines)
+                    or tuple(sorted(disciplines.values(), reverse=True)) != DISCIPLINE_DOTS):
+                errors.append("Disciplinas inválidas (esperado 2 + 1 pontos em Disciplinas do clã).")
+        for skill in self.mandatory_specialty_skills(character):
+            if not character.specialties.get(skill):
+                errors.append(f"A perícia '{skill}' precisa de uma especialidade.")
+        for skill in character.specialties:
+            if skills.get(skill, 0) <= 0:
+                errors.append(f"Especialidade em '{skill}', que não tem pontos.")
+        return errors
+
+    # --- CONSTRUÇÃO EM LOTE ---
+    def build(self, spec):
+        """
+        Monta um personagem legal a partir de um dicionário:
+        {"name", "clan", "attributes": {4: [...], 3: [...], 2: [...]},
+         "skills": {3: [...], 2: [...], 1: [...]}, "disciplines": [dois_pontos, um_ponto],
+         "specialties": {perícia: texto}, "free_specialty": (perícia, texto)}
+        Lança RuleError no primeiro problema encontrado.
+        """
+        character = self.new_character(spec.get("name", ""))
+        if not character.name:
+            raise RuleError("Erro", "Personagem precisa de um nome.")
+        attributes = spec["attributes"]
+        for value in ATTRIBUTE_STAGES:
+            self.apply_attribute_stage(character, value, attributes.get(value, ()))
+        skills = spec["skills"]
+        for value in SKILL_STAGES:
+            self.apply_skill_stage(character, value, skills.get(value, ()))
+        disciplines = spec.get("disciplines") or [None]
+        self.assign_disciplines(character, spec.get("clan"), *disciplines[:2])
+        free_skill, free_text = spec.get("free_specialty") or (None, "")
+        self.apply_specialties(character, spec.get("specialties", {}), free_skill, free_text)
+        return character
+
+    def build_batch(self, specs):
+        """Monta vários personagens. Retorna (personagens, falhas), onde falhas é uma lista de (índice, RuleError)."""
+        characters, failures = [], []
+        for i, spec in enumerate(specs):
+            try:
+                characters.append(self.build(spec))
+            except (RuleError, KeyError, TypeError) as e:
+                if not isinstance(e, RuleError):
+                    e = RuleError("Erro", f"Especificação inválida: {e!r}")
+                failures.append((i, e))
+        return characters, failures
+
+
+def random_spec(rules, rng, name="NPC"):
+    """Gera uma especificação legal aleatória (usada no benchmark)."""
+    attrs = rules.attribute_names[:]
+    rng.shuffle(attrs)
+    skills = rules.skill_names[:]
+    rng.shuffle(skills)
+    clan = rng.choice(list(rules.clans_data))
+    disciplines = rng.sample(rules.clans_data[clan]["disciplines"], 2)
+    skill_stages = {3: skills[:3], 2: skills[3:8], 1: skills[8:15]}
+    chosen = skills[:15]
+    specialties = {s: "Especialidade" for s in rules.mandatory_skills if s in chosen}
+    return {
+        "name": name,
+        "clan": clan,
+        "attributes": {4: attrs[:1], 3: attrs[1:4], 2: attrs[4:8]},
+        "skills": skill_stages,
+        "disciplines": disciplines,
+        "specialties": specialties,
+    }
+
+
+def _benchmark(count=50000, seed=0):
+    from registry import load_registry
+    game_data = load_registry()
+    rules = CreationRules.from_game_data(game_data)
+    rng = random.Random(seed)
+    specs = [random_spec(rules, rng, f"NPC {i}") for i in range(count)]
+    start = time.perf_counter()
+    characters, failures = rules.build_batch(specs)
+    built = time.perf_counter()
+    invalid = sum(1 for c in characters if rules.validate(c))
+    end = time.perf_counter()
+    print(f"{len(characters)} personagens montados e validados em {end - start:.3f}s "
+          f"({count / (end - start):,.0f} personagens/s; {len(failures)} falhas, {invalid} inválidos)")
+    print(f"Montagem: {count / (built - start):,.0f} personagens/s | validação: {count / (end - built):,.0f} personagens/s")
+
+
+if __name__ == "__main__":
+    _benchmark()
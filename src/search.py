@@ -0,0 +1,227 @@
+# src/search.py
+
+import re
+import sys
+import math
+import time
+import heapq
+import random
+from functools import lru_cache
+from collections import Counter, namedtuple
+
+import numpy as np
+
+from ids import fold
+from registry import load_registry
+
+Hit = namedtuple("Hit", ["kind", "key", "score"])
+
+# Campos de texto livre do personagem que entram no índice
+CHARACTER_TEXT_FIELDS = ("name", "concept", "ambition", "desire", "predator")
+STOPWORDS = frozenset("a o e de da do das dos em no na nos nas um uma para por com que se ao aos as os sua seu".split())
+_TOKEN_RE = re.compile(r"\w+")
+_QUERY_RE = re.compile(r"\w+\*?")
+# Parâmetros usuais do BM25
+K1, B = 1.2, 0.75
+
+
+@lru_cache(maxsize=65536)
+def _fold_token(token):
+    return fold(token)
+
+
+def tokenize(text):
+    # Palavras se repetem muito entre fichas: dobra cada uma só uma vez
+    tokens = [_fold_token(t) for t in _TOKEN_RE.findall(text)]
+    return [t for t in tokens if t not in STOPWORDS]
+
+
+class SearchIndex:
+    """
+    Índice invertido por campo (especialidades, perdição, descrição, conceito...), com tokens sem acento
+    e ranking BM25. Documentos entram e saem um a um, sem reconstruir o índice; cada lista de
+    ocorrências vira arrays NumPy na primeira busca que a usa e só é refeita quando muda.
+    """
+    def __init__(self):
+        self._doc_ids = {}
+        self._docs = []          # (kind, key) ou None para removidos
+        self._doc_terms = []     # {campo: Counter}
+        self._doc_lengths = []   # {campo: quantidade de tokens}
+        self._postings = {}      # campo -> token -> {doc: frequência}
+        self._field_length = {}  # campo -> soma dos tamanhos
+        self._field_docs = {}    # campo -> quantos documentos têm o campo
+        self._kinds = {}         # kind -> quantos documentos
+        self._kind_codes = {}    # kind -> código em _doc_kinds
+        self._doc_kinds = np.zeros(1024, dtype=np.int16)
+        self._arrays = {}        # (campo, token) -> (docs, tf, tamanhos)
+        self._free = []
+
+    def __len__(self):
+        return len(self._doc_ids)
+
+    # --- DOCUMENTOS ---
+    def add_document(self, kind, key, fields):
+        """Indexa (ou reindexa) um documento. `fields` é {campo: texto}."""
+        if (kind, key) in self._doc_ids:
+            self.remove_document(kind, key)
+        terms = {field: Counter(tokenize(text)) for field, text in fields.items() if text}
+        terms = {field: counts for field, counts in terms.items() if counts}
+        lengths = {field: sum(counts.values()) for field, counts in terms.items()}
+        if self._free:
+            doc = self._free.pop()
+            self._docs[doc], self._doc_terms[doc], self._doc_lengths[doc] = (kind, key), terms, lengths
+        else:
+            doc = len(self._docs)
+            self._docs.append((kind, key))
+            self._doc_terms.append(terms)
+            self._doc_lengths.append(lengths)
+            if doc == len(self._doc_kinds):
+                self._doc_kinds = np.concatenate([self._doc_kinds, np.zeros_like(self._doc_kinds)])
+        self._doc_ids[(kind, key)] = doc
+        self._kinds[kind] = self._kinds.get(kind, 0) + 1
+        self._doc_kinds[doc] = self._kind_codes.setdefault(kind, len(self._kind_codes) + 1)
+        arrays = self._arrays
+        for field, counts in terms.items():
+            postings = self._postings.setdefault(field, {})
+            for token, tf in counts.items():
+                postings.setdefault(token, {})[doc] = tf
+                arrays.pop((field, token), None)
+            self._field_length[field] = self._field_length.get(field, 0) + lengths[field]
+            self._field_docs[field] = self._field_docs.get(field, 0) + 1
+        return doc
+
+    def remove_document(self, kind, key):
+        doc = self._doc_ids.pop((kind, key), None)
+        if doc is None:
+            return False
+        for field, counts in self._doc_terms[doc].items():
+            postings = self._postings[field]
+            for token in counts:
+                entry = postings[token]
+                del entry[doc]
+                if not entry:
+                    del postings[token]
+                self._arrays.pop((field, token), None)
+            self._field_length[field] -= self._doc_lengths[doc][field]
+            self._field_docs[field] -= 1
+        self._kinds[kind] -= 1
+        self._docs[doc], self._doc_terms[doc], self._doc_lengths[doc] = None, None, None
+        self._doc_kinds[doc] = 0
+        self._free.append(doc)
+        return True
+
+    def add_character(self, key, character):
+        """Especialidades (perícia e texto) e campos livres de um personagem; `key` é o id no banco ou o nome."""
+        fields = {f: getattr(character, f, None) for f in CHARACTER_TEXT_FIELDS}
+        fields["specialties"] = " ".join(f"{skill} {' '.join(texts)}" for skill, texts in character.specialties.items())
+        return self.add_document("character", key, fields)
+
+    def add_game_data(self, game_data):
+        """Perdições dos clãs e descrições das disciplinas."""
+        for clan, info in game_data.clans_data.items():
+            self.add_document("clan", clan, {"name": clan, "bane": info.get("bane", "")})
+        for discipline, description in game_data.disciplines_data.items():
+            if isinstance(description, dict):
+                description = description.get("description", "")
+            self.add_document("discipline", discipline, {"name": discipline, "description": description})
+
+    def add_store(self, store, batch_size=1000):
+        for record_id, character in store.iter_all(batch_size):
+            self.add_character(record_id, character)
+
+    # --- BUSCA ---
+    def _posting_arrays(self, field, token):
+        arrays = self._arrays.get((field, token))
+        if arrays is None:
+            entry, lengths = self._postings[field][token], self._doc_lengths
+            n = len(entry)
+            arrays = (np.fromiter(entry.keys(), dtype=np.int64, count=n),
+                      np.fromiter(entry.values(), dtype=np.float64, count=n),
+                      np.fromiter((lengths[doc][field] for doc in entry), dtype=np.float64, count=n))
+            self._arrays[(field, token)] = arrays
+        return arrays
+
+    def search(self, query, kind=None, fields=None, limit=20):
+        """
+        Documentos com algum termo da consulta, do mais para o menos relevante. Termo terminado
+        em * busca por prefixo ("sol*" acha "solar"). `kind` restringe a "character", "clan"
+        ou "discipline"; `fields` a campos específicos.
+        """
+        tokens = [_fold_token(t) for t in _QUERY_RE.findall(query)]
+        tokens = [t for t in tokens if t not in STOPWORDS]
+        if not tokens or (kind is not None and kind not in self._kind_codes):
+            return []
+        n_docs = len(self._doc_ids)
+        fields = [fields] if isinstance(fields, str) else (fields or list(self._postings))
+        scores = np.zeros(len(self._docs))
+        for field in fields:
+            postings = self._postings.get(field)
+            if not postings or not self._field_docs[field]:
+                continue
+            norm = K1 * B * self._field_docs[field] / self._field_length[field]
+            for term in tokens:
+                if term.endswith("*"):
+                    matches = [t for t in postings if t.startswith(term[:-1])]
+                else:
+                    matches = [term] if term in postings else []
+                for token in matches:
+                    docs, tf, lengths = self._posting_arrays(field, token)
+                    idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+                    scores[docs] += idf * tf * (K1 + 1) / (tf + K1 * (1 - B) + norm * lengths)
+        if kind is not None:
+            scores[self._doc_kinds[:len(scores)] != self._kind_codes[kind]] = 0.0
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(scores[candidates], -limit)[-limit:]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [Hit(*self._docs[doc], float(scores[doc])) for doc in candidates.tolist()]
+
+    def who_has_specialty(self, text, limit=100):
+        return self.search(text, kind="character", fields="specialties", limit=limit)
+
+    def banes_mentioning(self, text):
+        return [hit.key for hit in self.search(text, kind="clan", fields="bane", limit=len(self._docs) or 1)]
+
+
+def build_index(game_data=None, store=None):
+    """Índice com as regras do jogo e, se houver, os personagens da crônica."""
+    index = SearchIndex()
+    index.add_game_data(game_data or load_registry())
+    if store is not None:
+        index.add_store(store)
+    return index
+
+
+def _benchmark(count=200_000, queries=1000, seed=0):
+    from character import Character
+    rng = random.Random(seed)
+    game_data = load_registry()
+    skills = game_data.skill_names
+    words = ["Facas", "Pistolas", "Ocultismo Sombrio", "Bares", "Poesia", "Latim", "Cavalos", "Rituais", "Vielas",
+             "Política", "Sangue", "Noite", "Igreja", "Mercado", "Porto", "Sol", "Máfia", "Lobos", "Ópera", "Xadrez"]
+    index = SearchIndex()
+    index.add_game_data(game_data)
+    start = time.perf_counter()
+    for i in range(count):
+        character = Character(f"NPC {i}")
+        character.concept = " ".join(rng.sample(words, 3))
+        character.ambition = " ".join(rng.sample(words, 4))
+        for _ in range(rng.randint(1, 3)):
+            character.add_specialty(rng.choice(skills), rng.choice(words))
+        index.add_character(i, character)
+    elapsed = time.perf_counter() - start
+    print(f"Indexação: {count:,} personagens em {elapsed:.2f}s ({count / elapsed:,.0f}/s)")
+    start = time.perf_counter()
+    for _ in range(queries):
+        index.who_has_specialty(rng.choice(words), limit=20)
+    elapsed = time.perf_counter() - start
+    print(f"Busca por especialidade: {elapsed / queries * 1000:.2f} ms por consulta")
+    for label in ("primeira", "repetida"):
+        start = time.perf_counter()
+        hits = index.search("ocultismo sol", limit=20)
+        print(f"Busca livre 'ocultismo sol' ({label}): {(time.perf_counter() - start) * 1000:.2f} ms, {len(hits)} resultados")
+    print(f"Perdições que mencionam 'sol*': {index.banes_mentioning('sol*')}")
+
+
+if __name__ == "__main__":
+    _benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
@@ -0,0 +1,504 @@
+# src/service.py
+
+import sys
+import json
+import time
+import base64
+import struct
+import asyncio
+import hashlib
+import secrets
+
+from character import BASIC_INFO_FIELDS
+from registry import load_registry
+from rules import CreationRules, RuleError, ATTRIBUTE_STAGES, SKILL_STAGES
+from sheet import SheetRenderer
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+SESSION_TTL = 3600  # segundos sem uso até a sessão ser descartada
+MAX_BODY = 64 * 1024
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+_REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            409: "Conflict", 413: "Payload Too Large", 422: "Unprocessable Entity"}
+
+
+class ServiceError(Exception):
+    def __init__(self, status, title, message):
+        super().__init__(message)
+        self.status = status
+        self.title = title
+        self.message = message
+
+
+class CreationSession:
+    """
+    Uma criação de personagem em andamento, na mesma ordem da GUI: atributos (4/3/2),
+    perícias (3/2/1), clã e disciplinas, ficha e especialidades. Todo o estado fica aqui;
+    as regras (CreationRules) são compartilhadas, só para leitura, entre as sessões.
+    """
+    def __init__(self, session_id, rules, name=""):
+        self.id = session_id
+        self.rules = rules
+        self.character = rules.new_character(name)
+        self.attribute_stage = max(ATTRIBUTE_STAGES)
+        self.skill_stage = max(SKILL_STAGES)
+        self.sheet_generated = False
+        self.last_used = time.monotonic()
+
+    def set_info(self, fields):
+        for field, value in fields.items():
+            if field != "name" and field not in BASIC_INFO_FIELDS:
+                raise ServiceError(400, "Campo desconhecido", f"Campo desconhecido: '{field}'.")
+            if value is not None and not isinstance(value, str):
+                raise ServiceError(400, "Requisição inválida", f"O campo '{field}' precisa ser um texto.")
+            setattr(self.character, field, (value or "").strip())
+
+    def apply_attributes(self, chosen):
+        """Como confirm_attribute_step: aplica o passo atual e avança para o próximo."""
+        if not self.attribute_stage:
+            raise ServiceError(409, "Atributos", "Os atributos já foram distribuídos.")
+        self.rules.apply_attribute_stage(self.character, self.attribute_stage, chosen)
+        self.attribute_stage = next((v for v in ATTRIBUTE_STAGES if v < self.attribute_stage), 0)
+
+    def apply_skills(self, chosen):
+        """Como confirm_skill_step."""
+        if not self.skill_stage:
+            raise ServiceError(409, "Perícias", "As perícias já foram distribuídas.")
+        self.rules.apply_skill_stage(self.character, self.skill_stage, chosen)
+        self.skill_stage = next((v for v in SKILL_STAGES if v < self.skill_stage), 0)
+
+    def assign_disciplines(self, clan, two_dots, one_dot=None):
+        self.rules.assign_disciplines(self.character, clan, two_dots, one_dot)
+
+    def generate_sheet(self):
+        """Como generate_sheet na GUI: exige atributos, perícias, nome e disciplinas; zera as especialidades."""
+        if self.attribute_stage or self.skill_stage:
+            raise ServiceError(409, "Criação Incompleta", "Finalize Atributos e Perícias.")
+        if not self.character.name:
+            raise RuleError("Erro", "Personagem precisa de um nome.")
+        if not self.character.disciplines:
+            raise RuleError("Erro de Disciplina", "Escolha o clã e as Disciplinas antes de gerar a ficha.")
+        self.character.specialties.clear()
+        self.sheet_generated = True
+
+    def apply_specialties(self, mandatory, free_skill=None, free_text=""):
+        if not self.sheet_generated:
+            raise ServiceError(409, "Ficha", "Gere a ficha antes de escolher as especialidades.")
+        self.rules.apply_specialties(self.character, mandatory, free_skill, free_text)
+
+    def state(self, renderer):
+        c = self.character
+        state = {
+            "id": self.id,
+            "name": c.name,
+            "clan": c.clan,
+            "info": {field: getattr(c, field) for field in BASIC_INFO_FIELDS},
+            "attribute_stage": self.attribute_stage,
+            "skill_stage": self.skill_stage,
+            "attributes": dict(c.attributes),
+            "skills": {s: v for s, v in c.skills.items() if v},
+            "disciplines": dict(c.disciplines),
+            "specialties": c.specialties,
+        }
+        if self.sheet_generated:
+            state["mandatory_specialty_skills"] = self.rules.mandatory_specialty_skills(c)
+            state["sheet"] = renderer.render_lines(c)
+            state["errors"] = self.rules.validate(c)
+        return state
+
+
+class CharacterService:
+    """
+    Sessões de criação em memória, servidas por HTTP (JSON) e WebSocket num único event loop.
+    Rotas: GET /rules; POST /sessions; GET|DELETE /sessions/{id};
+    POST /sessions/{id}/{info|attributes|skills|disciplines|sheet|specialties}.
+    Pelo WebSocket (/ws) cada mensagem é {"method", "path", "body", "id"} e a resposta {"id", "status", "body"}.
+    """
+    def __init__(self, game_data=None, session_ttl=SESSION_TTL):
+        self.game_data = game_data or load_registry()
+        self.rules = CreationRules.from_game_data(self.game_data)
+        self.renderer = SheetRenderer(self.game_data)
+        self.session_ttl = session_ttl
+        self.sessions = {}
+        self._rules_payload = {
+            "attributes": self.game_data.attributes_data,
+            "skills": self.game_data.skills_data,
+            "clans": {clan: info["disciplines"] for clan, info in self.game_data.clans_data.items()},
+            "attribute_stages": ATTRIBUTE_STAGES,
+            "skill_stages": SKILL_STAGES,
+            "mandatory_specialty_skills": self.rules.mandatory_skills,
+        }
+        self._steps = {
+            "info": lambda s, body: s.set_info(body),
+            "attributes": lambda s, body: s.apply_attributes(_text_list(body, "chosen")),
+            "skills": lambda s, body: s.apply_skills(_text_list(body, "chosen")),
+            "disciplines": lambda s, body: s.assign_disciplines(_text(body, "clan"), _text(body, "two_dots"),
+                                                                _text(body, "one_dot")),
+            "sheet": lambda s, body: s.generate_sheet(),
+            "specialties": lambda s, body: s.apply_specialties(_text_map(body, "mandatory"), _text(body, "free_skill"),
+                                                               _text(body, "free_text") or ""),
+        }
+
+    # --- ROTAS ---
+    def dispatch(self, method, path, body):
+        """Trata uma requisição já decodificada. Retorna (status, corpo)."""
+        try:
+            if not isinstance(method, str) or not isinstance(path, str):
+                raise ServiceError(400, "Requisição inválida", "Método e caminho precisam ser textos.")
+            return self._route(method, [p for p in path.split("?", 1)[0].split("/") if p], body)
+        except ServiceError as e:
+            return e.status, {"title": e.title, "message": e.message}
+        except RuleError as e:
+            return 422, {"title": e.title, "message": e.message}
+
+    def _route(self, method, parts, body):
+        if not isinstance(body, dict):
+            raise ServiceError(400, "Requisição inválida", "O corpo precisa ser um objeto JSON.")
+        if parts == ["rules"] and method == "GET":
+            return 200, self._rules_payload
+        if not parts or parts[0] != "sessions" or len(parts) > 3:
+            raise ServiceError(404, "Não encontrado", f"Rota desconhecida: /{'/'.join(parts)}")
+        if len(parts) == 1:
+            if method != "POST":
+                raise ServiceError(405, "Método", "Use POST para criar uma sessão.")
+            session = self.create_session(_text(body, "name") or "")
+            return 201, session.state(self.renderer)
+        session = self.sessions.get(parts[1])
+        if session is None:
+            raise ServiceError(404, "Sessão", f"Sessão '{parts[1]}' não encontrada.")
+        session.last_used = time.monotonic()
+        if len(parts) == 2:
+            if method == "DELETE":
+                del self.sessions[session.id]
+                return 200, {"id": session.id}
+            if method == "GET":
+                return 200, session.state(self.renderer)
+            raise ServiceError(405, "Método", "Use GET ou DELETE.")
+        step = self._steps.get(parts[2])
+        if step is None:
+            raise ServiceError(404, "Não encontrado", f"Passo desconhecido: '{parts[2]}'.")
+        if method != "POST":
+            raise ServiceError(405, "Método", "Use POST nos passos da criação.")
+        step(session, body)
+        return 200, session.state(self.renderer)
+
+    def create_session(self, name=""):
+        session_id = secrets.token_hex(8)
+        session = self.sessions[session_id] = CreationSession(session_id, self.rules, str(name))
+        return session
+
+    def expire_sessions(self):
+        limit = time.monotonic() - self.session_ttl
+        for session_id in [i for i, s in self.sessions.items() if s.last_used < limit]:
+            del self.sessions[session_id]
+
+    # --- SERVIDOR ---
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """Sobe o servidor e retorna o asyncio.Server (a porta real fica em server.sockets[0])."""
+        server = await asyncio.start_server(self._handle_connection, host, port, limit=MAX_BODY)
+        self._sweeper = asyncio.create_task(self._sweep_sessions())
+        return server
+
+    async def _sweep_sessions(self):
+        while True:
+            await asyncio.sleep(min(60, self.session_ttl))
+            self.expire_sessions()
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                except ServiceError as e:
+                    # Sem linha de requisição ou tamanho confiáveis não dá para achar a próxima: responde e fecha
+                    writer.write(_http_response(e.status, {"title": e.title, "message": e.message}, False))
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, path, headers, raw = request
+                if headers.get("upgrade", "").lower() == "websocket" and path.split("?", 1)[0] == "/ws":
+                    await self._websocket(reader, writer, headers)
+                    break
+                if raw is None:
+                    writer.write(_http_response(413, {"title": "Requisição", "message": "Corpo grande demais."}, False))
+                    break
+                try:
+                    body = json.loads(raw) if raw else {}
+                except ValueError:
+                    status, payload = 400, {"title": "Requisição inválida", "message": "O corpo não é um JSON válido."}
+                else:
+                    status, payload = self.dispatch(method, path, body)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(_http_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _websocket(self, reader, writer, headers):
+        key = headers.get("sec-websocket-key", "")
+        accept = base64.b64encode(hashlib.sha1((key + _WS_GUID).encode()).digest()).decode()
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode())
+        while True:
+            opcode, data = await _read_ws_message(reader)
+            if opcode == 0x8:
+                writer.write(_ws_frame(0x8, data[:2]))
+                await writer.drain()
+                return
+            if opcode == 0x9:
+                writer.write(_ws_frame(0xA, data))
+                continue
+            if opcode not in (0x1, 0x2):
+                continue
+            try:
+                message = json.loads(data)
+                status, payload = self.dispatch(message.get("method", "GET"), message.get("path", ""), message.get("body") or {})
+                reply = {"id": message.get("id"), "status": status, "body": payload}
+            except (ValueError, AttributeError):
+                reply = {"id": None, "status": 400, "body": {"title": "Mensagem inválida", "message": "Esperado um objeto JSON."}}
+            writer.write(_ws_frame(0x1, json.dumps(reply, ensure_ascii=False).encode()))
+            await writer.drain()
+
+
+# --- CORPO DAS REQUISIÇÕES ---
+# Os tipos são conferidos antes de chegar às regras: corpo malformado é 400, não exceção solta
+def _invalid(key, expected):
+    return ServiceError(400, "Requisição inválida", f"'{key}' precisa ser {expected}.")
+
+
+def _text(body, key):
+    value = body.get(key)
+    if value is not None and not isinstance(value, str):
+        raise _invalid(key, "um texto")
+    return value
+
+
+def _text_list(body, key):
+    value = body.get(key, [])
+    if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+        raise _invalid(key, "uma lista de textos")
+    return value
+
+
+def _text_map(body, key):
+    value = body.get(key) or {}
+    if not isinstance(value, dict) or not all(isinstance(v, str) for v in value.values()):
+        raise _invalid(key, "um objeto de textos")
+    return value
+
+
+# --- HTTP/1.1 E WEBSOCKET (o mínimo da RFC 6455) ---
+async def _read_request(reader):
+    """
+    (método, caminho, cabeçalhos, corpo) ou None se a conexão fechou. Corpo None = grande demais.
+    Linha de requisição ou Content-Length malformados levantam ServiceError(400).
+    """
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    parts = request_line.decode("latin-1").rstrip("\r\n").split(" ")
+    if len(parts) != 3 or not parts[2].startswith("HTTP/"):
+        raise ServiceError(400, "Requisição inválida", "Linha de requisição malformada.")
+    method, path, _ = parts
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = headers.get("content-length") or "0"
+    if not (length.isascii() and length.isdigit()):
+        raise ServiceError(400, "Requisição inválida", "Content-Length precisa ser um inteiro não negativo.")
+    length = int(length)
+    if length > MAX_BODY:
+        return method, path, headers, None
+    return method, path, headers, await reader.readexactly(length) if length else b""
+
+
+def _http_response(status, payload, keep_alive=True):
+    body = json.dumps(payload, ensure_ascii=False).encode()
+    return (f"HTTP/1.1 {status} {_REASONS[status]}\r\nContent-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n").encode() + body
+
+
+def _ws_frame(opcode, data, mask=False):
+    """Um quadro com FIN. O cliente (só no benchmark) mascara; o servidor nunca."""
+    length = len(data)
+    header = bytearray([0x80 | opcode])
+    mask_bit = 0x80 if mask else 0
+    if length < 126:
+        header.append(mask_bit | length)
+    elif length < 1 << 16:
+        header.append(mask_bit | 126); header += struct.pack("!H", length)
+    else:
+        header.append(mask_bit | 127); header += struct.pack("!Q", length)
+    if mask:
+        key = secrets.token_bytes(4)
+        return bytes(header) + key + _unmask(data, key)
+    return bytes(header) + data
+
+
+def _unmask(data, key):
+    n = len(data)
+    pad = (key * (n // 4 + 1))[:n]
+    return (int.from_bytes(data, "big") ^ int.from_bytes(pad, "big")).to_bytes(n, "big")
+
+
+async def _read_ws_message(reader):
+    """(opcode, dados) de uma mensagem inteira, juntando quadros de continuação."""
+    opcode, chunks = None, []
+    while True:
+        b1, b2 = await reader.readexactly(2)
+        length = b2 & 0x7F
+        if length == 126:
+            length = struct.unpack("!H", await reader.readexactly(2))[0]
+        elif length == 127:
+            length = struct.unpack("!Q", await reader.readexactly(8))[0]
+        if length > MAX_BODY:
+            raise ValueError("Mensagem WebSocket grande demais.")
+        key = await reader.readexactly(4) if b2 & 0x80 else None
+        data = await reader.readexactly(length)
+        if key:
+            data = _unmask(data, key)
+        frame_opcode = b1 & 0x0F
+        if frame_opcode >= 0x8:
+            return frame_opcode, data  # controle: nunca fragmentado
+        if frame_opcode:
+            opcode = frame_opcode
+        chunks.append(data)
+        if b1 & 0x80:
+            return opcode, b"".join(chunks)
+
+
+# --- GERADOR DE CARGA ---
+class _HttpClient:
+    def __init__(self, reader, writer):
+        self.reader, self.writer = reader, writer
+
+    async def request(self, method, path, body=None):
+        data = json.dumps(body or {}, ensure_ascii=False).encode()
+        self.writer.write(f"{method} {path} HTTP/1.1\r\nHost: local\r\nContent-Type: application/json\r\n"
+                          f"Content-Length: {len(data)}\r\n\r\n".encode() + data)
+        status_line = await self.reader.readline()
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+        return int(status_line.split()[1]), json.loads(await self.reader.readexactly(length))
+
+
+class _WsClient:
+    def __init__(self, reader, writer):
+        self.reader, self.writer = reader, writer
+
+    async def request(self, method, path, body=None):
+        message = {"method": method, "path": path, "body": body or {}}
+        self.writer.write(_ws_frame(0x1, json.dumps(message, ensure_ascii=False).encode(), mask=True))
+        _, data = await _read_ws_message(self.reader)
+        reply = json.loads(data)
+        return reply["status"], reply["body"]
+
+
+async def _connect(host, port, websocket):
+    reader, writer = await asyncio.open_connection(host, port, limit=MAX_BODY)
+    if not websocket:
+        return _HttpClient(reader, writer)
+    key = base64.b64encode(secrets.token_bytes(16)).decode()
+    writer.write(f"GET /ws HTTP/1.1\r\nHost: local\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                 f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n".encode())
+    while (await reader.readline()) not in (b"\r\n", b""):
+        pass
+    return _WsClient(reader, writer)
+
+
+async def _player(host, port, spec, latencies, websocket):
+    """Um jogador criando um personagem passo a passo, como faria pela GUI."""
+    client = await _connect(host, port, websocket)
+    steps = [("criar", "POST", "/sessions", {"name": spec["name"]})]
+    steps += [(f"atributos {v}", "POST", "attributes", {"chosen": spec["attributes"][v]}) for v in ATTRIBUTE_STAGES]
+    steps += [(f"perícias {v}", "POST", "skills", {"chosen": spec["skills"][v]}) for v in SKILL_STAGES]
+    steps += [("disciplinas", "POST", "disciplines", {"clan": spec["clan"], "two_dots": spec["disciplines"][0],
+                                                      "one_dot": spec["disciplines"][1]}),
+              ("ficha", "POST", "sheet", {}),
+              ("especialidades", "POST", "specialties", {"mandatory": spec["specialties"]})]
+    session_path = None
+    try:
+        for label, method, path, body in steps:
+            start = time.perf_counter()
+            status, reply = await client.request(method, path if session_path is None else f"{session_path}/{path}", body)
+            latencies.setdefault(label, []).append(time.perf_counter() - start)
+            if status >= 400:
+                raise RuntimeError(f"{label}: {status} {reply}")
+            session_path = session_path or f"/sessions/{reply['id']}"
+        if reply.get("errors"):
+            raise RuntimeError(f"Ficha final inválida: {reply['errors']}")
+        await client.request("DELETE", session_path)
+    finally:
+        client.writer.close()
+
+
+async def _load_test(players, concurrency, websocket, seed):
+    import random
+    from rules import random_spec
+    service = CharacterService()
+    server = await service.serve(DEFAULT_HOST, 0)
+    port = server.sockets[0].getsockname()[1]
+    rng = random.Random(seed)
+    specs = [random_spec(service.rules, rng, f"Jogador {i}") for i in range(players)]
+    latencies, gate = {}, asyncio.Semaphore(concurrency)
+
+    async def one(spec):
+        async with gate:
+            await _player(DEFAULT_HOST, port, spec, latencies, websocket)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one(spec) for spec in specs), return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    failures = [r for r in results if isinstance(r, Exception)]
+    server.close()
+    service._sweeper.cancel()
+    await server.wait_closed()
+    return latencies, elapsed, failures, len(service.sessions)
+
+
+def _percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def _benchmark(players=2000, concurrency=1000, seed=0):
+    for websocket in (False, True):
+        latencies, elapsed, failures, leftover = asyncio.run(_load_test(players, concurrency, websocket, seed))
+        requests = sum(len(v) for v in latencies.values())
+        print(f"{'WebSocket' if websocket else 'HTTP'}: {players:,} jogadores, até {concurrency:,} simultâneos, "
+              f"{requests:,} passos em {elapsed:.2f}s ({requests / elapsed:,.0f} passos/s); "
+              f"falhas: {len(failures)}, sessões restantes: {leftover}")
+        for label, values in latencies.items():
+            values.sort()
+            print(f"  {label:<16} p50 {_percentile(values, 0.5) * 1000:6.1f} ms   p99 {_percentile(values, 0.99) * 1000:6.1f} ms")
+        if failures:
+            print(f"  primeira falha: {failures[0]!r}")
+
+
+async def _serve_forever(host, port):
+    server = await CharacterService().serve(host, port)
+    print(f"Serviço de criação em http://{host}:{port} (WebSocket em /ws)")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        asyncio.run(_serve_forever(DEFAULT_HOST, int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_PORT))
+    else:
+        _benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,177 @@
+# src/sheet.py
+
+import os
+import re
+import time
+import random
+import tempfile
+from itertools import islice
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from registry import load_registry
+
+_worker_renderer = None
+_NAME_LINE = "--- FICHA DE PERSONAGEM: {} ---"
+_CLAN_LINE = "CLÃ: {}"
+# Cabeçalho, clã, linha em branco e título: as linhas de atributos começam aqui
+_ATTRIBUTES_START = 4
+
+
+class SheetRenderer:
+    """
+    Ficha em texto. O layout (categorias, rótulos e posições no vetor de pontos) é
+    compilado uma vez por conjunto de regras; render() só junta pedaços prontos.
+    """
+    def __init__(self, game_data=None):
+        game_data = game_data or load_registry()
+        self.attribute_layout = game_data.attribute_layout
+        self.skill_layout = game_data.skill_layout
+        attr_index, skill_index = self.attribute_layout.index, self.skill_layout.index
+        # (prefixo da linha, [(nome, posição)])
+        self._attribute_lines = [
+            (f"{cat.upper()}: ", [(f"{s} ", attr_index[s]) for s in stats])
+            for cat, stats in game_data.attributes_data.items()
+        ]
+        # Atributo -> linha da sua categoria (contando a partir de _ATTRIBUTES_START)
+        self._attribute_category = {s: i for i, (_, stats) in enumerate(game_data.attributes_data.items()) for s in stats}
+        self._skill_lines = [
+            (f"{cat.upper()}: ", [(s, f"{s} ", skill_index[s]) for s in stats])
+            for cat, stats in game_data.skills_data.items()
+        ]
+
+    def _dots(self, character):
+        attributes, skills = character.attributes, character.skills
+        if attributes.layout is self.attribute_layout and skills.layout is self.skill_layout:
+            return character.attribute_dots, character.skill_dots
+        # Personagem de outro conjunto de regras: monta vetores no layout deste renderizador
+        return ([attributes.get(n, 0) for n in self.attribute_layout.names],
+                [skills.get(n, 0) for n in self.skill_layout.names])
+
+    def render_lines(self, character):
+        """Linhas da ficha, sem a quebra de linha final."""
+        attr_dots, skill_dots = self._dots(character)
+        lines = [_NAME_LINE.format(character.name.upper()), _CLAN_LINE.format(character.clan), "",
+                 "--- ATRIBUTOS ---"]
+        for prefix, stats in self._attribute_lines:
+            lines.append(prefix + ", ".join([label + str(attr_dots[i]) for label, i in stats]))
+        lines.append("")
+        lines.append("--- PERÍCIAS ---")
+        specialties = character.specialties
+        for prefix, stats in self._skill_lines:
+            parts = []
+            for name, label, i in stats:
+                value = skill_dots[i]
+                if value > 0:
+                    if name in specialties:
+                        parts.append(f"{label}{value} ({', '.join(specialties[name])})")
+                    else:
+                        parts.append(label + str(value))
+            if parts:
+                lines.append(prefix + ", ".join(parts))
+        if character.disciplines:
+            lines.append("")
+            lines.append("--- DISCIPLINAS ---")
+            lines.append(", ".join([f"{name} {level}" for name, level in sorted(character.disciplines.items())]))
+        return lines
+
+    def changed_lines(self, character, keys):
+        """
+        {índice: linha} só das linhas afetadas por `keys` (eventos do CharacterModel), ou None
+        quando é preciso refazer a ficha: perícias e disciplinas mudam quantas linhas existem.
+        Campos que não aparecem na ficha (crônica, conceito...) não afetam nenhuma linha.
+        """
+        lines = {}
+        for kind, name in keys:
+            if kind == "attributes":
+                category = self._attribute_category.get(name)
+                if category is None:
+                    return None
+                if _ATTRIBUTES_START + category not in lines:
+                    attr_dots = self._dots(character)[0]
+                    prefix, stats = self._attribute_lines[category]
+                    lines[_ATTRIBUTES_START + category] = prefix + ", ".join([label + str(attr_dots[i]) for label, i in stats])
+            elif kind == "info":
+                if name == "name":
+                    lines[0] = _NAME_LINE.format(character.name.upper())
+                elif name == "clan":
+                    lines[1] = _CLAN_LINE.format(character.clan)
+            else:
+                return None
+        return lines
+
+    def render(self, character):
+        return "\n".join(self.render_lines(character)) + "\n"
+
+    def render_to_file(self, character, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.render(character))
+
+
+def sheet_filename(index, character):
+    """Nome de arquivo seguro e único para a ficha."""
+    slug = re.sub(r"[^\w-]+", "_", character.name, flags=re.UNICODE).strip("_") or "personagem"
+    return f"{index:07d}_{slug[:60]}.txt"
+
+
+def _init_worker(data_dir):
+    global _worker_renderer
+    _worker_renderer = SheetRenderer(load_registry(data_dir))
+
+
+def _render_chunk(out_dir, start, characters):
+    for offset, character in enumerate(characters):
+        _worker_renderer.render_to_file(character, os.path.join(out_dir, sheet_filename(start + offset, character)))
+    return len(characters)
+
+
+def render_batch(characters, out_dir, processes=None, chunk_size=500, data_dir=None):
+    """
+    Renderiza cada personagem num arquivo .txt em out_dir. Com processes=1 roda no próprio
+    processo; senão divide o trabalho em blocos num pool de processos. Retorna quantas fichas gravou.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    characters = iter(characters)
+    chunks = iter(lambda: list(islice(characters, chunk_size)), [])
+    total = 0
+    if processes == 1:
+        _init_worker(data_dir)
+        for chunk in chunks:
+            total += _render_chunk(out_dir, total, chunk)
+        return total
+    processes = processes or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(data_dir,)) as pool:
+        pending, start = deque(), 0
+        for chunk in chunks:
+            pending.append(pool.submit(_render_chunk, out_dir, start, chunk))
+            start += len(chunk)
+            # Poucos blocos à frente dos já gravados: a entrada continua sendo lida sob demanda
+            if len(pending) >= 2 * processes:
+                total += pending.popleft().result()
+        while pending:
+            total += pending.popleft().result()
+    return total
+
+
+def _benchmark(count=20000, seed=0):
+    from rules import CreationRules, random_spec
+    game_data = load_registry()
+    rules = CreationRules.from_game_data(game_data)
+    rng = random.Random(seed)
+    characters = [rules.build(random_spec(rules, rng, f"NPC {i}")) for i in range(count)]
+    renderer = SheetRenderer(game_data)
+    start = time.perf_counter()
+    for character in characters:
+        renderer.render(character)
+    elapsed = time.perf_counter() - start
+    print(f"Em memória: {count / elapsed:,.0f} fichas/s")
+    for processes in sorted({1, os.cpu_count() or 1}):
+        with tempfile.TemporaryDirectory() as tmp:
+            start = time.perf_counter()
+            written = render_batch(characters, tmp, processes=processes)
+            elapsed = time.perf_counter() - start
+        print(f"Arquivos, {processes} processo(s): {written:,} fichas em {elapsed:.2f}s ({written / elapsed:,.0f} fichas/s)")
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,331 @@
+# src/store.py
+
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import tempfile
+from itertools import islice
+
+from character import BASIC_INFO_FIELDS, stat_layout
+from registry import load_registry
+
+SCHEMA_VERSION = 1
+INFO_COLUMNS = ("name", "clan") + BASIC_INFO_FIELDS
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS characters (
+    id INTEGER PRIMARY KEY,
+    {", ".join(f"{c} TEXT NOT NULL DEFAULT ''" for c in INFO_COLUMNS)},
+    dots BLOB NOT NULL,
+    specialties TEXT NOT NULL DEFAULT '{{}}'
+);
+CREATE TABLE IF NOT EXISTS disciplines (
+    character_id INTEGER NOT NULL REFERENCES characters(id) ON DELETE CASCADE,
+    discipline TEXT NOT NULL,
+    dots INTEGER NOT NULL,
+    PRIMARY KEY (character_id, discipline)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_characters_clan ON characters(clan);
+CREATE INDEX IF NOT EXISTS idx_characters_chronicle ON characters(chronicle, clan);
+CREATE INDEX IF NOT EXISTS idx_characters_player ON characters(player);
+CREATE INDEX IF NOT EXISTS idx_characters_sire ON characters(sire);
+CREATE INDEX IF NOT EXISTS idx_disciplines_dots ON disciplines(discipline, dots, character_id);
+"""
+
+_INSERT_CHARACTER = (f"INSERT INTO characters (id, {', '.join(INFO_COLUMNS)}, dots, specialties) "
+                     f"VALUES (?, {', '.join('?' for _ in INFO_COLUMNS)}, ?, ?)")
+_INSERT_DISCIPLINE = "INSERT INTO disciplines (character_id, discipline, dots) VALUES (?, ?, ?)"
+_SELECT_CHARACTER = f"SELECT id, {', '.join(INFO_COLUMNS)}, dots, specialties FROM characters"
+# Filtros aceitos por find(); cada um vira uma cláusula fixa, então o SQL gerado é sempre um dos poucos
+# textos possíveis e o cache de statements do sqlite3 reaproveita a preparação
+_FILTERS = {
+    "clan": "c.clan = ?",
+    "chronicle": "c.chronicle = ?",
+    "player": "c.player = ?",
+    "sire": "c.sire = ?",
+}
+
+
+class ChronicleStore:
+    """
+    Persistência de personagens em SQLite (modo WAL). Atributos e perícias ficam num BLOB
+    no mesmo layout do Character; disciplinas numa tabela própria, indexada por (disciplina, pontos).
+    """
+    def __init__(self, path, game_data=None):
+        self.path = path
+        self.game_data = game_data or load_registry()
+        self.conn = sqlite3.connect(path, cached_statements=256)
+        self._writes = 0
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        with self.conn:
+            self.conn.executescript(_SCHEMA)
+        self._load_layout()
+
+    def _load_layout(self):
+        """
+        Guarda a ordem dos atributos/perícias do banco. Se as regras mudaram desde a gravação,
+        regrava os BLOBs no layout atual (casando os valores pelo nome) antes de qualquer uso.
+        """
+        game_data = self.game_data
+        layout = [list(game_data.attribute_names), list(game_data.skill_names)]
+        self._layouts = (game_data.attribute_layout, game_data.skill_layout)
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'layout'").fetchone()
+        if row is None:
+            with self.conn:
+                self.conn.execute("INSERT INTO meta (key, value) VALUES ('layout', ?)", (json.dumps(layout, ensure_ascii=False),))
+                self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('schema_version', ?)", (str(SCHEMA_VERSION),))
+            return
+        stored = json.loads(row[0])
+        if stored != layout:
+            self._migrate(stored, layout)
+
+    def _migrate(self, stored, layout):
+        stored_layouts = (stat_layout(stored[0]), stat_layout(stored[1]))
+        with self.conn:
+            rows = self.conn.execute("SELECT id, dots FROM characters").fetchall()
+            self.conn.executemany("UPDATE characters SET dots = ? WHERE id = ?",
+                                  [(self._encode(stored_layouts, dots), character_id) for character_id, dots in rows])
+            self.conn.execute("UPDATE meta SET value = ? WHERE key = 'layout'", (json.dumps(layout, ensure_ascii=False),))
+
+    def _encode(self, layouts, dots):
+        """Pontos gravados em outro layout -> BLOB no layout das regras atuais (nomes ausentes ficam no padrão)."""
+        attr_layout, skill_layout = self._layouts
+        encoded = bytearray(b"\x01" * len(attr_layout) + bytes(len(skill_layout)))
+        n_attrs = len(layouts[0])
+        for names, values, target, offset in ((layouts[0].names, dots[:n_attrs], attr_layout, 0),
+                                              (layouts[1].names, dots[n_attrs:], skill_layout, len(attr_layout))):
+            for name, value in zip(names, values):
+                i = target.index.get(name)
+                if i is not None:
+                    encoded[offset + i] = value
+        return bytes(encoded)
+
+    @property
+    def version(self):
+        """
+        Muda sempre que o banco muda (para caches como o de analytics.py): as escritas desta
+        conexão e, pelo PRAGMA data_version do SQLite, as que outras conexões confirmaram.
+        """
+        return self._writes, self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- ESCRITA ---
+    def _next_id(self):
+        return (self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM characters").fetchone()[0]) + 1
+
+    def _rows(self, character_id, character):
+        info = [character.name, character.clan or ""] + [getattr(character, f) or "" for f in BASIC_INFO_FIELDS]
+        layouts = character.layouts
+        # O BLOB vai sempre no layout do banco; personagem de outras regras é convertido pelo nome
+        dots = bytes(character.dots) if layouts == self._layouts else self._encode(layouts, character.dots)
+        char_row = (character_id, *info, dots,
+                    json.dumps(character.specialties, ensure_ascii=False))
+        disc_rows = [(character_id, d, v) for d, v in character.disciplines.items()]
+        return char_row, disc_rows
+
+    def add(self, character):
+        """Grava um personagem e retorna o seu id."""
+        return self.add_many([character])[0]
+
+    def add_many(self, characters, batch_size=10000):
+        """Grava em lotes, uma transação por lote, com executemany. Retorna a lista de ids."""
+        ids = []
+        characters = iter(characters)
+        while True:
+            batch = list(islice(characters, batch_size))
+            if not batch:
+                return ids
+            with self.conn:
+                # Trava de escrita antes de ler MAX(id): outra conexão (WAL) não pega os mesmos ids
+                self.conn.execute("BEGIN IMMEDIATE")
+                next_id = self._next_id()
+                char_rows, disc_rows = [], []
+                for offset, character in enumerate(batch):
+                    char_row, discs = self._rows(next_id + offset, character)
+                    char_rows.append(char_row)
+                    disc_rows.extend(discs)
+                self.conn.executemany(_INSERT_CHARACTER, char_rows)
+                self.conn.executemany(_INSERT_DISCIPLINE, disc_rows)
+            ids.extend(range(next_id, next_id + len(batch)))
+            self._writes += 1
+
+    def delete(self, character_id):
+        with self.conn:
+            self.conn.execute("DELETE FROM characters WHERE id = ?", (character_id,))
+        self._writes += 1
+
+    # --- LEITURA ---
+    def _row_to_character(self, row):
+        character = self.game_data.new_character(row[1])
+        character.clan = row[2] or None
+        if character.clan:
+            character.bane = self.game_data.clans_data.get(character.clan, {}).get("bane")
+        for field, value in zip(BASIC_INFO_FIELDS, row[3:3 + len(BASIC_INFO_FIELDS)]):
+            setattr(character, field, value)
+        dots = row[-2]
+        n_attrs = len(self.game_data.attribute_names)
+        character.attribute_dots[:] = dots[:n_attrs]
+        character.skill_dots[:] = dots[n_attrs:]
+        for skill, texts in json.loads(row[-1]).items():
+            for text in texts:
+                character.add_specialty(skill, text)
+        return character
+
+    def _attach_disciplines(self, pairs):
+        by_id = {character_id: character for character_id, character in pairs}
+        if not by_id:
+            return
+        placeholders = ", ".join("?" for _ in by_id)
+        for character_id, discipline, dots in self.conn.execute(
+                f"SELECT character_id, discipline, dots FROM disciplines WHERE character_id IN ({placeholders})",
+                tuple(by_id)):
+            by_id[character_id].disciplines[discipline] = dots
+
+    def get(self, character_id):
+        row = self.conn.execute(f"{_SELECT_CHARACTER} WHERE id = ?", (character_id,)).fetchone()
+        if row is None:
+            return None
+        character = self._row_to_character(row)
+        self._attach_disciplines([(character_id, character)])
+        return character
+
+    def _where(self, filters, discipline, min_dots):
+        clauses, params = [], []
+        for key, value in filters.items():
+            if key not in _FILTERS:
+                raise ValueError(f"Filtro desconhecido: '{key}'")
+            if value is not None:
+                clauses.append(_FILTERS[key])
+                params.append(value)
+        join = ""
+        if discipline is not None:
+            join = " JOIN disciplines d ON d.character_id = c.id AND d.discipline = ? AND d.dots >= ?"
+            params = [discipline, min_dots] + params
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return join + where, params
+
+    def find_ids(self, discipline=None, min_dots=1, limit=None, **filters):
+        """Ids que batem com os filtros (clan, chronicle, player, sire) e, opcionalmente, disciplina >= min_dots."""
+        sql, params = self._where(filters, discipline, min_dots)
+        sql = f"SELECT c.id FROM characters c{sql} ORDER BY c.id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [row[0] for row in self.conn.execute(sql, params)]
+
+    def count(self, discipline=None, min_dots=1, **filters):
+        sql, params = self._where(filters, discipline, min_dots)
+        return self.conn.execute(f"SELECT COUNT(*) FROM characters c{sql}", params).fetchone()[0]
+
+    def find(self, discipline=None, min_dots=1, limit=None, batch_size=1000, **filters):
+        """Como find_ids, mas gera (id, Character) em lotes, sem carregar tudo na memória."""
+        ids = self.find_ids(discipline, min_dots, limit, **filters)
+        for start in range(0, len(ids), batch_size):
+            chunk = ids[start:start + batch_size]
+            placeholders = ", ".join("?" for _ in chunk)
+            pairs = [(row[0], self._row_to_character(row))
+                     for row in self.conn.execute(f"{_SELECT_CHARACTER} WHERE id IN ({placeholders}) ORDER BY id", chunk)]
+            self._attach_disciplines(pairs)
+            yield from pairs
+
+    def clan_members_with_discipline(self, clan, chronicle, discipline, min_dots):
+        """Ex.: todos os Ventrue da crônica X com Dominação >= 2."""
+        return self.find(discipline=discipline, min_dots=min_dots, clan=clan, chronicle=chronicle)
+
+    def sire_pairs(self):
+        """(id, nome, senhor) de todos os personagens, em ordem de gravação — base do índice de linhagem."""
+        return self.conn.execute("SELECT id, name, sire FROM characters ORDER BY id")
+
+    def iter_all(self, batch_size=1000):
+        return self.find(batch_size=batch_size)
+
+
+def _check_rule_change():
+    """Banco gravado com umas regras e reaberto com outras (atributo novo): nada pode sair deslocado."""
+    from registry import GameData
+    old = load_registry()
+    source = old.source_data
+    attributes = {category: list(stats) for category, stats in source["attributes"].items()}
+    first = next(iter(attributes))
+    attributes[first].insert(0, "Nova")
+    new = GameData(source["clans"], attributes, source["skills"], source["disciplines"], source["aliases"])
+    before = old.new_character("Antigo")
+    before.attributes["Força"] = 4
+    before.skills["Briga"] = 3
+    after = new.new_character("Novo")
+    after.attributes["Nova"] = 4
+    after.attributes["Destreza"] = 3
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cronica.db")
+        with ChronicleStore(path, old) as store:
+            old_id = store.add(before)
+        with ChronicleStore(path, new) as store:
+            new_id = store.add(after)
+            # Personagem ainda no layout antigo, gravado depois da migração
+            stale_id = store.add(before)
+            read = {i: store.get(i) for i in (old_id, new_id, stale_id)}
+    ok = all(dict(read[i].attributes) == {**dict(new.new_character().attributes), **expected}
+             for i, expected in ((old_id, {"Força": 4}), (new_id, {"Nova": 4, "Destreza": 3}), (stale_id, {"Força": 4})))
+    ok = ok and read[old_id].skills["Briga"] == 3 and read[stale_id].skills["Briga"] == 3
+    print(f"Regras alteradas (atributo novo): valores preservados pelo nome: {ok}")
+    return ok
+
+
+def _benchmark(count=1_000_000, seed=0):
+    if not _check_rule_change():
+        print("Erro: o banco trocou valores de lugar ao mudar as regras!")
+    from rules import CreationRules, random_spec
+    game_data = load_registry()
+    rules = CreationRules.from_game_data(game_data)
+    rng = random.Random(seed)
+    # Alguns milhares de fichas legais, reaproveitadas com nomes/crônicas diferentes
+    templates = [rules.build(random_spec(rules, rng, "NPC")) for _ in range(2000)]
+    chronicles = [f"Crônica {i}" for i in range(50)]
+
+    def roster():
+        for i in range(count):
+            character = templates[i % len(templates)]
+            character.name = f"NPC {i}"
+            character.chronicle = chronicles[i % len(chronicles)]
+            character.player = f"Jogador {i % 500}"
+            yield character
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with ChronicleStore(os.path.join(tmp, "cronica.db"), game_data) as store:
+            start = time.perf_counter()
+            store.add_many(roster())
+            elapsed = time.perf_counter() - start
+            print(f"Inserção: {count:,} personagens em {elapsed:.1f}s ({count / elapsed:,.0f}/s)")
+            queries = [
+                ("Ventrue na Crônica 7 com Dominação >= 2",
+                 lambda: list(store.clan_members_with_discipline("Ventrue", "Crônica 7", "Dominação", 2))),
+                ("contagem por jogador", lambda: store.count(player="Jogador 42")),
+                ("ids de Brujah com Potência >= 2", lambda: store.find_ids(discipline="Potência", min_dots=2, clan="Brujah")),
+            ]
+            for label, query in queries:
+                start = time.perf_counter()
+                result = query()
+                elapsed = time.perf_counter() - start
+                size = result if isinstance(result, int) else len(result)
+                print(f"  {label}: {size:,} resultados em {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    _benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,265 @@
+# src/sync.py
+
+import sys
+import time
+import random
+import struct
+import threading
+from collections import deque, namedtuple
+
+from trackers import Tracker
+
+TRACKERS = ("health", "willpower")
+# Quantos eventos um inscrito sem callback pode acumular antes de ser ressincronizado com uma foto nova
+MAX_PENDING = 1024
+
+# Eventos de um canal (um personagem). `seq` é a posição no canal; a foto vale até seq, inclusive
+TrackerDelta = namedtuple("TrackerDelta", ["seq", "tracker", "index", "state"])
+TrackerResize = namedtuple("TrackerResize", ["seq", "tracker", "size"])
+# states traz todas as caixas de cada medidor, inclusive as escondidas; sizes, quantas estão à vista
+TrackerSnapshot = namedtuple("TrackerSnapshot", ["seq", "states", "sizes"])
+
+# Formato compacto para mandar um delta pela rede: seq (4 bytes), tipo, medidor, índice/tamanho, estado
+_EVENT_STRUCT = struct.Struct("!IBBBB")
+_DELTA, _RESIZE = 0, 1
+
+
+def pack_event(event):
+    """8 bytes por delta ou redimensionamento (a foto vai inteira, só na entrada do inscrito)."""
+    tracker = TRACKERS.index(event.tracker)
+    if isinstance(event, TrackerDelta):
+        return _EVENT_STRUCT.pack(event.seq, _DELTA, tracker, event.index, event.state)
+    return _EVENT_STRUCT.pack(event.seq, _RESIZE, tracker, event.size, 0)
+
+
+def unpack_event(data):
+    seq, kind, tracker, value, state = _EVENT_STRUCT.unpack(data)
+    if kind == _DELTA:
+        return TrackerDelta(seq, TRACKERS[tracker], value, state)
+    return TrackerResize(seq, TRACKERS[tracker], value)
+
+
+class Subscription:
+    """
+    Inscrição num canal. Com callback, cada evento é entregue na hora, na thread de quem publicou.
+    Sem callback, os eventos ficam numa fila lida por poll() (ex.: pelo after() de uma janela Tk).
+    """
+    def __init__(self, broker, channel, callback=None):
+        self.broker = broker
+        self.channel = channel
+        self.callback = callback
+        self.pending = deque()
+        self.resyncs = 0
+
+    def _deliver(self, event):
+        if self.callback is not None:
+            self.callback(event)
+        else:
+            self.pending.append(event)
+
+    def poll(self):
+        """Eventos acumulados desde a última consulta, em ordem (uma foto, se houve ressincronização)."""
+        with self.broker._lock:
+            events = list(self.pending)
+            self.pending.clear()
+        return events
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class _Channel:
+    def __init__(self):
+        self.seq = 0
+        self.trackers = {name: Tracker() for name in TRACKERS}
+        self.subscribers = []
+
+    def snapshot(self):
+        return TrackerSnapshot(self.seq, {name: tuple(t.states) for name, t in self.trackers.items()},
+                               {name: t.size for name, t in self.trackers.items()})
+
+
+class TrackerBroker:
+    """
+    Canal publish/subscribe dos medidores, em processo (no lugar da rede). Cada canal guarda o
+    estado atual dos medidores para quem entra depois: o inscrito recebe uma foto e, a partir
+    dela, só os deltas (medidor, índice, novo estado) e redimensionamentos.
+    """
+    def __init__(self, max_pending=MAX_PENDING):
+        self.max_pending = max_pending
+        self._channels = {}
+        self._lock = threading.RLock()
+
+    def _channel(self, channel):
+        found = self._channels.get(channel)
+        if found is None:
+            found = self._channels[channel] = _Channel()
+        return found
+
+    def channels(self):
+        with self._lock:
+            return list(self._channels)
+
+    def subscribe(self, channel, callback=None):
+        """Inscreve no canal; o primeiro evento entregue é sempre a foto atual."""
+        with self._lock:
+            state = self._channel(channel)
+            subscription = Subscription(self, channel, callback)
+            state.subscribers.append(subscription)
+            subscription._deliver(state.snapshot())
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._channels[subscription.channel].subscribers
+            if subscription in subscribers:
+                subscribers.remove(subscription)
+
+    def publish(self, channel, tracker, index, state):
+        """Uma caixa mudou de estado. Retorna o delta publicado."""
+        with self._lock:
+            ch = self._channel(channel)
+            target = ch.trackers[tracker]
+            if index >= target.size:
+                target.resize(index + 1)
+            target.set_state(index, state)
+            ch.seq += 1
+            return self._broadcast(ch, TrackerDelta(ch.seq, tracker, index, state))
+
+    def publish_resize(self, channel, tracker, size):
+        with self._lock:
+            ch = self._channel(channel)
+            ch.trackers[tracker].resize(size)
+            ch.seq += 1
+            return self._broadcast(ch, TrackerResize(ch.seq, tracker, size))
+
+    def snapshot(self, channel):
+        with self._lock:
+            return self._channel(channel).snapshot()
+
+    def _broadcast(self, ch, event):
+        for subscription in ch.subscribers:
+            if subscription.callback is None and len(subscription.pending) >= self.max_pending:
+                # Inscrito atrasado: descarta a fila e recomeça de uma foto (que já inclui este evento)
+                subscription.pending.clear()
+                subscription.pending.append(ch.snapshot())
+                subscription.resyncs += 1
+            else:
+                subscription._deliver(event)
+        return event
+
+
+class TrackerMirror:
+    """
+    Cópia dos medidores de um canal do lado de quem assiste (o painel do narrador), montada
+    com a foto e os deltas. Um salto na sequência significa evento perdido: precisa de foto nova.
+    """
+    def __init__(self):
+        self.seq = None
+        self.trackers = {name: Tracker() for name in TRACKERS}
+
+    @property
+    def states(self):
+        """Todas as caixas de cada medidor, inclusive as escondidas (como Tracker.states)."""
+        return {name: t.states for name, t in self.trackers.items()}
+
+    @property
+    def sizes(self):
+        return {name: t.size for name, t in self.trackers.items()}
+
+    @property
+    def in_sync(self):
+        return self.seq is not None
+
+    def apply(self, event):
+        """Aplica um evento. Retorna False (e fica fora de sincronia) se faltou algum evento antes dele."""
+        if isinstance(event, TrackerSnapshot):
+            self.seq = event.seq
+            self.trackers = {name: Tracker.restore(states, event.sizes[name]) for name, states in event.states.items()}
+            return True
+        if self.seq is None:
+            return False
+        if event.seq <= self.seq:
+            return True  # já incluído na foto
+        if event.seq != self.seq + 1:
+            self.seq = None
+            return False
+        self.seq = event.seq
+        # As mesmas operações do TrackerBroker, para que as caixas escondidas também batam
+        target = self.trackers[event.tracker]
+        if isinstance(event, TrackerResize):
+            target.resize(event.size)
+        else:
+            if event.index >= target.size:
+                target.resize(event.index + 1)
+            target.set_state(event.index, event.state)
+        return True
+
+
+def _self_check(subscribers=300, players=8, events=20_000, seed=0):
+    """Vários jogadores clicando; centenas de inscritos (metade entra no meio) têm de terminar iguais à origem."""
+    rng = random.Random(seed)
+    broker = TrackerBroker(max_pending=256)
+    channels = [f"Jogador {i}" for i in range(players)]
+    truth = {c: {name: Tracker() for name in TRACKERS} for c in channels}
+    for channel in channels:
+        broker.publish_resize(channel, "health", 5)
+        broker.publish_resize(channel, "willpower", 2)
+        truth[channel]["health"].resize(5)
+        truth[channel]["willpower"].resize(2)
+    watchers, delivered = [], [0]
+
+    def watch(channel, queued):
+        mirror = TrackerMirror()
+        if queued:
+            watchers.append((channel, mirror, broker.subscribe(channel)))
+        else:
+            def on_event(event, mirror=mirror):
+                delivered[0] += 1
+                mirror.apply(event)
+            watchers.append((channel, mirror, broker.subscribe(channel, on_event)))
+
+    for i in range(subscribers // 2):
+        watch(channels[i % players], queued=i % 3 == 0)
+    start = time.perf_counter()
+    for n in range(events):
+        channel = rng.choice(channels)
+        trackers = truth[channel]
+        if rng.random() < 0.02:
+            name, size = rng.choice(TRACKERS), rng.randint(3, 10)
+            trackers[name].resize(size)
+            broker.publish_resize(channel, name, size)
+        else:
+            name = rng.choice(TRACKERS)
+            index = rng.randrange(trackers[name].size)
+            state = trackers[name].cycle(index)
+            broker.publish(channel, name, index, state)
+        if n == events // 2:
+            for i in range(subscribers // 2, subscribers):
+                watch(channels[i % players], queued=i % 3 == 0)
+        if n % 500 == 0:
+            # Inscritos com fila leem de vez em quando (alguns ficam para trás e são ressincronizados)
+            for channel_name, mirror, subscription in watchers:
+                if subscription.callback is None and rng.random() < 0.5:
+                    for event in subscription.poll():
+                        mirror.apply(event)
+    elapsed = time.perf_counter() - start
+    mismatched = 0
+    for channel, mirror, subscription in watchers:
+        for event in subscription.poll():
+            mirror.apply(event)
+        expected = {name: t.states for name, t in truth[channel].items()}
+        sizes = {name: t.size for name, t in truth[channel].items()}
+        mismatched += (not mirror.in_sync) or mirror.states != expected or mirror.sizes != sizes
+    resyncs = sum(s.resyncs for _, _, s in watchers)
+    assert unpack_event(pack_event(TrackerDelta(7, "health", 3, 2))) == TrackerDelta(7, "health", 3, 2)
+    snapshot_size = sum(len(states) for states in broker.snapshot(channels[0]).states.values())
+    print(f"{events:,} eventos, {len(watchers)} inscritos em {players} canais: {elapsed:.2f}s "
+          f"({delivered[0] / elapsed:,.0f} entregas/s por callback)")
+    print(f"Delta: {_EVENT_STRUCT.size} bytes (foto: {snapshot_size} caixas); ressincronizações: {resyncs}; "
+          f"cópias divergentes: {mismatched}")
+    return mismatched == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if _self_check(int(sys.argv[1]) if len(sys.argv) > 1 else 300) else 1)
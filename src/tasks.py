@@ -0,0 +1,200 @@
+# src/tasks.py
+
+import os
+import sys
+import time
+import heapq
+import tempfile
+import threading
+import traceback
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+from registry import load_registry
+from roster import write_roster
+
+# Intervalo (ms) entre as consultas às tarefas em andamento
+POLL_MS = 50
+
+
+class TaskCancelled(Exception):
+    """Levantada dentro da tarefa quando o cancelamento foi pedido."""
+
+
+class Task:
+    """
+    O que a função em segundo plano recebe: consulta o cancelamento e informa o progresso.
+    Guarda só o último progresso; a interface lê quando consulta, então não há fila crescendo.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.future = None
+        self._cancel_event = threading.Event()
+        self._progress = None
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    @property
+    def done(self):
+        return self.future is not None and self.future.done()
+
+    def check(self):
+        """Interrompe a tarefa (TaskCancelled) se o cancelamento foi pedido."""
+        if self._cancel_event.is_set():
+            raise TaskCancelled(self.name)
+
+    def report(self, done, total=None):
+        self._progress = (done, total)
+
+    def track(self, items, total=None, every=1000):
+        """Repassa `items`, conferindo o cancelamento e informando o progresso a cada `every` itens."""
+        done = 0
+        self.report(0, total)
+        for item in items:
+            if done % every == 0:
+                self.check()
+                self.report(done, total)
+            yield item
+            done += 1
+        self.report(done, total)
+
+
+class TaskRunner:
+    """
+    Executor de segundo plano para a GUI: as funções rodam num pool de threads e o resultado,
+    o erro e o progresso voltam para a thread do Tk por `schedule` (o `after` da janela),
+    então os callbacks podem mexer nos widgets. Só consulta enquanto há tarefas em andamento.
+    """
+    def __init__(self, schedule, max_workers=2, poll_ms=POLL_MS):
+        self._schedule = schedule
+        self._poll_ms = poll_ms
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tarefas")
+        self._active = []
+        self._polling = False
+
+    def submit(self, fn, *args, on_done=None, on_error=None, on_progress=None, on_cancel=None, **kwargs):
+        """
+        Roda fn(task, *args, **kwargs) em segundo plano e devolve o Task (para cancelar).
+        on_done(resultado), on_error(exceção), on_progress(feito, total) e on_cancel() rodam na thread do Tk.
+        """
+        task = Task(getattr(fn, "__name__", "tarefa"))
+        task.future = self._executor.submit(fn, task, *args, **kwargs)
+        self._active.append([task, None, (on_done, on_error, on_progress, on_cancel)])
+        if not self._polling:
+            self._polling = True
+            self._schedule(self._poll_ms, self._poll)
+        return task
+
+    def _poll(self):
+        # Callbacks podem submeter novas tarefas; elas entram em self._active durante o laço
+        active, self._active = self._active, []
+        running = []
+        for entry in active:
+            task, shown, (on_done, on_error, on_progress, on_cancel) = entry
+            progress = task._progress
+            if on_progress is not None and progress is not None and progress != shown:
+                entry[1] = progress
+                on_progress(*progress)
+            if not task.future.done():
+                running.append(entry)
+                continue
+            try:
+                result = task.future.result()
+            except TaskCancelled:
+                if on_cancel is not None: on_cancel()
+            except Exception as e:
+                if on_error is not None: on_error(e)
+                else: print(f"Erro na tarefa '{task.name}':\n{''.join(traceback.format_exception(e))}", file=sys.stderr)
+            else:
+                if on_done is not None: on_done(result)
+        self._active = running + self._active
+        if self._active:
+            self._schedule(self._poll_ms, self._poll)
+        else:
+            self._polling = False
+
+    def cancel_all(self):
+        for task, _, _ in self._active:
+            task.cancel()
+
+    def shutdown(self):
+        """Cancela o que estiver rodando e libera as threads sem esperar por elas."""
+        self.cancel_all()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# --- TAREFAS DE E/S ---
+def export_roster(task, path, characters, total=None, game_data=None):
+    """
+    Grava um roster (.jsonl/.csv) em segundo plano. Escreve num arquivo temporário ao lado
+    e só troca pelo destino no fim: cancelar ou falhar não deixa um roster pela metade.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, partial = tempfile.mkstemp(prefix=".exportando-", suffix=os.path.splitext(path)[1], dir=directory)
+    os.close(fd)
+    try:
+        written = write_roster(partial, task.track(characters, total), game_data)
+        os.replace(partial, path)
+    except BaseException:
+        os.remove(partial)
+        raise
+    return written
+
+
+def export_npcs(task, path, count, seed=0, game_data=None):
+    """Gera `count` NPCs (npc.py) e grava o roster, com progresso e cancelamento."""
+    from npc import generate_npcs
+    game_data = game_data or load_registry()
+    return export_roster(task, path, generate_npcs(count, seed, game_data=game_data), count, game_data)
+
+
+def _benchmark(count=100_000):
+    """Exporta um roster numa tarefa enquanto um laço tipo mainloop mede o atraso dos seus eventos."""
+    timers, gaps, order = [], [], itertools.count()
+    schedule = lambda ms, fn: heapq.heappush(timers, (time.perf_counter() + ms / 1000, next(order), fn))
+    last_tick = [time.perf_counter()]
+
+    def tick():
+        now = time.perf_counter()
+        gaps.append(now - last_tick[0])
+        last_tick[0] = now
+        schedule(16, tick)
+
+    finished = []
+    runner = TaskRunner(schedule)
+    game_data = load_registry()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "npcs.jsonl")
+        start = time.perf_counter()
+        runner.submit(export_npcs, path, count, game_data=game_data,
+                      on_done=lambda n: finished.append(n), on_error=lambda e: finished.append(e))
+        schedule(16, tick)
+        while not finished:
+            when, _, fn = heapq.heappop(timers)
+            time.sleep(max(0.0, when - time.perf_counter()))
+            fn()
+        elapsed = time.perf_counter() - start
+        print(f"Exportação de {finished[0]:,} NPCs em segundo plano: {elapsed:.2f}s")
+        gaps_ms = sorted(g * 1000 for g in gaps)
+        print(f"Laço de eventos (alvo 16 ms): {len(gaps_ms)} ciclos, mediana {gaps_ms[len(gaps_ms) // 2]:.1f} ms, "
+              f"pior {gaps_ms[-1]:.1f} ms")
+        # Cancelamento: a tarefa para no próximo bloco e não deixa arquivo para trás
+        cancelled = []
+        task = runner.submit(export_npcs, os.path.join(tmp, "cancelado.jsonl"), count, game_data=game_data,
+                             on_cancel=lambda: cancelled.append(True))
+        task.cancel()
+        while not cancelled:
+            when, _, fn = heapq.heappop(timers)
+            time.sleep(max(0.0, when - time.perf_counter()))
+            fn()
+        print(f"Cancelada: {task.cancelled}; arquivos restantes: {sorted(os.listdir(tmp))}")
+    runner.shutdown()
+
+
+if __name__ == "__main__":
+    _benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,52 @@
+# src/trackers.py
+
+# Estados de cada caixa dos medidores de Vitalidade e Força de Vontade
+EMPTY, SUPERFICIAL, AGGRAVATED = 0, 1, 2
+STATE_COUNT = 3
+
+
+class Tracker:
+    """
+    Estado de um medidor (lista de caixas vazias/superficiais/agravadas), sem nenhum widget.
+    `states` é sempre a mesma lista, alterada no lugar, para quem guardar uma referência a ela.
+    Ela guarda todas as caixas que o medidor já teve; só as `size` primeiras estão à vista.
+    """
+    def __init__(self, size=0):
+        self.states = [EMPTY] * size
+        self.visible = size
+
+    @classmethod
+    def restore(cls, states, size):
+        """Medidor com estes estados (inclusive os escondidos) e `size` caixas à vista."""
+        tracker = cls()
+        tracker.states.extend(states)
+        tracker.resize(size)
+        return tracker
+
+    @property
+    def size(self):
+        return self.visible
+
+    @property
+    def visible_states(self):
+        return self.states[:self.visible]
+
+    def resize(self, new_size):
+        """
+        Mostra ou esconde caixas do fim. As escondidas guardam o dano marcado e voltam com ele;
+        a lista só cresce quando o medidor passa do maior tamanho que já teve.
+        """
+        new_size = max(new_size, 0)
+        if new_size > len(self.states):
+            self.states.extend([EMPTY] * (new_size - len(self.states)))
+        self.visible = new_size
+
+    def cycle(self, index):
+        """Avança a caixa: vazia -> superficial -> agravada -> vazia. Retorna o novo estado."""
+        self.states[index] = (self.states[index] + 1) % STATE_COUNT
+        return self.states[index]
+
+    def set_state(self, index, state):
+        if not 0 <= state < STATE_COUNT:
+            raise ValueError(f"Estado de medidor inválido: {state}")
+        self.states[index] = state
@@ -0,0 +1,285 @@
+# src/validator.py
+
+import sys
+import time
+import random
+from collections import namedtuple
+from itertools import chain, islice, repeat
+from operator import attrgetter
+
+import numpy as np
+
+from registry import load_registry
+from rules import ATTRIBUTE_STAGES, SKILL_STAGES, DISCIPLINE_DOTS, MAX_DOTS
+
+# Códigos das violações, na ordem em que aparecem no relatório
+MISSING_NAME = "missing_name"
+ATTRIBUTE_DISTRIBUTION = "attribute_distribution"
+SKILL_DISTRIBUTION = "skill_distribution"
+INVALID_CLAN = "invalid_clan"
+INVALID_DISCIPLINES = "invalid_disciplines"
+MISSING_SPECIALTY = "missing_specialty"
+SPECIALTY_WITHOUT_DOTS = "specialty_without_dots"
+UNKNOWN_SPECIALTY_SKILL = "unknown_specialty_skill"
+
+MESSAGES = {
+    MISSING_NAME: "Personagem precisa de um nome.",
+    ATTRIBUTE_DISTRIBUTION: "Distribuição de atributos inválida (esperado 4/3/3/3/2/2/2/2/1).",
+    SKILL_DISTRIBUTION: "Distribuição de perícias inválida (esperado 3/5/7 perícias com 3/2/1 pontos).",
+    INVALID_CLAN: "Clã inválido.",
+    INVALID_DISCIPLINES: "Disciplinas inválidas (esperado 2 + 1 pontos em Disciplinas do clã).",
+    MISSING_SPECIALTY: "A perícia '{}' precisa de uma especialidade.",
+    SPECIALTY_WITHOUT_DOTS: "Especialidade em '{}', que não tem pontos.",
+    UNKNOWN_SPECIALTY_SKILL: "Especialidade numa perícia que não existe nas regras.",
+}
+
+Violation = namedtuple("Violation", ["row", "code", "message", "detail"])
+
+
+class StatBlocks:
+    """
+    Um roster inteiro como arrays (uma linha por personagem):
+    attributes/skills (uint8, ordem do layout), clans (código, -1 = desconhecido),
+    disciplines (bool, tem a entrada; uma coluna por disciplina conhecida + uma para "outras"),
+    discipline_dots (pontos das entradas em ordem decrescente, só as primeiras len(DISCIPLINE_DOTS);
+    -1 = vazio ou fora de 0..MAX_DOTS), discipline_counts (quantas entradas),
+    specialties (bool, perícia tem especialidade com texto), specialty_entries (bool, perícia aparece
+    nas especialidades, mesmo vazia), stray_specialties (especialidade em perícia inexistente).
+    """
+    def __init__(self, attributes, skills, clans, disciplines, discipline_dots, discipline_counts,
+                 specialties, specialty_entries, stray_specialties, has_name):
+        self.attributes = attributes
+        self.skills = skills
+        self.clans = clans
+        self.disciplines = disciplines
+        self.discipline_dots = discipline_dots
+        self.discipline_counts = discipline_counts
+        self.specialties = specialties
+        self.specialty_entries = specialty_entries
+        self.stray_specialties = stray_specialties
+        self.has_name = has_name
+
+    def __len__(self):
+        return len(self.attributes)
+
+
+class BulkValidator:
+    """As mesmas regras de CreationRules.validate, aplicadas a todas as linhas de uma vez com NumPy."""
+    def __init__(self, game_data=None):
+        game_data = game_data or load_registry()
+        self.game_data = game_data
+        self.attribute_layout = game_data.attribute_layout
+        self.skill_layout = game_data.skill_layout
+        # Códigos = IDs do registro (ids.py)
+        ids = game_data.ids
+        self._layouts = (self.attribute_layout, self.skill_layout)
+        # Busca exata, como CreationRules.validate e a GUI: acentos e apelidos não valem aqui
+        self._clan_ids, self._discipline_ids, self._skill_ids = ids.clans.ids, ids.disciplines.ids, ids.skills.ids
+        self.clan_names = ids.clans.names
+        self.discipline_names = ids.disciplines.names
+        # A última coluna de disciplinas junta as que não existem nas regras
+        self._other_discipline = len(self.discipline_names)
+        self._allowed = np.zeros((len(self.clan_names), len(self.discipline_names) + 1), dtype=bool)
+        for clan, info in game_data.clans_data.items():
+            for d in info.get("disciplines", []):
+                self._allowed[ids.clans.id(clan), ids.disciplines.id(d)] = True
+        self.mandatory_skills = list(game_data.mandatory_specialty_skills)
+        self._mandatory_columns = np.array([ids.skills.id(s) for s in self.mandatory_skills], dtype=np.intp)
+        n_attrs = len(self.attribute_layout.names)
+        self._attribute_counts = dict(ATTRIBUTE_STAGES)
+        self._attribute_counts[1] = n_attrs - sum(ATTRIBUTE_STAGES.values())
+
+    # --- CODIFICAÇÃO ---
+    def _dots(self, character):
+        """Atributos e perícias num só vetor no layout das regras (convertidos pelo nome se preciso)."""
+        if character.layouts == self._layouts:
+            return character.dots
+        attributes, skills = character.attributes, character.skills
+        return bytes([attributes.get(s, 0) for s in self.attribute_layout.names]
+                     + [skills.get(s, 0) for s in self.skill_layout.names])
+
+    def encode(self, characters):
+        """
+        Converte personagens em StatBlocks. Em Python só se juntam os vetores de pontos e se achatam
+        disciplinas e especialidades numa lista por roster (map/chain); o resto é feito em arrays.
+        Nomes de clã, disciplina e perícia valem só exatos, como em CreationRules.validate.
+        """
+        characters = list(characters)
+        n = len(characters)
+        n_attrs, n_skills = len(self.attribute_layout.names), len(self.skill_layout.names)
+        if all(layouts == self._layouts for layouts in map(attrgetter("layouts"), characters)):
+            dots = b"".join(map(attrgetter("dots"), characters))
+        else:
+            dots = b"".join(map(self._dots, characters))
+        dots = np.frombuffer(dots, dtype=np.uint8).reshape(n, n_attrs + n_skills)
+        has_name = np.fromiter(map(bool, map(attrgetter("name"), characters)), dtype=bool, count=n)
+        clans = np.fromiter(map(self._clan_ids.get, map(attrgetter("clan"), characters), repeat(-1)),
+                            dtype=np.int16, count=n)
+
+        # Disciplinas: uma entrada por (linha, disciplina); as que não existem caem na coluna "outras"
+        entries = list(map(attrgetter("disciplines"), characters))
+        discipline_counts = np.fromiter(map(len, entries), dtype=np.int32, count=n)
+        rows = np.repeat(np.arange(n), discipline_counts)
+        columns = np.fromiter(map(self._discipline_ids.get, chain.from_iterable(entries),
+                                  repeat(self._other_discipline)), dtype=np.intp, count=len(rows))
+        values = np.fromiter(chain.from_iterable(map(dict.values, entries)), dtype=np.int64, count=len(rows))
+        disciplines = np.zeros((n, len(self.discipline_names) + 1), dtype=bool)
+        disciplines[rows, columns] = True
+        # Posição de cada entrada entre as da sua linha, em ordem decrescente de pontos
+        k = len(DISCIPLINE_DOTS)
+        order = np.lexsort((-values, rows))
+        rows, values = rows[order], values[order]
+        rank = np.arange(len(rows)) - np.searchsorted(rows, rows)
+        top = rank < k
+        values = values[top]
+        discipline_dots = np.full((n, k), -1, dtype=np.int8)
+        discipline_dots[rows[top], rank[top]] = np.where((values >= 0) & (values <= MAX_DOTS), values, -1)
+
+        # Especialidades: entrada com texto (conta para as obrigatórias) e qualquer entrada (precisa de pontos)
+        entries = list(map(attrgetter("specialties"), characters))
+        rows = np.repeat(np.arange(n), np.fromiter(map(len, entries), dtype=np.intp, count=n))
+        columns = np.fromiter(map(self._skill_ids.get, chain.from_iterable(entries), repeat(-1)),
+                              dtype=np.intp, count=len(rows))
+        filled = np.fromiter(map(bool, chain.from_iterable(map(dict.values, entries))), dtype=bool, count=len(rows))
+        known = columns >= 0
+        specialty_entries = np.zeros((n, n_skills), dtype=bool)
+        specialty_entries[rows[known], columns[known]] = True
+        specialties = np.zeros((n, n_skills), dtype=bool)
+        specialties[rows[known & filled], columns[known & filled]] = True
+        stray = np.zeros(n, dtype=bool)
+        stray[rows[~known]] = True
+        return StatBlocks(dots[:, :n_attrs], dots[:, n_attrs:], clans, disciplines, discipline_dots,
+                          discipline_counts, specialties, specialty_entries, stray, has_name)
+
+    # --- VALIDAÇÃO ---
+    def check(self, blocks):
+        """{código: array booleano por linha} — True onde a regra foi violada."""
+        attributes, skills = blocks.attributes, blocks.skills
+        attr_ok = np.ones(len(blocks), dtype=bool)
+        for value, expected in self._attribute_counts.items():
+            attr_ok &= (attributes == value).sum(axis=1) == expected
+        skill_ok = np.count_nonzero(skills, axis=1) == sum(SKILL_STAGES.values())
+        for value, expected in SKILL_STAGES.items():
+            skill_ok &= (skills == value).sum(axis=1) == expected
+        valid_clan = blocks.clans >= 0
+        # A mesma regra de CreationRules.validate: pontos em ordem decrescente == DISCIPLINE_DOTS,
+        # todas as entradas em Disciplinas do clã
+        disc_ok = valid_clan & (blocks.discipline_counts == len(DISCIPLINE_DOTS))
+        disc_ok &= (blocks.discipline_dots == np.array(DISCIPLINE_DOTS, dtype=np.int8)).all(axis=1)
+        allowed = self._allowed[np.where(valid_clan, blocks.clans, 0)]
+        disc_ok &= ~(blocks.disciplines & ~allowed).any(axis=1)
+        has_dots = skills > 0
+        return {
+            MISSING_NAME: ~blocks.has_name,
+            ATTRIBUTE_DISTRIBUTION: ~attr_ok,
+            SKILL_DISTRIBUTION: ~skill_ok,
+            INVALID_CLAN: ~valid_clan,
+            INVALID_DISCIPLINES: valid_clan & ~disc_ok,
+            # Por perícia: (linhas, perícias obrigatórias) e (linhas, todas as perícias)
+            MISSING_SPECIALTY: has_dots[:, self._mandatory_columns] & ~blocks.specialties[:, self._mandatory_columns],
+            SPECIALTY_WITHOUT_DOTS: blocks.specialty_entries & ~has_dots,
+            UNKNOWN_SPECIALTY_SKILL: blocks.stray_specialties,
+        }
+
+    def validate(self, blocks):
+        if not isinstance(blocks, StatBlocks):
+            blocks = self.encode(blocks)
+        return ValidationReport(self, len(blocks), self.check(blocks))
+
+
+class ValidationReport:
+    """Resultado de BulkValidator.validate: máscaras por regra, contagens e as violações linha a linha."""
+    def __init__(self, validator, size, masks):
+        self.size = size
+        self.masks = masks
+        self._skill_names = validator.skill_layout.names
+        self._mandatory_skills = validator.mandatory_skills
+        self.invalid = np.zeros(size, dtype=bool)
+        for mask in masks.values():
+            self.invalid |= mask if mask.ndim == 1 else mask.any(axis=1)
+
+    @property
+    def valid_count(self):
+        return int(self.size - np.count_nonzero(self.invalid))
+
+    def invalid_rows(self):
+        return np.flatnonzero(self.invalid)
+
+    def counts(self):
+        """Quantas linhas violam cada regra."""
+        return {code: int(np.count_nonzero(mask if mask.ndim == 1 else mask.any(axis=1)))
+                for code, mask in self.masks.items()}
+
+    def violations(self, limit=None):
+        """Gera Violation(row, code, message, detail) em ordem de linha; detail é a perícia, quando houver."""
+        produced = 0
+        rows = self.invalid_rows()
+        for row in rows.tolist():
+            for code, mask in self.masks.items():
+                if mask.ndim == 1:
+                    if mask[row]:
+                        yield Violation(row, code, MESSAGES[code], None)
+                        produced += 1
+                else:
+                    names = self._mandatory_skills if code == MISSING_SPECIALTY else self._skill_names
+                    for column in np.flatnonzero(mask[row]).tolist():
+                        detail = names[column]
+                        yield Violation(row, code, MESSAGES[code].format(detail), detail)
+                        produced += 1
+                if limit is not None and produced >= limit:
+                    return
+
+    def summary(self):
+        lines = [f"{self.valid_count:,} de {self.size:,} personagens válidos."]
+        lines.extend(f"  {code}: {count:,}" for code, count in self.counts().items() if count)
+        return "\n".join(lines)
+
+
+def validate_roster(path, game_data=None, chunk_size=100_000):
+    """
+    Valida um roster (JSONL/CSV) inteiro. Lê e codifica em blocos de chunk_size linhas, mas devolve
+    um único relatório, com as linhas numeradas desde o começo do arquivo.
+    """
+    from roster import read_roster
+    validator = BulkValidator(game_data)
+    characters = read_roster(path, validator.game_data)
+    chunks = []
+    while True:
+        blocks = validator.encode(islice(characters, chunk_size))
+        chunks.append(validator.check(blocks))
+        if len(blocks) < chunk_size:
+            break
+    masks = {code: np.concatenate([m[code] for m in chunks]) for code in chunks[0]}
+    size = len(masks[MISSING_NAME])
+    return ValidationReport(validator, size, masks)
+
+
+def _benchmark(count=1_000_000, seed=0):
+    from rules import CreationRules, random_spec
+    game_data = load_registry()
+    rules = CreationRules.from_game_data(game_data)
+    validator = BulkValidator(game_data)
+    rng = random.Random(seed)
+    templates = [rules.build(random_spec(rules, rng, f"NPC {i}")) for i in range(1000)]
+    # Alguns inválidos de propósito
+    broken = rules.build(random_spec(rules, rng, "Quebrado"))
+    broken.attribute_dots[0] = 5
+    broken.disciplines["Vicissitude"] = 1
+    templates[::100] = [broken] * len(templates[::100])
+    characters = [templates[i % len(templates)] for i in range(count)]
+    start = time.perf_counter()
+    blocks = validator.encode(characters)
+    encoded = time.perf_counter() - start
+    start = time.perf_counter()
+    report = validator.validate(blocks)
+    checked = time.perf_counter() - start
+    print(f"Codificação: {count:,} personagens em {encoded:.2f}s; validação: {checked:.2f}s "
+          f"({count / checked:,.0f} personagens/s)")
+    print(report.summary())
+    sample = 200
+    agree = all(bool(rules.validate(c)) == bool(report.invalid[i]) for i, c in enumerate(characters[:sample]))
+    print(f"Concorda com CreationRules.validate nas primeiras {sample} linhas: {agree}")
+
+
+if __name__ == "__main__":
+    _benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)